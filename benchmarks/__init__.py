@@ -0,0 +1,12 @@
+"""Benchmarks for the YaCut service.
+
+Each module is runnable with `python -m benchmarks.<name>` from the project
+root and prints its results as JSON. The Yandex Disk API is replaced with
+the mock server from `tests/yandex_disk_mock_server.py`.
+"""
+
+import os
+
+os.environ.setdefault('DATABASE_URI', 'sqlite:///:memory:')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DISK_TOKEN', 'benchmark')
@@ -0,0 +1,207 @@
+"""Latency and throughput of the main endpoints under load.
+
+Requests go through the WSGI stack in-process (Flask test clients, one per
+worker thread), so the numbers cover routing, views, the caches and the
+database, but not an HTTP server. Scenarios:
+- `redirect`: GET `/<short_id>` of random links from the dataset.
+- `api_get`: GET `/api/id/<short_id>/` of random links.
+- `create`: POST `/api/id/` with a new URL each time.
+- `files`: POST `/files` with freshly generated files, uploaded to the mock
+  Disk server from `tests/yandex_disk_mock_server.py`.
+
+The database is taken from `DATABASE_URI` as usual; it is an in-memory
+SQLite database by default. Use a file-backed one for `--concurrency`
+above 1, since every thread gets its own in-memory database; the file
+must not exist yet, the dataset is seeded into a fresh database:
+
+    DATABASE_URI=sqlite:////tmp/yacut-load.sqlite3 \
+        python -m benchmarks.load --links 1000000 --concurrency 4
+
+Every scenario reports p50/p95/p99 latency in milliseconds, requests per
+second and the peak RSS of the process so far, so a run can be compared
+with the same run on another commit.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from tests.yandex_disk_mock_server import create_mock_app, intercept_requests
+from yacut import app, db
+from yacut.models import URLMap
+
+SEED_CHUNK_SIZE = 10000
+
+
+def seed_links(count):
+    """Insert `count` links in chunks, without building them all at once."""
+    table = URLMap.__table__
+    for start in range(0, count, SEED_CHUNK_SIZE):
+        db.session.execute(table.insert(), [
+            dict(original=f'https://example.com/{number}', short=f'b{number}')
+            for number in range(start, min(start + SEED_CHUNK_SIZE, count))
+        ])
+        db.session.commit()
+
+
+def start_mock_disk():
+    """Serve the mock Disk API on a background loop and route aiohttp to it."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def start():
+        server = TestServer(create_mock_app(set()))
+        await server.start_server()
+        return server
+
+    server = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    monkeypatch = pytest.MonkeyPatch()
+    asyncio.run(intercept_requests(server, monkeypatch))
+    return monkeypatch
+
+
+def get_peak_rss_mb():
+    """Peak resident set size of the process in MiB (Linux reports KiB)."""
+    return round(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def get_percentile(latencies, percent):
+    """Nearest-rank percentile of sorted latencies."""
+    index = max(round(percent / 100 * len(latencies)) - 1, 0)
+    return latencies[index]
+
+
+def build_scenarios(links, file_size):
+    """Map scenario names to `(request function, expected status)`."""
+    counter = iter(range(10 ** 12))
+
+    def redirect(client):
+        return client.get(f'/b{random.randrange(links)}')
+
+    def api_get(client):
+        return client.get(f'/api/id/b{random.randrange(links)}/')
+
+    def create(client):
+        return client.post('/api/id/', json={
+            'url': f'https://example.org/{next(counter)}'})
+
+    def files(client):
+        number = next(counter)
+        content = str(number).encode().ljust(file_size, b'x')
+        return client.post('/files', data={
+            'files': [(BytesIO(content), f'{number}.txt')]})
+
+    return dict(
+        redirect=(redirect, 302),
+        api_get=(api_get, 200),
+        create=(create, 201),
+        files=(files, 200),
+    )
+
+
+def run_scenario(send, expected, requests, concurrency):
+    """Send `requests` requests from `concurrency` threads."""
+    def work(count):
+        client = app.test_client()
+        latencies, errors = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = send(client)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != expected
+        return latencies, errors
+
+    shares = [
+        requests // concurrency + (worker < requests % concurrency)
+        for worker in range(concurrency)
+    ]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(work, shares))
+    wall = time.perf_counter() - started
+    latencies = sorted(
+        latency for worker, _ in results for latency in worker)
+    return dict(
+        requests=requests,
+        errors=sum(errors for _, errors in results),
+        req_per_s=round(requests / wall, 1),
+        **{
+            f'p{percent}_ms': round(
+                get_percentile(latencies, percent) * 1000, 3)
+            for percent in (50, 95, 99)
+        },
+        peak_rss_mb=get_peak_rss_mb(),
+    )
+
+
+def get_commit():
+    """Short hash of the checked-out commit, if there is one."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--links', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--file-requests', type=int, default=100)
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument(
+        '--scenarios', nargs='+',
+        choices=['redirect', 'api_get', 'create', 'files'],
+        default=['redirect', 'api_get', 'create', 'files'])
+    args = parser.parse_args()
+    database = app.config['SQLALCHEMY_DATABASE_URI']
+    if args.concurrency > 1 and ':memory:' in database:
+        parser.error('--concurrency above 1 needs a file-backed DATABASE_URI')
+    app.config.update(WTF_CSRF_ENABLED=False)
+    monkeypatch = start_mock_disk()
+    scenarios = build_scenarios(args.links, args.file_size)
+    report = dict(
+        commit=get_commit(),
+        python=platform.python_version(),
+        database=database.partition(':')[0],
+        links=args.links,
+        concurrency=args.concurrency,
+        seed_seconds=None,
+        results=[],
+    )
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed_links(args.links)
+            report['seed_seconds'] = round(time.perf_counter() - started, 2)
+            db.session.remove()
+        for name in args.scenarios:
+            send, expected = scenarios[name]
+            requests = (
+                args.file_requests if name == 'files' else args.requests)
+            run_scenario(send, expected, args.warmup, 1)
+            report['results'].append(dict(scenario=name, **run_scenario(
+                send, expected, requests, args.concurrency)))
+    finally:
+        monkeypatch.undo()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""CPU time per short ID lookup: ORM query against the Core hot path.
+
+`orm` is the lookup redirects used to do,
+`URLMap.query.filter_by(short=...).first()`; `core` runs
+`ORIGINAL_BY_SHORT` on the session's connection, as
+`URLMap.get_original` does on a cache miss. The resolution cache is
+bypassed for both, so only the database access path is measured.
+
+Usage:
+    python -m benchmarks.redirect_lookup --links 1000 --lookups 20000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from yacut import app, db
+from yacut.models import ORIGINAL_BY_SHORT, URLMap
+
+
+def lookup_orm(short_id):
+    """Resolve a short ID through an ORM entity query."""
+    return URLMap.query.filter_by(short=short_id).first().original
+
+
+def lookup_core(short_id):
+    """Resolve a short ID through the compiled Core statement."""
+    return db.session.connection().execute(
+        ORIGINAL_BY_SHORT, {'short': short_id}).scalar()
+
+
+def measure(lookup, short_ids):
+    """Return CPU and wall microseconds per lookup."""
+    db.session.remove()
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for short_id in short_ids:
+        lookup(short_id)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    db.session.remove()
+    return dict(
+        cpu_us_per_lookup=round(cpu / len(short_ids) * 1e6, 2),
+        wall_us_per_lookup=round(wall / len(short_ids) * 1e6, 2),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--links', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(URLMap.__table__.insert(), [
+            dict(original=f'https://example.com/{number}', short=f'b{number}')
+            for number in range(args.links)
+        ])
+        db.session.commit()
+        short_ids = [
+            f'b{random.randrange(args.links)}' for _ in range(args.lookups)]
+        paths = dict(orm=lookup_orm, core=lookup_core)
+        for lookup in paths.values():
+            lookup(short_ids[0])
+        rows = []
+        for _ in range(args.rounds):
+            for name, lookup in paths.items():
+                rows.append(dict(
+                    path=name, lookups=args.lookups,
+                    **measure(lookup, short_ids)))
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Wall time of `upload_files_to_yadisk` against the mock Disk server.
+
+Every PUT on the mock server takes `--delay` seconds, which stands in for
+the network transfer. With a working concurrent pipeline the wall time
+grows with `ceil(files / concurrency)` rather than with the file count.
+
+Usage:
+    python -m benchmarks.upload_concurrency --files 1 2 4 8 16 \
+        --concurrency 1 4 8
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from io import BytesIO
+
+import pytest
+from aiohttp.test_utils import TestServer
+from werkzeug.datastructures import FileStorage
+
+from tests.yandex_disk_mock_server import create_mock_app, intercept_requests
+from yacut.yadisk import upload_files_to_yadisk
+
+
+async def measure(file_counts, concurrency_limits, delay, size):
+    """Return one result row per (file count, concurrency) pair."""
+    server = TestServer(create_mock_app(set(), upload_delay=delay))
+    await server.start_server()
+    monkeypatch = pytest.MonkeyPatch()
+    await intercept_requests(server, monkeypatch)
+    rows = []
+    try:
+        payload = b'x' * size
+        for concurrency in concurrency_limits:
+            for count in file_counts:
+                files = [
+                    FileStorage(stream=BytesIO(payload), filename=f'{i}.bin')
+                    for i in range(count)
+                ]
+                server.app['stats']['max_in_flight'] = 0
+                started = time.perf_counter()
+                results = await upload_files_to_yadisk(
+                    files, concurrency=concurrency)
+                rows.append(dict(
+                    files=count,
+                    concurrency=concurrency,
+                    wall_time=round(time.perf_counter() - started, 4),
+                    max_in_flight=server.app['stats']['max_in_flight'],
+                    errors=sum(1 for result in results if result.error),
+                ))
+    finally:
+        monkeypatch.undo()
+        await server.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--files', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--delay', type=float, default=0.1)
+    parser.add_argument('--size', type=int, default=64 * 1024)
+    args = parser.parse_args()
+    rows = asyncio.run(
+        measure(args.files, args.concurrency, args.delay, args.size))
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,17 +3,170 @@
 This module defines the `Config` class, which loads environment-based
 settings for the Flask application, including:
 
-- Database connection URI.
+- Database connection URI and connection pool options.
 - Secret key for session and CSRF protection.
 - OAuth token for Yandex Disk API integration.
+- Backend, size and TTLs of the short-ID resolution cache.
+- Short ID allocator settings.
+- Yandex Disk upload settings.
+- Local storage of resumable uploads and the background upload queue.
+- Database URI of the native ASGI mode.
+- Buffering of click analytics.
+- Read replicas for link resolution.
+- Sampling profiler of requests.
+- Deduplication of shortened URLs.
+- Bloom filter of existing short IDs.
 """
 
 import os
+import socket
+import tempfile
+
+ENGINE_OPTION_VARIABLES = {
+    'pool_size': ('DB_POOL_SIZE', int),
+    'max_overflow': ('DB_MAX_OVERFLOW', int),
+    'pool_recycle': ('DB_POOL_RECYCLE', int),
+    'pool_timeout': ('DB_POOL_TIMEOUT', float),
+    'pool_pre_ping': ('DB_POOL_PRE_PING', lambda value: value == 'True'),
+}
+
+
+def get_engine_options(environ=os.environ):
+    """
+    Build `SQLALCHEMY_ENGINE_OPTIONS` from the `DB_POOL_*` variables.
+
+    Only the options that are set are passed on, so SQLAlchemy keeps its
+    defaults otherwise; the SQLite pools reject most of these options.
+    """
+    return {
+        option: convert(environ[variable])
+        for option, (variable, convert) in ENGINE_OPTION_VARIABLES.items()
+        if environ.get(variable)
+    }
+
+
+def get_profiling_settings(environ=os.environ):
+    """
+    Read the `PROFILING_*` settings from `environ`.
+
+    They are read from `app.config` on every request, and
+    `yacut.profiling` reloads them on `SIGHUP`.
+    """
+    return {
+        'PROFILING_ENABLED': (
+            environ.get('PROFILING_ENABLED', 'False') == 'True'),
+        'PROFILING_SAMPLE_RATE': float(
+            environ.get('PROFILING_SAMPLE_RATE', 0.01)),
+        # Requests slower than this many seconds are always dumped;
+        # 0 disables.
+        'PROFILING_SLOW_THRESHOLD': float(
+            environ.get('PROFILING_SLOW_THRESHOLD', 0)),
+        'PROFILING_INTERVAL': float(
+            environ.get('PROFILING_INTERVAL', 0.005)),
+        'PROFILING_DIR': environ.get(
+            'PROFILING_DIR',
+            os.path.join(tempfile.gettempdir(), 'yacut-profiles')),
+    }
+
+
+PROFILING_SETTINGS = get_profiling_settings()
 
 
 class Config(object):
     """Base configuration class for the Flask application."""
 
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI')
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options()
     SECRET_KEY = os.getenv('SECRET_KEY')
     DISK_TOKEN = os.getenv("DISK_TOKEN")
+
+    RESOLUTION_CACHE_BACKEND = os.getenv('RESOLUTION_CACHE_BACKEND', 'memory')
+    RESOLUTION_CACHE_URL = os.getenv('RESOLUTION_CACHE_URL')
+    RESOLUTION_CACHE_SIZE = int(os.getenv('RESOLUTION_CACHE_SIZE', 10000))
+    RESOLUTION_CACHE_TTL = int(os.getenv('RESOLUTION_CACHE_TTL', 300))
+    RESOLUTION_CACHE_NEGATIVE_TTL = int(
+        os.getenv('RESOLUTION_CACHE_NEGATIVE_TTL', 10))
+
+    SHORT_ID_ALLOCATOR = os.getenv('SHORT_ID_ALLOCATOR', 'block')
+    SHORT_ID_LENGTH = int(os.getenv('SHORT_ID_LENGTH', 6))
+    SHORT_ID_BLOCK_SIZE = int(os.getenv('SHORT_ID_BLOCK_SIZE', 1000))
+    # Must stay the same for the lifetime of a database.
+    SHORT_ID_SCRAMBLE_KEY = int(os.getenv('SHORT_ID_SCRAMBLE_KEY', 20250825))
+
+    YADISK_UPLOAD_CHUNK_SIZE = int(
+        os.getenv('YADISK_UPLOAD_CHUNK_SIZE', 256 * 1024))
+    YADISK_UPLOAD_CONCURRENCY = int(
+        os.getenv('YADISK_UPLOAD_CONCURRENCY', 4))
+    YADISK_UPLOAD_TIMEOUT = int(os.getenv('YADISK_UPLOAD_TIMEOUT', 600))
+    YADISK_POOL_SIZE = int(os.getenv('YADISK_POOL_SIZE', 100))
+    YADISK_KEEPALIVE_TIMEOUT = int(os.getenv('YADISK_KEEPALIVE_TIMEOUT', 30))
+    YADISK_DNS_CACHE_TTL = int(os.getenv('YADISK_DNS_CACHE_TTL', 300))
+    YADISK_API_TIMEOUT = int(os.getenv('YADISK_API_TIMEOUT', 10))
+    # Download links stay valid for a few hours; refresh them well before.
+    YADISK_DOWNLOAD_LINK_TTL = int(
+        os.getenv('YADISK_DOWNLOAD_LINK_TTL', 30 * 60))
+
+    UPLOAD_TMP_DIR = os.getenv(
+        'UPLOAD_TMP_DIR',
+        os.path.join(tempfile.gettempdir(), 'yacut-uploads'))
+    UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 10 * 1024 ** 3))
+    # `flask purge-uploads` drops resumable uploads idle for this long.
+    UPLOAD_SESSION_STALE_AFTER = int(
+        os.getenv('UPLOAD_SESSION_STALE_AFTER', 24 * 60 * 60))
+
+    UPLOAD_QUEUE_ENABLED = os.getenv('UPLOAD_QUEUE_ENABLED', 'False') == 'True'
+    UPLOAD_QUEUE_WORKERS = int(os.getenv('UPLOAD_QUEUE_WORKERS', 2))
+    UPLOAD_QUEUE_POLL_INTERVAL = int(
+        os.getenv('UPLOAD_QUEUE_POLL_INTERVAL', 5))
+    UPLOAD_JOB_MAX_ATTEMPTS = int(os.getenv('UPLOAD_JOB_MAX_ATTEMPTS', 3))
+    # A failed job waits this long before its second attempt, twice as
+    # long before the third one and so on.
+    UPLOAD_JOB_RETRY_DELAY = int(os.getenv('UPLOAD_JOB_RETRY_DELAY', 30))
+    # Jobs are run only by the host that spooled their file. Hosts sharing
+    # UPLOAD_TMP_DIR (e.g. over NFS) may share a name to run each other's.
+    UPLOAD_QUEUE_HOST = os.getenv('UPLOAD_QUEUE_HOST', socket.gethostname())
+    # A running job not updated for this long is taken over by another
+    # worker; keep it well above YADISK_UPLOAD_TIMEOUT.
+    UPLOAD_JOB_STALE_AFTER = int(os.getenv('UPLOAD_JOB_STALE_AFTER', 1800))
+
+    # Defaults to DATABASE_URI with its async driver (aiosqlite, asyncpg).
+    ASYNC_DATABASE_URI = os.getenv('ASYNC_DATABASE_URI')
+
+    CLICK_BUFFER_SIZE = int(os.getenv('CLICK_BUFFER_SIZE', 100000))
+    # Seconds between flushes; 0 disables the background flush thread.
+    CLICK_FLUSH_INTERVAL = int(os.getenv('CLICK_FLUSH_INTERVAL', 5))
+    CLICK_FLUSH_SIZE = int(os.getenv('CLICK_FLUSH_SIZE', 10000))
+
+    # Comma-separated read replicas of DATABASE_URI, used for resolving
+    # short links; every other query goes to the primary.
+    DATABASE_REPLICA_URIS = [
+        uri.strip()
+        for uri in os.getenv('DATABASE_REPLICA_URIS', '').split(',')
+        if uri.strip()
+    ]
+    SQLALCHEMY_BINDS = {
+        f'replica{number}': uri
+        for number, uri in enumerate(DATABASE_REPLICA_URIS)
+    }
+    REPLICA_RETRY_AFTER = int(os.getenv('REPLICA_RETRY_AFTER', 30))
+
+    # Read on every request; reloaded on SIGHUP, see `yacut.profiling`.
+    PROFILING_ENABLED = PROFILING_SETTINGS['PROFILING_ENABLED']
+    PROFILING_SAMPLE_RATE = PROFILING_SETTINGS['PROFILING_SAMPLE_RATE']
+    PROFILING_SLOW_THRESHOLD = PROFILING_SETTINGS['PROFILING_SLOW_THRESHOLD']
+    PROFILING_INTERVAL = PROFILING_SETTINGS['PROFILING_INTERVAL']
+    PROFILING_DIR = PROFILING_SETTINGS['PROFILING_DIR']
+
+    # Return the existing short ID when a permanent link to the same URL
+    # is shortened again without a custom ID.
+    URL_DEDUP_ENABLED = os.getenv('URL_DEDUP_ENABLED', 'False') == 'True'
+
+    BLOOM_FILTER_ENABLED = os.getenv('BLOOM_FILTER_ENABLED', 'False') == 'True'
+    BLOOM_FILTER_ERROR_RATE = float(
+        os.getenv('BLOOM_FILTER_ERROR_RATE', 0.001))
+    # Seconds between reads of the links created by other processes;
+    # unknown IDs are checked against the primary in between.
+    BLOOM_FILTER_REFRESH_INTERVAL = float(
+        os.getenv('BLOOM_FILTER_REFRESH_INTERVAL', 1))
+    BLOOM_FILTER_REBUILD_INTERVAL = int(
+        os.getenv('BLOOM_FILTER_REBUILD_INTERVAL', 3600))
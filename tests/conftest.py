@@ -7,6 +7,7 @@ import pytest
 from dotenv import load_dotenv
 from io import BytesIO
 from PIL import Image
+from sqlalchemy import event
 
 load_dotenv()
 
@@ -17,6 +18,7 @@ _user_environment = os.environ.copy()
 _tmp_db_uri = 'sqlite:///:memory:'
 os.environ['DATABASE_URI'] = _tmp_db_uri
 os.environ['DISK_TOKEN'] = 'y0_nbfoiu3445tno35_fd09v854bn2_cs0e8hrb4k'
+os.environ['CLICK_FLUSH_INTERVAL'] = '0'
 
 PY_URL = 'https://www.python.org'
 TEST_BASE_URL = 'http://localhost'
@@ -27,7 +29,10 @@ pytest_plugins = [
 
 try:
     from yacut import app, db
-    from yacut.models import URLMap  # noqa
+    from yacut.analytics import click_recorder
+    from yacut.cache import resolution_cache
+    from yacut.models import URLMap, short_id_allocator  # noqa
+    from yacut.yadisk import disk_client, download_link_cache
 except NameError as exc:
     raise AssertionError(
         'При попытке импорта объекта приложения вознакло исключение: '
@@ -67,9 +72,27 @@ def _app():
     })
     with app.app_context():
         db.create_all()
+        resolution_cache.clear()
+        download_link_cache.clear()
+        short_id_allocator.reset()
+        click_recorder.clear()
         yield app
+        click_recorder.clear()
         db.drop_all()
         db.session.close()
+        disk_client.close()
+
+
+@pytest.fixture
+def statements(_app):
+    recorded = []
+
+    def record(conn, cursor, statement, *args):
+        recorded.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(db.engine, 'before_cursor_execute', record)
 
 
 @pytest.fixture
@@ -0,0 +1,43 @@
+import fnmatch
+import time
+
+
+class FakeKeyValueClient:
+    """Внутрипроцессная замена сетевого key-value хранилища (Redis)."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+
+    def _alive(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def get(self, key):
+        self.calls += 1
+        return self._alive(key)
+
+    def mget(self, keys):
+        self.calls += 1
+        return [self._alive(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.calls += 1
+        if isinstance(value, str):
+            value = value.encode()
+        expires_at = time.monotonic() + ex if ex else None
+        self.data[key] = (value, expires_at)
+        return True
+
+    def delete(self, *keys):
+        self.calls += 1
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match='*'):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
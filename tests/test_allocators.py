@@ -0,0 +1,82 @@
+from yacut.allocators import (
+    ALPHABET, BASE, BlockCounterAllocator, RandomAllocator, scramble
+)
+from yacut.constants import ALLOWED_CHARS, RESERVED
+from yacut.models import ShortIdCounter, URLMap
+
+
+class BlockReserver:
+
+    def __init__(self):
+        self.calls = 0
+        self.value = 0
+
+    def __call__(self, size):
+        self.calls += 1
+        start, self.value = self.value, self.value + size
+        return start
+
+
+def test_scramble_is_bijective():
+    domain = BASE ** 2
+    values = {scramble(number, domain, key=42) for number in range(domain)}
+    assert values == set(range(domain)), (
+        'Перемешивание счётчика должно быть биекцией на своём домене.'
+    )
+
+
+def test_block_allocator_ids_unique_and_valid():
+    reserver = BlockReserver()
+    allocator = BlockCounterAllocator(
+        reserver, length=6, block_size=100, key=7)
+    ids = allocator.allocate_many(1000)
+    assert len(set(ids)) == len(ids), (
+        'Генератор коротких ссылок не должен выдавать повторяющиеся '
+        'идентификаторы.'
+    )
+    assert all(len(short_id) == 6 for short_id in ids)
+    assert all(ALLOWED_CHARS.fullmatch(short_id) for short_id in ids)
+    assert not set(ids) & RESERVED
+    assert reserver.calls == 10, (
+        'Генератор должен обращаться к хранилищу счётчика один раз на блок, '
+        'а не на каждый идентификатор.'
+    )
+
+
+def test_block_allocator_grows_after_exhaustion():
+    allocator = BlockCounterAllocator(
+        BlockReserver(), length=1, block_size=BASE, key=0)
+    ids = allocator.allocate_many(BASE + 1)
+    assert sorted(ids[:BASE]) == sorted(ALPHABET)
+    assert len(ids[-1]) == 2
+
+
+def test_block_allocator_skips_reserved(monkeypatch):
+    allocator = BlockCounterAllocator(
+        BlockReserver(), length=5, block_size=10, key=0)
+    codes = iter(['files', 'abcde'])
+    monkeypatch.setattr(allocator, 'encode', lambda counter: next(codes))
+    assert allocator.allocate() == 'abcde'
+
+
+def test_random_allocator_alphabet():
+    short_id = RandomAllocator(length=6).allocate()
+    assert ALLOWED_CHARS.fullmatch(short_id) and len(short_id) == 6
+
+
+def test_counter_blocks_do_not_overlap(_app):
+    assert ShortIdCounter.reserve_block(1000) == 0
+    assert ShortIdCounter.reserve_block(1000) == 1000
+    assert ShortIdCounter.query.get(1).value == 2000
+
+
+def test_get_unique_short_id_does_not_query_table(statements):
+    for _ in range(10):
+        URLMap.get_unique_short_id()
+    assert not [sql for sql in statements if 'url_map' in sql], (
+        '`get_unique_short_id` не должен обращаться к таблице ссылок.'
+    )
+    assert len(statements) <= 2, (
+        'Для выдачи блока идентификаторов достаточно одного обращения к '
+        'счётчику.'
+    )
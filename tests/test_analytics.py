@@ -0,0 +1,60 @@
+from datetime import datetime
+from http import HTTPStatus
+
+from yacut.analytics import ClickRecorder, click_recorder
+from yacut.models import ClickStat
+
+MINUTE = 1_700_000_040
+
+
+def test_recorder_aggregates_and_upserts(_app):
+    now = [MINUTE + 5]
+    recorder = ClickRecorder(
+        capacity=100, flush_interval=0, flush_size=100,
+        clock=lambda: now[0])
+    for _ in range(3):
+        recorder.record('py')
+    now[0] += 60
+    recorder.record('py')
+    recorder.record('other')
+    assert recorder.flush() == 5
+    recorder.record('py')
+    assert recorder.flush() == 1
+    stored = {
+        (stat.short, stat.minute): stat.count
+        for stat in ClickStat.query
+    }
+    assert stored == {
+        ('py', datetime.utcfromtimestamp(MINUTE)): 3,
+        ('py', datetime.utcfromtimestamp(MINUTE + 60)): 2,
+        ('other', datetime.utcfromtimestamp(MINUTE + 60)): 1,
+    }, (
+        'Клики должны суммироваться по ссылке и минуте, а повторный сброс '
+        'буфера - прибавляться к уже сохранённым значениям.'
+    )
+
+
+def test_recorder_buffer_is_bounded(_app):
+    recorder = ClickRecorder(capacity=2, flush_interval=0, flush_size=100)
+    for _ in range(5):
+        recorder.record('py')
+    assert recorder.stats() == dict(
+        buffered=2, recorded=5, dropped=3, flushed=0)
+
+
+def test_click_stats_endpoint(client, short_python_url):
+    for _ in range(2):
+        client.get(f'/{short_python_url.short}')
+    assert not ClickStat.query.count(), (
+        'Переход по короткой ссылке не должен сразу писать в базу данных.'
+    )
+    click_recorder.flush()
+    response = client.get(f'/api/id/{short_python_url.short}/stats/')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['total'] == 2
+    assert [item['count'] for item in response.json['clicks']] == [2]
+    assert client.get('/api/id/missing/stats/').status_code == (
+        HTTPStatus.NOT_FOUND)
+    assert client.get(
+        f'/api/id/{short_python_url.short}/stats/?minutes=0'
+    ).status_code == HTTPStatus.BAD_REQUEST
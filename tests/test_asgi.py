@@ -0,0 +1,194 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+import pytest
+from flask import has_app_context
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import NullPool
+
+from tests.conftest import PY_URL
+from tests.key_value_store_fake import FakeKeyValueClient
+from yacut import db
+from yacut.asgi import AsyncYaCut, get_async_database_uri
+from yacut.cache import KeyValueCache, resolution_cache
+from yacut.constants import INVALID_URL_MESSAGE
+from yacut.models import URLMap
+
+
+def test_async_database_uri():
+    config = {
+        'ASYNC_DATABASE_URI': None,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///db.sqlite3',
+    }
+    assert get_async_database_uri(config) == 'sqlite+aiosqlite:///db.sqlite3'
+    config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://user@host/yacut'
+    assert get_async_database_uri(config) == (
+        'postgresql+asyncpg://user@host/yacut')
+    config['ASYNC_DATABASE_URI'] = 'postgresql+psycopg://user@host/yacut'
+    assert get_async_database_uri(config) == config['ASYNC_DATABASE_URI']
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = tmp_path / 'asgi.sqlite3'
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def asgi_app(_app, database_path):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{database_path}', poolclass=NullPool)
+    return AsyncYaCut(_app, engine=engine)
+
+
+def call(asgi_app, method, path, body=b''):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start = sent[0]
+    return (
+        start['status'],
+        dict(start['headers']),
+        b''.join(message.get('body', b'') for message in sent[1:]),
+    )
+
+
+def test_asgi_creates_and_redirects_natively(asgi_app, database_path):
+    status, _, body = call(asgi_app, 'POST', '/api/id/', json.dumps(
+        {'url': PY_URL, 'custom_id': 'py'}).encode())
+    assert status == HTTPStatus.CREATED
+    assert json.loads(body) == {
+        'url': PY_URL, 'short_link': 'http://localhost/py'}
+    status, _, body = call(asgi_app, 'POST', '/api/id/', json.dumps(
+        {'url': PY_URL, 'custom_id': 'py'}).encode())
+    assert status == HTTPStatus.BAD_REQUEST
+    assert json.loads(body) == {
+        'message': 'Предложенный вариант короткой ссылки уже существует.'}
+
+    resolution_cache.clear()
+    status, headers, _ = call(asgi_app, 'GET', '/py')
+    assert status == HTTPStatus.FOUND
+    assert headers[b'location'] == PY_URL.encode()
+    status, _, body = call(asgi_app, 'GET', '/api/id/py/')
+    assert json.loads(body) == {'url': PY_URL}
+
+    engine = create_engine(f'sqlite:///{database_path}')
+    with engine.connect() as connection:
+        assert connection.scalar(
+            select(URLMap.original).where(URLMap.short == 'py')) == PY_URL
+    engine.dispose()
+    assert URLMap.query.count() == 0, (
+        'В ASGI-режиме ссылки должны сохраняться через асинхронный движок '
+        'базы данных.'
+    )
+
+
+def test_asgi_falls_back_to_flask(asgi_app):
+    status, _, body = call(asgi_app, 'GET', '/missing')
+    assert status == HTTPStatus.NOT_FOUND
+    assert b'html' in body
+    status, _, body = call(asgi_app, 'GET', '/api/id/missing/')
+    assert status == HTTPStatus.NOT_FOUND
+    assert json.loads(body) == {'message': 'Указанный id не найден'}
+    status, _, body = call(asgi_app, 'GET', '/')
+    assert status == HTTPStatus.OK
+    assert b'form' in body
+
+
+def test_asgi_deduplicates_links(asgi_app):
+    asgi_app.flask_app.config['URL_DEDUP_ENABLED'] = True
+    try:
+        links = [
+            json.loads(call(asgi_app, 'POST', '/api/id/', json.dumps(
+                {'url': url}).encode())[2])['short_link']
+            for url in (PY_URL, PY_URL.upper(), PY_URL + '/about')
+        ]
+    finally:
+        asgi_app.flask_app.config['URL_DEDUP_ENABLED'] = False
+    assert links[0] == links[1] != links[2]
+
+
+def test_asgi_rejects_disk_paths(asgi_app):
+    status, _, body = call(asgi_app, 'POST', '/api/id/', json.dumps(
+        {'url': 'disk:/Documents/passport.pdf', 'custom_id': 'doc'}).encode())
+    assert status == HTTPStatus.BAD_REQUEST, (
+        'Путь на Диске, переданный пользователем, не должен сохраняться '
+        'как ссылка на файл.'
+    )
+    assert json.loads(body) == {'message': INVALID_URL_MESSAGE}
+
+
+def test_asgi_creates_without_app_context(asgi_app):
+    result = {}
+
+    def serve():
+        result['has_context'] = has_app_context()
+        result['response'] = call(asgi_app, 'POST', '/api/id/', json.dumps(
+            {'url': PY_URL}).encode())
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    thread.join()
+    assert not result['has_context']
+    status, _, body = result['response']
+    assert status == HTTPStatus.CREATED, (
+        'Под ASGI-сервером контекст приложения не создаётся: генерация '
+        'короткой ссылки должна работать и без него.'
+    )
+    assert json.loads(body)['url'] == PY_URL
+
+
+def test_asgi_calls_networked_cache_off_the_loop(asgi_app, monkeypatch):
+    callers = []
+
+    class RecordingClient(FakeKeyValueClient):
+        def get(self, key):
+            callers.append(threading.current_thread())
+            return super().get(key)
+
+        def set(self, key, value, ex=None):
+            callers.append(threading.current_thread())
+            return super().set(key, value, ex=ex)
+
+    backend = KeyValueCache(RecordingClient(), ttl=60, negative_ttl=5)
+    monkeypatch.setattr('yacut.asgi.resolution_cache', backend)
+    monkeypatch.setattr('yacut.models.resolution_cache', backend)
+    status, _, _ = call(asgi_app, 'POST', '/api/id/', json.dumps(
+        {'url': PY_URL, 'custom_id': 'remote'}).encode())
+    assert status == HTTPStatus.CREATED
+    status, headers, _ = call(asgi_app, 'GET', '/remote')
+    assert status == HTTPStatus.FOUND
+    assert headers[b'location'] == PY_URL.encode()
+    assert callers
+    assert threading.current_thread() not in callers, (
+        'Сетевой кеш блокирует поток: под ASGI его нужно вызывать вне '
+        'цикла событий.'
+    )
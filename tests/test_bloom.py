@@ -0,0 +1,177 @@
+import time
+from datetime import datetime
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import insert
+
+from tests.conftest import PY_URL
+from yacut import db
+from yacut.bloom import BloomFilter
+from yacut.cache import resolution_cache
+from yacut.constants import BLOOM_MAX_ID_TTL, BLOOM_REFRESH_OVERLAP
+from yacut.models import URLMap, short_id_filter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    keys = [f'key{number}' for number in range(10000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys), (
+        'Фильтр Блума не должен отвергать добавленные ключи.'
+    )
+    false_positives = sum(
+        f'other{number}' in bloom for number in range(10000))
+    assert false_positives < 300
+    assert bloom.false_positive_rate() == pytest.approx(0.01, rel=0.5)
+    assert len(bloom.bits) < 10000 * 10 / 8 * 1.1
+
+
+@pytest.fixture
+def bloom(_app):
+    _app.config.update(
+        BLOOM_FILTER_ENABLED=True,
+        BLOOM_FILTER_REFRESH_INTERVAL=0.01,
+    )
+    yield short_id_filter
+    short_id_filter.reset()
+    _app.config.update(
+        BLOOM_FILTER_ENABLED=False,
+        BLOOM_FILTER_REFRESH_INTERVAL=1,
+        BLOOM_FILTER_REBUILD_INTERVAL=3600,
+    )
+
+
+def test_unknown_ids_skip_the_database(client, bloom, short_python_url,
+                                       statements, monkeypatch):
+    monkeypatch.setattr(bloom, '_clock', lambda: 0.0)
+    bloom.build()
+    statements.clear()
+    response = client.get('/missing')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert URLMap.resolve_many(['missing', 'other']) == {
+        'missing': None, 'other': None}
+    assert len(statements) == 1 and 'max(' in statements[0], (
+        'Для коротких ссылок, которых нет в фильтре Блума, должна '
+        'выполняться одна общая проверка наибольшего первичного ключа, '
+        'без поиска по короткой ссылке.'
+    )
+    assert client.get('/py').status_code == HTTPStatus.FOUND
+    assert bloom.stats()['negatives'] == 2
+
+
+def test_ruled_out_ids_are_cached(client, bloom, short_python_url,
+                                  statements):
+    bloom.build()
+    statements.clear()
+    for _ in range(5):
+        assert client.get('/missing').status_code == HTTPStatus.NOT_FOUND
+    assert len(statements) == 1, (
+        'Повторные запросы несуществующей короткой ссылки должны '
+        'обслуживаться из кеша.'
+    )
+    _, expires = resolution_cache._data['missing']
+    assert expires - resolution_cache._clock() <= (
+        resolution_cache.negative_ttl)
+
+
+def test_newest_id_is_checked_again_later(bloom, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(bloom, '_clock', lambda: now[0])
+    bloom.build()
+    assert not bloom.might_contain('ext')
+    db.session.execute(insert(URLMap), [{'original': PY_URL, 'short': 'ext'}])
+    db.session.commit()
+    assert not bloom.might_contain('ext')
+    now[0] += BLOOM_MAX_ID_TTL
+    assert bloom.might_contain('ext'), (
+        'Наибольший первичный ключ можно переиспользовать лишь '
+        'недолго: затем ссылки других процессов должны находиться.'
+    )
+
+
+def test_new_links_are_added(client, bloom):
+    bloom.build()
+    response = client.post('/api/id/', json={'url': PY_URL})
+    short_id = response.json['short_link'].rsplit('/', 1)[1]
+    assert bloom.in_filter(short_id)
+    db.session.execute(insert(URLMap), [{'original': PY_URL, 'short': 'ext'}])
+    db.session.commit()
+    assert not bloom.in_filter('ext')
+    assert client.get('/ext').status_code == HTTPStatus.FOUND, (
+        'Ссылка, созданная другим процессом после обновления фильтра, '
+        'должна находиться сразу, а не только после следующего обновления.'
+    )
+    assert bloom.in_filter('ext')
+    assert URLMap.resolve_many(['ext']) == {'ext': PY_URL}
+    assert bloom.stats()['catch_ups'] == 1
+
+
+def test_refresh_ignores_writer_clocks(bloom, short_python_url):
+    bloom.build()
+    db.session.execute(insert(URLMap), [{
+        'original': PY_URL, 'short': 'late',
+        'timestamp': datetime(2000, 1, 1),
+    }])
+    db.session.commit()
+    bloom.refresh()
+    assert bloom.in_filter('late'), (
+        'Обновление фильтра не должно зависеть от часов процесса, '
+        'создавшего ссылку.'
+    )
+
+
+def test_refresh_reads_only_recent_rows(bloom, monkeypatch):
+    db.session.execute(insert(URLMap), [
+        {'original': PY_URL, 'short': f'old{number}'}
+        for number in range(BLOOM_REFRESH_OVERLAP + 100)
+    ])
+    db.session.commit()
+    bloom.build()
+    db.session.execute(insert(URLMap), [{'original': PY_URL, 'short': 'new'}])
+    db.session.commit()
+    added = []
+    monkeypatch.setattr(bloom, 'add', added.append)
+    bloom.refresh()
+    assert 'new' in added
+    assert len(added) == BLOOM_REFRESH_OVERLAP + 1, (
+        'Обновление фильтра должно перечитывать только новые строки и '
+        'небольшой запас перед ними.'
+    )
+
+
+def test_rebuild_drops_deleted_links(_app, bloom, short_python_url):
+    bloom.build()
+    db.session.delete(short_python_url)
+    db.session.commit()
+    bloom.maintain()
+    assert bloom.might_contain('py')
+    _app.config['BLOOM_FILTER_REBUILD_INTERVAL'] = 0
+    bloom.maintain()
+    assert not bloom.might_contain('py')
+    stats = bloom.stats()
+    assert stats['rebuilds'] == 2 and stats['refreshes'] == 1
+    assert stats['entries'] == 0
+    assert stats['bytes_per_million'] > 0
+
+
+def test_filter_is_built_in_background(client, bloom, short_python_url):
+    assert bloom.might_contain('missing'), (
+        'Пока фильтр не построен, все короткие ссылки нужно искать в базе.'
+    )
+    deadline = time.monotonic() + 5
+    while not bloom.stats()['ready'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not bloom.might_contain('missing')
+    assert bloom.might_contain('py')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'yacut_short_id_filter_false_positive_rate' in text
+    assert 'yacut_short_id_filter_build_seconds' in text
+
+
+def test_refresh_does_not_count_links_twice(_app, bloom, short_python_url):
+    bloom.build()
+    bloom.refresh()
+    bloom.refresh()
+    assert bloom.stats()['entries'] == 1
@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.conftest import PY_URL
+from tests.key_value_store_fake import FakeKeyValueClient
+from yacut import db
+from yacut.cache import (
+    MISSING, KeyValueCache, LRUCache, create_backend, resolution_cache
+)
+from yacut.models import URLMap
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = LRUCache(maxsize=2, ttl=60, negative_ttl=5)
+    cache.set('a', 'https://a.example')
+    cache.set('b', 'https://b.example')
+    cache.get('a')
+    cache.set('c', 'https://c.example')
+    assert cache.get('b') is None, (
+        'При переполнении кеша должна вытесняться самая давно '
+        'использованная запись.'
+    )
+    assert cache.get('a') == 'https://a.example'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_and_negative_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=60, negative_ttl=5, clock=clock)
+    cache.set('a', 'https://a.example')
+    cache.set('missing', MISSING)
+    clock.now = 10
+    assert cache.get('missing') is None, (
+        'Отрицательный результат должен храниться в кеше не дольше '
+        '`negative_ttl` секунд.'
+    )
+    assert cache.get('a') == 'https://a.example'
+    clock.now = 61
+    assert cache.get('a') is None, (
+        'Запись должна удаляться из кеша по истечении `ttl` секунд.'
+    )
+
+
+def test_redirect_served_from_cache(client, short_python_url):
+    client.get(f'/{short_python_url.short}')
+    db.session.delete(short_python_url)
+    db.session.commit()
+    response = client.get(f'/{short_python_url.short}')
+    assert response.status_code == HTTPStatus.FOUND, (
+        'Повторный переход по короткой ссылке должен обслуживаться из кеша.'
+    )
+    assert response.location == PY_URL
+    assert resolution_cache.stats()['hits'] == 1
+
+
+def test_negative_result_invalidated_on_create(client):
+    assert client.get('/py').status_code == HTTPStatus.NOT_FOUND
+    assert client.get('/py').status_code == HTTPStatus.NOT_FOUND
+    stats = resolution_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1), (
+        'Несуществующий короткий идентификатор должен кешироваться.'
+    )
+    URLMap.validate_user_code(PY_URL, 'py')
+    response = client.get('/api/id/py/')
+    assert response.status_code == HTTPStatus.OK, (
+        'После создания ссылки отрицательная запись в кеше должна '
+        'инвалидироваться.'
+    )
+    assert response.json == {'url': PY_URL}
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    client = FakeKeyValueClient()
+    backend = KeyValueCache(client, ttl=60, negative_ttl=5)
+    monkeypatch.setattr('yacut.models.resolution_cache', backend)
+    return backend
+
+
+def test_key_value_backend_read_through(client, shared_cache,
+                                        short_python_url):
+    assert client.get('/api/id/py/').json == {'url': PY_URL}
+    assert shared_cache.client.get('yacut:short:py') == PY_URL.encode(), (
+        'При промахе значение должно записываться в общий кеш.'
+    )
+    client.get('/api/id/unknown/')
+    assert shared_cache.get('unknown') is MISSING, (
+        'Несуществующий идентификатор должен кешироваться как пустое '
+        'значение.'
+    )
+
+
+def test_key_value_backend_write_through(client, shared_cache):
+    response = client.post('/api/id/', json={'url': PY_URL})
+    short_id = response.json['short_link'].rsplit('/', 1)[-1]
+    assert shared_cache.client.get(f'yacut:short:{short_id}') == (
+        PY_URL.encode()
+    ), 'Созданная ссылка должна сразу записываться в общий кеш.'
+    response = client.get(f'/{short_id}')
+    assert response.location == PY_URL
+    assert shared_cache.stats()['hits'] == 1
+
+
+def test_create_backend_memory(default_app):
+    backend = create_backend(default_app.config)
+    assert isinstance(backend, LRUCache)
@@ -2,10 +2,13 @@ import pytest
 from http import HTTPStatus
 
 from tests.conftest import PY_URL, TEST_BASE_URL
+from yacut.constants import INVALID_URL_MESSAGE
 from yacut.models import URLMap
 
 CREATE_SHORT_LINK_URL = '/api/id/'
+CREATE_BATCH_URL = '/api/id/batch/'
 GET_ORIGINAL_LINK_URL = '/api/id/{short_id}/'
+RESOLVE_URL = '/api/id/resolve/'
 VALIDATION_ERROR_KEY = 'message'
 
 
@@ -298,3 +301,142 @@ def test_len_short_id_autogenerated_api(client):
         'в базе данных должна генерироваться короткая ссылка длинной 6 '
         'символов.'
     )
+
+
+def test_create_batch(client, short_python_url, duplicated_custom_id_msg):
+    response = client.post(CREATE_BATCH_URL, json=[
+        {'url': PY_URL},
+        {'url': PY_URL, 'custom_id': short_python_url.short},
+        {'url': PY_URL, 'custom_id': 'batch'},
+        {'url': PY_URL, 'custom_id': 'batch'},
+        {'url': PY_URL, 'custom_id': 'h@k$r'},
+        {'custom_id': 'nourl'},
+    ])
+    assert response.status_code == HTTPStatus.OK, (
+        f'POST-запрос к эндпоинту `{CREATE_BATCH_URL}` должен вернуть '
+        f'ответ со статус-кодом {HTTPStatus.OK.value}.'
+    )
+    generated, taken, created, duplicate, invalid, no_url = response.json
+    assert generated['url'] == PY_URL
+    assert created == {
+        'url': PY_URL, 'short_link': f'{TEST_BASE_URL}/batch'
+    }
+    assert taken == {VALIDATION_ERROR_KEY: duplicated_custom_id_msg}
+    assert duplicate == {VALIDATION_ERROR_KEY: duplicated_custom_id_msg}, (
+        'Повтор короткой ссылки внутри одного пакета должен возвращать '
+        'ошибку для второго элемента.'
+    )
+    assert invalid == {
+        VALIDATION_ERROR_KEY: 'Указано недопустимое имя для короткой ссылки'
+    }
+    assert no_url == {
+        VALIDATION_ERROR_KEY: '"url" является обязательным полем!'
+    }
+    assert URLMap.query.count() == 3
+    short_id = generated['short_link'].rsplit('/', 1)[-1]
+    assert client.get(f'/{short_id}').location == PY_URL
+
+
+def test_create_batch_mixed_types(client):
+    response = client.post(CREATE_BATCH_URL, json=[
+        {'url': PY_URL, 'custom_id': 123},
+        {'url': PY_URL, 'custom_id': ['py']},
+        {'url': 42},
+        {'url': PY_URL, 'custom_id': 'typed'},
+    ])
+    assert response.status_code == HTTPStatus.OK, (
+        'Элемент пакета с полями неверного типа должен давать ошибку для '
+        'этого элемента, а не для всего запроса.'
+    )
+    number, array, url, created = response.json
+    assert number == array == {
+        VALIDATION_ERROR_KEY: 'Указано недопустимое имя для короткой ссылки'
+    }
+    assert url == {VALIDATION_ERROR_KEY: INVALID_URL_MESSAGE}
+    assert created == {
+        'url': PY_URL, 'short_link': f'{TEST_BASE_URL}/typed'
+    }
+
+
+@pytest.mark.parametrize('json_data', [None, {'url': PY_URL}])
+def test_create_batch_bad_body(client, json_data):
+    response = client.post(CREATE_BATCH_URL, json=json_data)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert VALIDATION_ERROR_KEY in response.json
+
+
+def test_resolve_many(client, short_python_url):
+    response = client.post(RESOLVE_URL, json=['py', 'nope', 'py'])
+    assert response.status_code == HTTPStatus.OK, (
+        f'POST-запрос к эндпоинту `{RESOLVE_URL}` должен вернуть ответ со '
+        f'статус-кодом {HTTPStatus.OK.value}.'
+    )
+    assert response.json == {
+        'urls': {'py': PY_URL}, 'missing': ['nope'], 'files': [],
+        'pending': []}
+
+
+def test_resolve_does_not_shadow_get_url(client):
+    client.post(CREATE_SHORT_LINK_URL, json={
+        'url': PY_URL, 'custom_id': 'resolve'
+    })
+    response = client.get(GET_ORIGINAL_LINK_URL.format(short_id='resolve'))
+    assert response.json == {'url': PY_URL}
+
+
+@pytest.mark.parametrize('json_data', [None, {'ids': ['py']}, [1, 2]])
+def test_resolve_many_bad_body(client, json_data):
+    response = client.post(RESOLVE_URL, json=json_data)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert VALIDATION_ERROR_KEY in response.json
+
+
+def test_create_id_with_expiry(client):
+    response = client.post(CREATE_SHORT_LINK_URL, json={
+        'url': PY_URL,
+        'custom_id': 'py',
+        'expires_at': '2999-01-01T12:00:00+03:00',
+    })
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json['expires_at'] == '2999-01-01T09:00:00Z', (
+        'Срок действия ссылки должен возвращаться в UTC.'
+    )
+    response = client.post(CREATE_SHORT_LINK_URL, json={
+        'url': PY_URL, 'expires_at': '2000-01-01T00:00:00'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json == {
+        VALIDATION_ERROR_KEY: 'Срок действия ссылки должен быть в будущем'}
+
+
+@pytest.mark.parametrize('expires_at', [
+    '9999-12-31T23:59:59-05:00',
+    '0001-01-01T00:00:00+05:00',
+])
+def test_create_id_with_out_of_range_expiry(client, expires_at):
+    response = client.post(CREATE_SHORT_LINK_URL, json={
+        'url': PY_URL, 'expires_at': expires_at})
+    assert response.status_code == HTTPStatus.BAD_REQUEST, (
+        'Срок действия, который не переводится в UTC, должен отклоняться '
+        f'со статусом {HTTPStatus.BAD_REQUEST.value}.'
+    )
+    assert response.json == {
+        VALIDATION_ERROR_KEY: 'Недопустимый срок действия ссылки'}
+
+
+@pytest.mark.parametrize('url', [
+    'disk:/Documents/passport.pdf',
+    'upload:0123456789abcdef',
+    'javascript:alert(1)',
+    'www.python.org',
+])
+def test_create_rejects_non_http_url(client, url):
+    response = client.post(CREATE_SHORT_LINK_URL, json={'url': url})
+    assert response.status_code == HTTPStatus.BAD_REQUEST, (
+        f'POST-запрос к эндпоинту `{CREATE_SHORT_LINK_URL}` должен '
+        'принимать только ссылки со схемой http или https: пути на Диске '
+        'сохраняет только загрузка файлов.'
+    )
+    assert response.json == {VALIDATION_ERROR_KEY: INVALID_URL_MESSAGE}
+    response = client.post(CREATE_BATCH_URL, json=[{'url': url}])
+    assert response.json == [{VALIDATION_ERROR_KEY: INVALID_URL_MESSAGE}]
+    assert URLMap.query.count() == 0
@@ -1,18 +1,41 @@
 import asyncio
+import os
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
 from http import HTTPStatus
 from io import BytesIO
 
-from tests.conftest import generate_png_bytes, TEST_BASE_URL
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from tests.conftest import PY_URL, generate_png_bytes, TEST_BASE_URL
 from tests.yandex_disk_mock_server import (
-    COMMON_ASSERT_MSG_FOR_UPLOAD_FILES, intercept_requests
+    COMMON_ASSERT_MSG_FOR_UPLOAD_FILES, SLOW_UPLOAD_DELAY, intercept_requests
+)
+from yacut import db
+from yacut.cache import resolution_cache
+from yacut.jobs import (
+    run_pending_jobs, start_upload_workers, upload_workers
+)
+from yacut.models import (
+    UploadJob, UploadSession, URLMap, short_id_allocator
+)
+from yacut.storage import UploadResult, get_disk_name
+from yacut.yadisk import (
+    disk_client, iter_file_chunks, upload_files_to_yadisk
 )
 
 FILES_URL = '/files'
+UPLOADS_URL = '/api/uploads/'
 EXPECTED_API_CALLS = {
     'get_upload_link',
     'upload',
-    'get_download_link'
 }
+BIG_FILE_SIZE = 32 * 1024 * 1024
+UPLOAD_PEAK_MEMORY_LIMIT = 4 * 1024 * 1024
 
 
 def test_files_upload_page_available(client):
@@ -88,6 +111,531 @@ async def test_upload_files(client, mock_server, monkeypatch):
         assert not (EXPECTED_API_CALLS - user_calls), (
             COMMON_ASSERT_MSG_FOR_UPLOAD_FILES
         )
+        assert 'get_download_link' not in user_calls, (
+            'Ссылка для скачивания файла должна запрашиваться при первом '
+            'переходе по короткой ссылке, а не во время загрузки.'
+        )
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, sync_test)
+
+
+async def test_upload_memory_is_bounded(_app, mock_server, monkeypatch,
+                                        tmp_path):
+    mock_server, user_calls = await mock_server
+    await intercept_requests(mock_server, monkeypatch)
+    path = tmp_path / 'big.zip'
+    with open(path, 'wb') as file:
+        for _ in range(BIG_FILE_SIZE // (1024 * 1024)):
+            file.write(os.urandom(1024 * 1024))
+    with open(path, 'rb') as stream:
+        tracemalloc.start()
+        try:
+            await upload_files_to_yadisk(
+                [FileStorage(stream=stream, filename='big.zip')])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    assert 'upload' in user_calls
+    assert peak < UPLOAD_PEAK_MEMORY_LIMIT, (
+        'Файл должен передаваться на Яндекс Диск потоком, частями '
+        'фиксированного размера: пиковое потребление памяти при загрузке '
+        f'файла в {BIG_FILE_SIZE} байт составило {peak} байт.'
+    )
+
+
+def make_text_files(count):
+    return [
+        FileStorage(stream=BytesIO(b'content'), filename=f'{index}.txt')
+        for index in range(count)
+    ]
+
+
+async def test_uploads_run_concurrently_within_limit(_app, slow_mock_server,
+                                                     monkeypatch):
+    server, user_calls = await slow_mock_server
+    await intercept_requests(server, monkeypatch)
+    started = time.perf_counter()
+    results = await upload_files_to_yadisk(make_text_files(6), concurrency=3)
+    elapsed = time.perf_counter() - started
+    assert [result.filename for result in results] == [
+        f'{index}.txt' for index in range(6)
+    ]
+    assert all(result.path and not result.error for result in results)
+    assert server.app['stats']['max_in_flight'] == 3, (
+        'Одновременно должно загружаться не больше файлов, чем задано '
+        'ограничением, и загрузки должны идти параллельно.'
+    )
+    assert elapsed < 4 * SLOW_UPLOAD_DELAY, (
+        'Шесть файлов при ограничении в три параллельные загрузки должны '
+        'загружаться примерно за два интервала, а не последовательно.'
+    )
+
+
+class BrokenStream(BytesIO):
+
+    def read(self, *args):
+        raise OSError('Ошибка чтения')
+
+
+async def test_failed_file_does_not_discard_others(_app, slow_mock_server,
+                                                   monkeypatch):
+    server, user_calls = await slow_mock_server
+    await intercept_requests(server, monkeypatch)
+    files = make_text_files(2)
+    files.insert(1, FileStorage(stream=BrokenStream(), filename='bad.txt'))
+    results = await upload_files_to_yadisk(files)
+    assert [bool(result.path) for result in results] == [True, False, True], (
+        'Ошибка загрузки одного файла не должна отменять загрузку остальных.'
+    )
+    assert results[1].filename == 'bad.txt' and results[1].error
+
+
+async def test_upload_timeout_is_per_file(_app, slow_mock_server,
+                                          monkeypatch):
+    server, user_calls = await slow_mock_server
+    await intercept_requests(server, monkeypatch)
+    results = await upload_files_to_yadisk(
+        make_text_files(2), timeout=SLOW_UPLOAD_DELAY / 2)
+    assert all(result.error and not result.path for result in results), (
+        'Загрузка, превысившая время ожидания, должна завершаться ошибкой '
+        'для конкретного файла.'
+    )
+
+
+async def test_session_is_reused_between_calls(_app, mock_server,
+                                               monkeypatch):
+    server, user_calls = await mock_server
+    await intercept_requests(server, monkeypatch)
+    before = dict(disk_client.stats)
+    for _ in range(3):
+        results = await upload_files_to_yadisk(make_text_files(1))
+        assert results[0].path
+    created = disk_client.stats['connections_created'] - (
+        before['connections_created'])
+    reused = disk_client.stats['connections_reused'] - (
+        before['connections_reused'])
+    assert disk_client.stats['requests'] - before['requests'] == 6
+    assert created == 1 and reused == 5, (
+        'Запросы к API Диска из разных вызовов должны переиспользовать '
+        'соединения общего пула, а не открывать новые.'
+    )
+
+
+async def test_download_link_resolved_lazily(client, mock_server,
+                                             monkeypatch):
+    server, user_calls = await mock_server
+    await intercept_requests(server, monkeypatch)
+    form_data = {'files': [(BytesIO(generate_png_bytes()), 'image.png')]}
+
+    def sync_test():
+        response = client.post(FILES_URL, data=form_data)
+        short_link = re.search(
+            rf'href="({TEST_BASE_URL}/[A-Za-z0-9]+)"',
+            response.data.decode('utf-8')
+        ).group(1)
+        short_id = short_link.rsplit('/', 1)[-1]
+        with client.application.app_context():
+            url_map = URLMap.query.filter_by(short=short_id).first()
+        assert re.fullmatch(
+            r'disk:/[0-9a-f]{16}_image\.png', url_map.original
+        ), (
+            'Для файлов в базе данных должен храниться путь на Диске.'
+        )
+        response = client.get(f'/{short_id}')
+        assert response.status_code == HTTPStatus.FOUND
+        assert response.location.startswith(
+            f'http://{server.host}:{server.port}'), (
+            'Переход по короткой ссылке на файл должен перенаправлять на '
+            'ссылку для скачивания, полученную от API Диска.'
+        )
+        assert client.get(f'/{short_id}').location == response.location
+        assert client.get(f'/api/id/{short_id}/').json == {
+            'url': response.location
+        }
+        assert server.app['stats']['download_links'] == 1, (
+            'Ссылка для скачивания должна кешироваться после первого '
+            'запроса к API Диска.'
+        )
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, sync_test)
+
+
+async def test_repeated_upload_is_deduplicated(client, mock_server,
+                                               monkeypatch):
+    server, user_calls = await mock_server
+    await intercept_requests(server, monkeypatch)
+    content = generate_png_bytes()
+
+    def sync_test():
+        client.post(FILES_URL, data={'files': [
+            (BytesIO(content), 'first.png'),
+            (BytesIO(content), 'copy.png'),
+        ]})
+        assert server.app['stats']['uploads'] == 1, (
+            'Одинаковые файлы в одном запросе должны загружаться на Диск '
+            'один раз.'
+        )
+        user_calls.clear()
+        response = client.post(FILES_URL, data={
+            'files': [(BytesIO(content), 'again.png')]
+        })
+        assert 'again.png' in response.data.decode('utf-8')
+        assert not user_calls, (
+            'Повторная загрузка файла с тем же содержимым не должна '
+            'обращаться к API Диска.'
+        )
+        with client.application.app_context():
+            originals = {url_map.original for url_map in URLMap.query}
+            assert len(URLMap.query.all()) == 3
+        assert len(originals) == 1, (
+            'Ссылки на одинаковые файлы должны указывать на один путь '
+            'на Диске.'
+        )
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, sync_test)
+
+
+async def test_upload_retries_taken_generated_id(
+        client, mock_server, monkeypatch, short_python_url):
+    server, _ = await mock_server
+    await intercept_requests(server, monkeypatch)
+    codes = iter([short_python_url.short, 'abc123'])
+    monkeypatch.setattr(short_id_allocator, 'allocate', lambda: next(codes))
+
+    def sync_test():
+        response = client.post(FILES_URL, data={
+            'files': [(BytesIO(generate_png_bytes()), 'image.png')]
+        })
+        assert response.status_code == HTTPStatus.OK, (
+            'Если сгенерированная короткая ссылка уже занята, её нужно '
+            'сгенерировать заново, а не возвращать ошибку.'
+        )
+        assert f'{TEST_BASE_URL}/abc123' in response.data.decode('utf-8')
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, sync_test)
+
+
+async def test_resumable_upload(client, mock_server, monkeypatch, tmp_path):
+    server, _ = await mock_server
+    await intercept_requests(server, monkeypatch)
+    monkeypatch.setitem(
+        client.application.config, 'UPLOAD_TMP_DIR', str(tmp_path))
+    content = generate_png_bytes()
+    middle = len(content) // 2
+
+    def sync_test():
+        response = client.post(UPLOADS_URL, json={
+            'filename': 'image.png', 'size': len(content)})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json['offset'] == 0
+        upload_url = f'{UPLOADS_URL}{response.json["upload_id"]}/'
+        response = client.put(upload_url, data=content[:middle],
+                              headers={'Upload-Offset': '0'})
+        assert response.json['offset'] == middle
+        assert 'short_link' not in response.json
+        assert client.get(upload_url).json['offset'] == middle, (
+            'Состояние загрузки должно сообщать позицию, с которой '
+            'продолжать передачу файла.'
+        )
+        assert server.app['stats']['uploads'] == 0, (
+            'Файл должен загружаться на Диск только после получения '
+            'последней части.'
+        )
+        response = client.put(upload_url, data=content[middle:],
+                              headers={'Upload-Offset': str(middle)})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json['offset'] == len(content)
+        assert server.app['stats']['uploads'] == 1
+        short_link = response.json['short_link']
+        assert short_link.startswith(TEST_BASE_URL)
+        response = client.get(short_link[len(TEST_BASE_URL):])
+        assert response.status_code == HTTPStatus.FOUND, (
+            'Короткая ссылка на файл, загруженный по частям, должна '
+            'перенаправлять на ссылку для скачивания.'
+        )
+        assert not list(tmp_path.iterdir()), (
+            'Временный файл должен удаляться после загрузки на Диск.'
+        )
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, sync_test)
+
+
+def test_resumable_upload_rejects_wrong_offset(client, tmp_path,
+                                               monkeypatch):
+    monkeypatch.setitem(
+        client.application.config, 'UPLOAD_TMP_DIR', str(tmp_path))
+    response = client.post(UPLOADS_URL, json={
+        'filename': 'archive.zip', 'size': 10})
+    upload_url = f'{UPLOADS_URL}{response.json["upload_id"]}/'
+    response = client.put(upload_url, data=b'12345',
+                          headers={'Upload-Offset': '3'})
+    assert response.status_code == HTTPStatus.CONFLICT, (
+        'Часть файла, отправленная не с текущей позиции загрузки, '
+        f'должна отклоняться со статусом {HTTPStatus.CONFLICT.value}.'
+    )
+    assert client.put(upload_url, data=b'12345').status_code == (
+        HTTPStatus.BAD_REQUEST)
+    assert client.get(upload_url).json['offset'] == 0
+    assert client.get(f'{UPLOADS_URL}unknown/').status_code == (
+        HTTPStatus.NOT_FOUND)
+    assert client.post(UPLOADS_URL, json={
+        'filename': 'script.exe', 'size': 10}).status_code == (
+        HTTPStatus.BAD_REQUEST)
+
+
+@pytest.mark.parametrize('spooled', [None, b'12'])
+def test_resumable_upload_rewinds_to_spooled_size(client, tmp_path,
+                                                  monkeypatch, spooled):
+    monkeypatch.setitem(
+        client.application.config, 'UPLOAD_TMP_DIR', str(tmp_path))
+    upload_id = client.post(UPLOADS_URL, json={
+        'filename': 'archive.zip', 'size': 10}).json['upload_id']
+    upload_url = f'{UPLOADS_URL}{upload_id}/'
+    client.put(upload_url, data=b'12345', headers={'Upload-Offset': '0'})
+    spool = tmp_path / upload_id
+    if spooled is None:
+        spool.unlink()
+    else:
+        spool.write_bytes(spooled)
+    expected = len(spooled or b'')
+    response = client.put(upload_url, data=b'67890',
+                          headers={'Upload-Offset': '5'})
+    assert response.status_code == HTTPStatus.CONFLICT, (
+        'Если временный файл короче принятой части, загрузка должна '
+        'отклоняться и продолжаться с его фактического размера.'
+    )
+    assert response.json == {
+        'message': f'Загрузка продолжается с позиции {expected}'}
+    assert client.get(upload_url).json['offset'] == expected
+    response = client.put(upload_url, data=b'12345'[expected:],
+                          headers={'Upload-Offset': str(expected)})
+    assert response.json['offset'] == 5
+    assert spool.read_bytes() == b'12345'
+
+
+def test_purge_uploads_command(client, cli_runner, tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        client.application.config, 'UPLOAD_TMP_DIR', str(tmp_path))
+    ids = [
+        client.post(UPLOADS_URL, json={
+            'filename': 'archive.zip', 'size': 10}).json['upload_id']
+        for _ in range(3)
+    ]
+    for upload_id in ids:
+        client.put(f'{UPLOADS_URL}{upload_id}/', data=b'12345',
+                   headers={'Upload-Offset': '0'})
+    stale, fresh = ids[:2], ids[2]
+    UploadSession.query.filter(UploadSession.id.in_(stale)).update(
+        {'timestamp': datetime.utcnow() - timedelta(days=2)})
+    db.session.commit()
+    result = cli_runner.invoke(args=['purge-uploads', '--batch-size', '1'])
+    assert result.exit_code == 0
+    assert '2' in result.output
+    assert [upload.id for upload in UploadSession.query] == [fresh], (
+        'Команда `purge-uploads` должна удалять только давно не '
+        'обновлявшиеся загрузки.'
+    )
+    assert [path.name for path in tmp_path.iterdir()] == [fresh], (
+        'Вместе с сессией загрузки должен удаляться её временный файл.'
+    )
+
+
+@pytest.mark.parametrize('filename', [
+    '../../x.png', 'a/b.png', 'a\\b.png', 'a\nb.png',
+])
+def test_resumable_upload_rejects_paths(client, filename):
+    response = client.post(UPLOADS_URL, json={
+        'filename': filename, 'size': 10})
+    assert response.status_code == HTTPStatus.BAD_REQUEST, (
+        'Имя файла с разделителями пути или управляющими символами '
+        'должно отклоняться: оно становится частью пути на Диске.'
+    )
+    assert response.json == {'message': 'Недопустимое имя файла'}
+
+
+def test_file_chunks_are_read_off_the_loop():
+    readers = []
+
+    class Stream(BytesIO):
+        def read(self, size=-1):
+            readers.append(threading.current_thread())
+            return super().read(size)
+
+    async def read_all():
+        file = FileStorage(stream=Stream(b'abcde'), filename='notes.txt')
+        return [chunk async for chunk in iter_file_chunks(file, 2)]
+
+    assert asyncio.run(read_all()) == [b'ab', b'cd', b'e']
+    assert threading.main_thread() not in readers, (
+        'Файл должен читаться вне потока цикла событий.'
+    )
+
+
+def test_disk_name_stays_in_folder():
+    assert get_disk_name('0' * 64, '../../x.png') == (
+        '0000000000000000_.._.._x.png')
+    assert get_disk_name('0' * 64, 'картинка 1.png') == (
+        '0000000000000000_картинка 1.png')
+
+
+def enable_upload_queue(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'UPLOAD_QUEUE_ENABLED', True)
+    monkeypatch.setitem(app.config, 'UPLOAD_QUEUE_WORKERS', 0)
+    monkeypatch.setitem(app.config, 'UPLOAD_TMP_DIR', str(tmp_path))
+
+
+async def test_queued_upload(client, mock_server, monkeypatch, tmp_path):
+    server, user_calls = await mock_server
+    await intercept_requests(server, monkeypatch)
+    enable_upload_queue(client.application, monkeypatch, tmp_path)
+
+    def sync_test():
+        response = client.post(FILES_URL, data={
+            'files': [(BytesIO(generate_png_bytes()), 'image.png')]
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert not user_calls, (
+            'При включённой очереди загрузок страница `/files` не должна '
+            'ждать загрузки файлов на Диск.'
+        )
+        short_id = re.search(
+            rf'{TEST_BASE_URL}/(\w+)', response.data.decode('utf-8')
+        ).group(1)
+        status_url = f'/api/id/{short_id}/status/'
+        assert client.get(status_url).json['status'] == UploadJob.PENDING
+        response = client.get(f'/{short_id}')
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+            'Ссылка на файл, который ещё загружается, должна возвращать '
+            f'статус {HTTPStatus.SERVICE_UNAVAILABLE.value}.'
+        )
+        with client.application.app_context():
+            assert run_pending_jobs() == 1
+            assert run_pending_jobs() == 0
+        assert server.app['stats']['uploads'] == 1
+        assert client.get(status_url).json['status'] == UploadJob.DONE
+        assert client.get(f'/{short_id}').status_code == HTTPStatus.FOUND, (
+            'После загрузки файла фоновым обработчиком короткая ссылка '
+            'должна перенаправлять на ссылку для скачивания.'
+        )
+        assert not list(tmp_path.iterdir())
 
     loop = asyncio.get_running_loop()
     await loop.run_in_executor(None, sync_test)
+
+
+def test_queued_upload_retries_then_fails(client, monkeypatch, tmp_path):
+    enable_upload_queue(client.application, monkeypatch, tmp_path)
+    monkeypatch.setitem(client.application.config,
+                        'UPLOAD_JOB_MAX_ATTEMPTS', 2)
+    attempts = []
+
+    async def failing_store_spooled(spool_id, filename):
+        attempts.append(spool_id)
+        return UploadResult(filename, None, 'Не удалось загрузить файл')
+
+    monkeypatch.setattr('yacut.jobs.store_spooled', failing_store_spooled)
+    response = client.post(FILES_URL, data={
+        'files': [(BytesIO(b'text'), 'notes.txt')]
+    })
+    short_id = re.search(
+        rf'{TEST_BASE_URL}/(\w+)', response.data.decode('utf-8')).group(1)
+    assert run_pending_jobs() == 1, (
+        'Неудачная загрузка не должна повторяться сразу же: следующая '
+        'попытка откладывается на `UPLOAD_JOB_RETRY_DELAY`.'
+    )
+    job = UploadJob.query.filter_by(short=short_id).one()
+    assert job.status == UploadJob.PENDING
+    retry_after = (job.not_before - job.updated_at).total_seconds()
+    assert retry_after == client.application.config['UPLOAD_JOB_RETRY_DELAY']
+    job.not_before = datetime.utcnow()
+    db.session.commit()
+    assert run_pending_jobs() == 1, (
+        'Неудачная загрузка должна повторяться до '
+        '`UPLOAD_JOB_MAX_ATTEMPTS` раз.'
+    )
+    assert len(attempts) == 2
+    state = client.get(f'/api/id/{short_id}/status/').json
+    assert state['status'] == UploadJob.FAILED
+    assert state['error'] == 'Не удалось загрузить файл'
+    assert client.get(f'/{short_id}').status_code == HTTPStatus.NOT_FOUND
+    assert not list(tmp_path.iterdir())
+
+
+def test_queued_upload_runs_on_its_host(client, monkeypatch, tmp_path):
+    enable_upload_queue(client.application, monkeypatch, tmp_path)
+    monkeypatch.setitem(client.application.config,
+                        'UPLOAD_QUEUE_HOST', 'spooler')
+    client.post(FILES_URL, data={'files': [(BytesIO(b'text'), 'notes.txt')]})
+    monkeypatch.setitem(client.application.config,
+                        'UPLOAD_QUEUE_HOST', 'other')
+    assert run_pending_jobs() == 0, (
+        'Задание должно выполняться только на хосте, где лежит '
+        'временный файл.'
+    )
+    assert UploadJob.query.one().host == 'spooler'
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_upload_workers_start_with_app(_app, monkeypatch, enabled):
+    monkeypatch.setitem(_app.config, 'UPLOAD_QUEUE_ENABLED', enabled)
+    started = []
+    monkeypatch.setattr(upload_workers, 'start', lambda: started.append(1))
+    start_upload_workers()
+    assert bool(started) == enabled, (
+        'Обработчики очереди загрузок должны запускаться вместе с '
+        'приложением, только если очередь включена.'
+    )
+
+
+def test_queued_upload_retries_taken_generated_id(
+        client, monkeypatch, tmp_path, short_python_url):
+    enable_upload_queue(client.application, monkeypatch, tmp_path)
+    codes = iter([short_python_url.short, 'abc123'])
+    monkeypatch.setattr(short_id_allocator, 'allocate', lambda: next(codes))
+    response = client.post(FILES_URL, data={
+        'files': [(BytesIO(b'text'), 'notes.txt')]
+    })
+    assert response.status_code == HTTPStatus.OK
+    assert f'{TEST_BASE_URL}/abc123' in response.data.decode('utf-8')
+    assert UploadJob.query.filter_by(short='abc123').count() == 1
+    assert URLMap.query.filter_by(short='py').one().original == (
+        short_python_url.original)
+
+
+def test_stored_file_is_listed_in_files(client, short_python_url):
+    link = URLMap.create_file_link('disk:/app/notes.txt')
+    response = client.post('/api/id/resolve/', json=[link.short, 'py'])
+    assert response.json == {
+        'urls': {'py': PY_URL}, 'missing': [], 'files': [link.short],
+        'pending': []
+    }, (
+        'Пути к файлам на Диске не должны возвращаться как ссылки: '
+        'идентификаторы загруженных файлов перечисляются в `files`.'
+    )
+
+
+def test_pending_upload_is_not_resolved(client, monkeypatch, tmp_path):
+    enable_upload_queue(client.application, monkeypatch, tmp_path)
+    response = client.post(FILES_URL, data={
+        'files': [(BytesIO(b'text'), 'notes.txt')]
+    })
+    short_id = re.search(
+        rf'{TEST_BASE_URL}/(\w+)', response.data.decode('utf-8')).group(1)
+    assert client.post('/api/id/resolve/', json=[short_id]).json == {
+        'urls': {}, 'missing': [], 'files': [], 'pending': [short_id]
+    }, (
+        'Файлы, которые ещё загружаются, не должны возвращаться как '
+        'ссылки: их идентификаторы перечисляются в `pending`.'
+    )
+    assert client.get(f'/{short_id}').status_code == (
+        HTTPStatus.SERVICE_UNAVAILABLE)
+    _, expires = resolution_cache._data[short_id]
+    assert expires - time.monotonic() <= resolution_cache.negative_ttl, (
+        'Ссылка на загружающийся файл должна кешироваться не дольше '
+        '`RESOLUTION_CACHE_NEGATIVE_TTL`.'
+    )
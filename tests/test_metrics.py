@@ -0,0 +1,195 @@
+import threading
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from werkzeug.datastructures import FileStorage
+
+from settings import get_engine_options
+from tests.conftest import PY_URL
+from tests.yandex_disk_mock_server import intercept_requests
+from yacut.metrics import (
+    Counter,
+    Histogram,
+    PoolMetrics,
+    collectors,
+    db_query_seconds,
+    disk_request_seconds,
+    format_metric,
+    request_seconds,
+    short_id_allocations
+)
+from yacut.yadisk import upload_files_to_yadisk
+
+
+def test_engine_options_from_environment():
+    assert get_engine_options({}) == {}, (
+        'Без переменных `DB_POOL_*` настройки пула менять не нужно.'
+    )
+    assert get_engine_options({
+        'DB_POOL_SIZE': '20',
+        'DB_MAX_OVERFLOW': '5',
+        'DB_POOL_RECYCLE': '1800',
+        'DB_POOL_TIMEOUT': '2.5',
+        'DB_POOL_PRE_PING': 'True',
+    }) == {
+        'pool_size': 20,
+        'max_overflow': 5,
+        'pool_recycle': 1800,
+        'pool_timeout': 2.5,
+        'pool_pre_ping': True,
+    }
+
+
+def test_format_metric():
+    assert format_metric('hits_total', 'counter', 'Hits.', [
+        ('', {'bind': 'a"b'}, 3),
+    ]) == [
+        '# HELP hits_total Hits.',
+        '# TYPE hits_total counter',
+        'hits_total{bind="a\\"b"} 3',
+    ]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f'sqlite:///{tmp_path / "pool.sqlite3"}',
+        pool_size=1, max_overflow=0, pool_timeout=0.1)
+    yield engine
+    engine.dispose()
+
+
+def test_pool_metrics_count_checkouts_and_timeouts(engine):
+    metrics = PoolMetrics()
+    metrics.instrument({None: engine})
+    metrics.instrument({None: engine})
+    with engine.connect() as connection:
+        connection.execute(text('select 1'))
+        stats = metrics.stats()['default']
+        assert stats['checked_out'] == 1
+        assert stats['size'] == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    stats = metrics.stats()['default']
+    assert stats['checkouts'] == 2, (
+        'Повторная инструментация движка не должна удваивать счётчики.'
+    )
+    assert stats['timeouts'] == 1
+    assert stats['wait_seconds'] >= 0.1
+    assert stats['checked_out'] == 0
+    lines = metrics.render()
+    assert 'yacut_db_pool_timeouts_total{bind="default"} 1' in lines
+    assert 'yacut_db_pool_checked_out{bind="default"} 0' in lines
+
+
+def test_metrics_endpoint(client):
+    response = client.get('/metrics')
+    assert response.status_code == HTTPStatus.OK
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert 'yacut_db_pool_wait_seconds_count{bind="default"}' in (
+        response.get_data(as_text=True)), (
+        'Эндпоинт `/metrics` должен отдавать метрики пула соединений.'
+    )
+
+
+@pytest.fixture
+def metric_family():
+    created = []
+
+    def create(metric_class, *args, **kwargs):
+        metric = metric_class(*args, **kwargs)
+        created.append(metric)
+        return metric
+
+    yield create
+    for metric in created:
+        collectors.remove(metric)
+
+
+def test_counter_sums_thread_shards(metric_family):
+    counter = metric_family(
+        Counter, 'test_hits_total', 'Hits.', ('route',))
+
+    def work():
+        for _ in range(1000):
+            counter.inc('a')
+        counter.inc('b', amount=5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    counter.inc('a')
+    for thread in threads:
+        thread.join()
+    assert counter.collect() == {('a',): 4001, ('b',): 20}
+    assert len(counter._shards) == 1, (
+        'Шарды завершившихся потоков должны объединяться при сборе метрик.'
+    )
+    assert counter.collect() == {('a',): 4001, ('b',): 20}
+    assert 'test_hits_total{route="b"} 20' in counter.render()
+
+
+def test_histogram_buckets(metric_family):
+    histogram = metric_family(
+        Histogram, 'test_seconds', 'Latency.', buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        'test_seconds_sum 3.65',
+        'test_seconds_count 4',
+    ]
+
+
+def count_observations(histogram, *labels):
+    values = histogram.collect().get(labels)
+    return sum(values[:-1]) if values else 0
+
+
+def test_hot_paths_are_instrumented(client):
+    allocations = short_id_allocations.collect().get((), 0)
+    redirects = count_observations(request_seconds, 'redirect_view')
+    selects = count_observations(db_query_seconds, 'select')
+    response = client.post('/api/id/', json={'url': PY_URL})
+    assert response.status_code == HTTPStatus.CREATED
+    short_id = response.json['short_link'].rsplit('/', 1)[1]
+    client.get(f'/{short_id}')
+    client.get('/missing')
+    assert short_id_allocations.collect()[()] == allocations + 1
+    assert count_observations(
+        request_seconds, 'redirect_view') == redirects + 2, (
+        'Длительность каждого запроса должна учитываться в гистограмме '
+        'своего эндпоинта.'
+    )
+    assert count_observations(db_query_seconds, 'select') > selects
+    text = client.get('/metrics').get_data(as_text=True)
+    for line in (
+        'yacut_request_duration_seconds_count{endpoint="create_short_link"}',
+        'yacut_responses_total{endpoint="redirect_view",status="404"}',
+        'yacut_db_query_duration_seconds_count{operation="insert"}',
+        'yacut_resolution_cache_hits',
+        'yacut_click_recorder_recorded',
+    ):
+        assert line in text, (
+            f'В выводе `/metrics` не найдена метрика `{line}`.'
+        )
+
+
+async def test_disk_steps_are_timed(_app, mock_server, monkeypatch):
+    mock_server, _ = await mock_server
+    await intercept_requests(mock_server, monkeypatch)
+    before = {
+        step: count_observations(disk_request_seconds, step)
+        for step in ('upload_link', 'upload')
+    }
+    await upload_files_to_yadisk(
+        [FileStorage(stream=BytesIO(b'content'), filename='a.txt')])
+    for step, count in before.items():
+        assert count_observations(disk_request_seconds, step) == count + 1, (
+            f'Длительность шага `{step}` запроса к API Диска не учтена.'
+        )
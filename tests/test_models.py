@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.conftest import PY_URL
+from yacut import db
+from yacut.cache import resolution_cache
+from yacut.models import URLMap, short_id_allocator
+from yacut.utils import normalize_url
+
+
+def test_duplicate_custom_id_maps_to_exists_error(_app, short_python_url,
+                                                  duplicated_custom_id_msg):
+    with pytest.raises(ValueError, match=duplicated_custom_id_msg):
+        URLMap.validate_user_code(PY_URL, short_python_url.short)
+    assert URLMap.query.count() == 1
+
+
+def test_generated_id_conflict_is_retried(_app, short_python_url,
+                                         monkeypatch):
+    codes = iter([short_python_url.short, 'abc123'])
+    monkeypatch.setattr(short_id_allocator, 'allocate', lambda: next(codes))
+    obj = URLMap.validate_user_code(PY_URL)
+    assert obj.short == 'abc123', (
+        'При конфликте сгенерированной короткой ссылки её нужно '
+        'сгенерировать заново и повторить вставку.'
+    )
+    assert URLMap.query.count() == 2
+
+
+@pytest.mark.parametrize('custom_id', ['py', None])
+def test_create_is_single_insert(statements, custom_id):
+    URLMap.get_unique_short_id()
+    statements.clear()
+    obj = URLMap.validate_user_code(PY_URL, custom_id)
+    assert obj.original == PY_URL and obj.short
+    assert [sql.split()[0] for sql in statements] == ['INSERT'], (
+        'Создание ссылки в обычном случае должно обходиться одним '
+        'запросом INSERT без предварительной проверки через SELECT.'
+    )
+
+
+def test_create_batch_single_insert(statements):
+    URLMap.get_unique_short_id()
+    statements.clear()
+    results = URLMap.create_batch([(PY_URL, None)] * 3 + [(PY_URL, 'py')])
+    assert all(isinstance(result, tuple) for result in results)
+    assert [sql.split()[0] for sql in statements] == ['SELECT', 'INSERT'], (
+        'Пакетное создание должно проверять пользовательские ссылки одним '
+        'запросом и вставлять все строки одним executemany.'
+    )
+
+
+def test_create_batch_falls_back_on_race(_app, short_python_url,
+                                         monkeypatch):
+    monkeypatch.setattr(
+        short_id_allocator, 'allocate_many',
+        lambda count: [short_python_url.short] * count)
+    results = URLMap.create_batch([(PY_URL, None), (PY_URL, 'other')])
+    assert [result[1] for result in results][1] == 'other'
+    assert results[0][1] != short_python_url.short
+    assert URLMap.query.count() == 3
+
+
+def test_resolve_many_single_query(statements, short_python_url):
+    URLMap.get_by_short(short_python_url.short)
+    statements.clear()
+    resolved = URLMap.resolve_many(['py', 'a', 'b'])
+    assert resolved == {'py': PY_URL, 'a': None, 'b': None}
+    assert len(statements) == 1, (
+        'Идентификаторы, которых нет в кеше, должны разрешаться одним '
+        'запросом `IN (...)`.'
+    )
+    URLMap.resolve_many(['py', 'a', 'b'])
+    assert len(statements) == 1, (
+        'Повторное разрешение должно обслуживаться из кеша, включая промахи.'
+    )
+
+
+def test_get_original_bypasses_orm(statements, short_python_url):
+    db.session.expunge_all()
+    statements.clear()
+    assert URLMap.get_original(short_python_url.short) == PY_URL
+    assert URLMap.get_original('missing') is None
+    assert len(statements) == 2
+    assert not db.session.identity_map, (
+        'Разрешение короткой ссылки не должно создавать ORM-объекты.'
+    )
+    assert URLMap.get_original(short_python_url.short) == PY_URL
+    assert URLMap.get_original('missing') is None
+    assert len(statements) == 2
+
+
+def test_expired_link_is_not_resolved(_app, monkeypatch):
+    obj = URLMap.validate_user_code(
+        PY_URL, 'soon', expires_at=datetime.utcnow() + timedelta(minutes=1))
+    assert URLMap.get_original(obj.short) == PY_URL
+    later = datetime.utcnow() + timedelta(minutes=2)
+    monkeypatch.setattr(
+        'yacut.models.datetime', type('FrozenDatetime', (datetime,), {
+            'utcnow': staticmethod(lambda: later)}))
+    resolution_cache.clear()
+    assert URLMap.get_original(obj.short) is None, (
+        'Ссылка с истёкшим сроком действия не должна разрешаться.'
+    )
+    assert URLMap.resolve_many([obj.short]) == {obj.short: None}
+
+
+def test_expiring_link_is_cached_no_longer_than_it_lives(_app):
+    URLMap.validate_user_code(
+        PY_URL, 'soon', expires_at=datetime.utcnow() + timedelta(seconds=30))
+    _, expires_at = resolution_cache._data['soon']
+    assert expires_at - resolution_cache._clock() <= 30
+
+
+def test_expires_at_must_be_in_future(_app):
+    with pytest.raises(ValueError):
+        URLMap.validate_user_code(PY_URL, expires_at='2000-01-01T00:00:00')
+    with pytest.raises(ValueError):
+        URLMap.validate_user_code(PY_URL, expires_at='tomorrow')
+    assert URLMap.query.count() == 0
+
+
+def test_purge_expired_in_batches(statements):
+    now = datetime.utcnow()
+    db.session.add_all([
+        URLMap(original=PY_URL, short=f'old{number}',
+               expires_at=now - timedelta(minutes=number + 1))
+        for number in range(5)
+    ] + [
+        URLMap(original=PY_URL, short='fresh',
+               expires_at=now + timedelta(days=1)),
+        URLMap(original=PY_URL, short='forever'),
+    ])
+    db.session.commit()
+    statements.clear()
+    assert URLMap.purge_expired(batch_size=2) == 5
+    deletes = [
+        statement for statement in statements
+        if statement.startswith('DELETE')]
+    assert len(deletes) == 3, (
+        'Ссылки с истёкшим сроком действия должны удаляться пачками.'
+    )
+    assert {obj.short for obj in URLMap.query} == {'fresh', 'forever'}
+
+
+def test_purge_expired_command(cli_runner, _app):
+    db.session.add(URLMap(original=PY_URL, short='old',
+                          expires_at=datetime.utcnow() - timedelta(days=1)))
+    db.session.commit()
+    result = cli_runner.invoke(args=['purge-expired'])
+    assert result.exit_code == 0
+    assert '1' in result.output
+    assert URLMap.query.count() == 0
+
+
+@pytest.fixture
+def dedup(_app):
+    _app.config['URL_DEDUP_ENABLED'] = True
+    yield
+    _app.config['URL_DEDUP_ENABLED'] = False
+
+
+def test_normalize_url():
+    assert normalize_url('HTTPS://Python.ORG:443') == 'https://python.org/'
+    assert normalize_url('http://user@Host:8080/A?b=C#D') == (
+        'http://user@host:8080/A?b=C#D')
+
+
+def test_dedup_returns_existing_short_id(statements, dedup):
+    first = URLMap.validate_user_code(PY_URL)
+    statements.clear()
+    again = URLMap.validate_user_code('HTTPS://WWW.python.org:443/')
+    assert again.short == first.short, (
+        'В режиме дедупликации повторное сокращение того же URL должно '
+        'возвращать уже существующую короткую ссылку.'
+    )
+    assert [sql.split()[0] for sql in statements] == ['SELECT']
+    assert 'original_hash' in statements[0]
+    assert URLMap.query.count() == 1
+    custom = URLMap.validate_user_code(PY_URL, 'py')
+    expiring = URLMap.validate_user_code(
+        PY_URL, expires_at=datetime.utcnow() + timedelta(days=1))
+    assert len({first.short, custom.short, expiring.short}) == 3, (
+        'Ссылки с собственным коротким идентификатором или сроком '
+        'действия не должны объединяться с существующими.'
+    )
+
+
+def test_dedup_in_batch(statements, dedup):
+    existing = URLMap.validate_user_code(PY_URL)
+    statements.clear()
+    results = URLMap.create_batch([
+        (PY_URL, None),
+        ('https://example.com', None),
+        ('HTTPS://example.com:443/', None),
+        (PY_URL, 'py'),
+    ])
+    assert results[0] == (PY_URL, existing.short)
+    assert results[1][1] == results[2][1] != existing.short
+    assert results[3] == (PY_URL, 'py')
+    assert [sql.split()[0] for sql in statements] == [
+        'SELECT', 'SELECT', 'INSERT']
+    assert URLMap.query.count() == 3
+
+
+def test_dedup_is_off_by_default(_app):
+    assert URLMap.validate_user_code(PY_URL).short != (
+        URLMap.validate_user_code(PY_URL).short)
+
+
+def test_hash_urls_command(cli_runner, _app, dedup):
+    db.session.add_all([
+        URLMap(original=PY_URL, short='old'),
+        URLMap(original='disk:/file.txt', short='file'),
+    ])
+    db.session.commit()
+    result = cli_runner.invoke(args=['hash-urls', '--batch-size', '1'])
+    assert result.exit_code == 0
+    assert '1' in result.output
+    assert URLMap.validate_user_code(PY_URL).short == 'old', (
+        'После расчёта хешей старые ссылки должны участвовать '
+        'в дедупликации.'
+    )
@@ -0,0 +1,133 @@
+import os
+import signal
+import sys
+import time
+from http import HTTPStatus
+
+import pytest
+
+from yacut import views
+from yacut.profiling import collapse_stack, handle_sighup, reload_settings
+
+SLOW_DELAY = 0.05
+
+
+def test_collapse_stack():
+    stack = collapse_stack(sys._getframe())
+    assert stack.endswith('test_collapse_stack (test_profiling.py:15)')
+    assert stack.count(';') > 1
+
+
+@pytest.fixture
+def profiling(_app, tmp_path):
+    _app.config.update(
+        PROFILING_ENABLED=True,
+        PROFILING_SAMPLE_RATE=0,
+        PROFILING_SLOW_THRESHOLD=0,
+        PROFILING_INTERVAL=0.001,
+        PROFILING_DIR=str(tmp_path),
+    )
+    yield _app.config
+    _app.config.update(PROFILING_ENABLED=False)
+
+
+@pytest.fixture
+def slow_redirect(monkeypatch):
+    get_redirect_location = views.get_redirect_location
+
+    def slow_get_redirect_location(url):
+        time.sleep(SLOW_DELAY)
+        return get_redirect_location(url)
+
+    def slow_down():
+        monkeypatch.setattr(
+            views, 'get_redirect_location', slow_get_redirect_location)
+
+    return slow_down
+
+
+def read_profiles(directory):
+    return {
+        path.name: path.read_text() for path in directory.glob('*.collapsed')
+    }
+
+
+def test_sampled_request_is_dumped(client, profiling, tmp_path,
+                                   short_python_url, slow_redirect):
+    profiling['PROFILING_SAMPLE_RATE'] = 1
+    slow_redirect()
+    response = client.get('/py')
+    assert response.status_code == HTTPStatus.FOUND
+    profiles = read_profiles(tmp_path)
+    assert len(profiles) == 1, (
+        'Для каждого профилируемого запроса должен записываться файл '
+        'со стеками вызовов.'
+    )
+    name, content = profiles.popitem()
+    assert '-GET_py-' in name
+    assert 'redirect_view (views.py:' in content
+    assert 'slow_get_redirect_location (test_profiling.py:' in content
+    for line in content.splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+
+
+def test_only_slow_requests_are_dumped(client, profiling, tmp_path,
+                                       short_python_url, slow_redirect):
+    profiling['PROFILING_SLOW_THRESHOLD'] = SLOW_DELAY / 2
+    client.get('/py')
+    assert read_profiles(tmp_path) == {}, (
+        'Быстрые запросы не должны сохраняться при заданном пороге '
+        '`PROFILING_SLOW_THRESHOLD`.'
+    )
+    slow_redirect()
+    client.get('/py')
+    assert len(read_profiles(tmp_path)) == 1
+
+
+def test_profiling_can_be_switched_off(client, profiling, tmp_path,
+                                       short_python_url, slow_redirect):
+    profiling.update(PROFILING_SAMPLE_RATE=1, PROFILING_ENABLED=False)
+    slow_redirect()
+    client.get('/py')
+    assert read_profiles(tmp_path) == {}
+
+
+@pytest.fixture
+def profiling_settings(_app):
+    saved = {
+        name: value for name, value in _app.config.items()
+        if name.startswith('PROFILING_')
+    }
+    yield _app.config
+    _app.config.update(saved)
+
+
+def test_reload_settings_prefers_env_file(profiling_settings, tmp_path,
+                                          monkeypatch):
+    (tmp_path / '.env').write_text(
+        'PROFILING_ENABLED=True\nPROFILING_SAMPLE_RATE=0.5\n')
+    monkeypatch.chdir(tmp_path)
+    reload_settings(environ={
+        'PROFILING_SAMPLE_RATE': '0.1', 'PROFILING_SLOW_THRESHOLD': '2'})
+    assert profiling_settings['PROFILING_ENABLED'] is True
+    assert profiling_settings['PROFILING_SAMPLE_RATE'] == 0.5, (
+        'Значения из файла `.env` должны иметь приоритет над переменными '
+        'окружения запущенного процесса.'
+    )
+    assert profiling_settings['PROFILING_SLOW_THRESHOLD'] == 2
+
+
+@pytest.mark.skipif(
+    not hasattr(signal, 'SIGHUP'), reason='SIGHUP is not available')
+def test_sighup_reloads_settings(profiling_settings, tmp_path, monkeypatch):
+    assert signal.getsignal(signal.SIGHUP) is handle_sighup, (
+        'Обработчик `SIGHUP` должен устанавливаться при импорте приложения.'
+    )
+    (tmp_path / '.env').write_text('PROFILING_ENABLED=True\n')
+    monkeypatch.chdir(tmp_path)
+    os.kill(os.getpid(), signal.SIGHUP)
+    assert profiling_settings['PROFILING_ENABLED'] is True, (
+        'Профилирование должно включаться без перезапуска процесса: '
+        'по сигналу `SIGHUP` настройки перечитываются.'
+    )
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine, event, insert
+
+from tests.conftest import PY_URL
+from yacut import db
+from yacut.cache import resolution_cache
+from yacut.models import URLMap
+from yacut.replicas import ReplicaRouter
+
+
+def make_replica(path, links=()):
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for short, original in links:
+            connection.execute(
+                insert(URLMap), dict(short=short, original=original))
+    engine.queries = 0
+
+    def count(*args):
+        engine.queries += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+    return engine
+
+
+@pytest.fixture
+def replicas(_app, tmp_path, monkeypatch):
+    engines = [
+        make_replica(tmp_path / f'replica{number}.sqlite3',
+                     [('py', PY_URL)])
+        for number in range(2)
+    ]
+    router = ReplicaRouter(retry_after=30, engines=engines)
+    monkeypatch.setattr('yacut.models.replica_router', router)
+    yield router
+    for engine in engines:
+        engine.dispose()
+
+
+def test_reads_are_spread_over_replicas(replicas):
+    for _ in range(4):
+        assert URLMap.get_original('py') == PY_URL
+        resolution_cache.invalidate('py')
+    assert [engine.queries for engine in replicas.engines] == [2, 2], (
+        'Чтения должны распределяться между репликами по очереди.'
+    )
+    assert URLMap.query.count() == 0
+
+
+def test_failed_replica_is_skipped(replicas, tmp_path):
+    broken = create_engine(f'sqlite:///{tmp_path}/missing/replica.sqlite3')
+    replicas._engines = [broken] + replicas.engines
+    for _ in range(3):
+        assert replicas.first(
+            URLMap.__table__.select().where(URLMap.short == 'py'))
+    assert replicas.failures == 1, (
+        'Недоступная реплика должна исключаться из ротации на '
+        '`REPLICA_RETRY_AFTER` секунд.'
+    )
+    assert replicas.stats()['down'] == 1
+
+
+def test_new_link_is_read_from_primary(replicas):
+    URLMap.validate_user_code(PY_URL, 'fresh')
+    resolution_cache.clear()
+    assert URLMap.get_original('fresh') == PY_URL, (
+        'Ссылка, которой ещё нет на репликах, должна читаться с основной '
+        'базы данных.'
+    )
+    assert URLMap.resolve_many(['py', 'fresh', 'none']) == {
+        'py': PY_URL, 'fresh': PY_URL, 'none': None}
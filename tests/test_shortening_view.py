@@ -1,10 +1,12 @@
 import re
+from datetime import datetime
 from http import HTTPStatus
 
 import pytest
 
 from tests.conftest import PY_URL, TEST_BASE_URL
 from yacut.models import URLMap
+from yacut.utils import get_redirect_location
 
 CUSTOM_ID = 'py'
 INDEX_URL = '/'
@@ -174,3 +176,34 @@ def test_invalid_short_url(data, client):
         'Допустимы только латинские буквы (верхнего и нижнего регистра) '
         'и цифры.'
     )
+
+
+def test_redirect_location_is_memoized(client, _app):
+    get_redirect_location.cache_clear()
+    obj = URLMap.validate_user_code('https://пример.рф/путь?q=значение')
+    for _ in range(3):
+        response = client.get(f'/{obj.short}')
+        assert response.status_code == HTTPStatus.FOUND
+        assert response.headers['Location'] == (
+            'https://xn--e1afmkfd.xn--p1ai/%D0%BF%D1%83%D1%82%D1%8C'
+            '?q=%D0%B7%D0%BD%D0%B0%D1%87%D0%B5%D0%BD%D0%B8%D0%B5'
+        )
+    info = get_redirect_location.cache_info()
+    assert (info.misses, info.hits) == (1, 2), (
+        'Заголовок `Location` для одной и той же ссылки должен '
+        'вычисляться один раз.'
+    )
+
+
+def test_index_form_with_expiry(client):
+    response = client.post(INDEX_URL, data={
+        'original_link': PY_URL,
+        'custom_id': CUSTOM_ID,
+        'expires_at': '2999-01-01T12:30',
+    })
+    assert response.status_code == HTTPStatus.OK
+    url_map_obj = URLMap.query.filter_by(short=CUSTOM_ID).first()
+    assert url_map_obj.expires_at == datetime(2999, 1, 1, 12, 30), (
+        'Срок действия из формы на главной странице должен сохраняться '
+        'в базе данных.'
+    )
@@ -1,4 +1,5 @@
 import aiohttp
+import asyncio
 import re
 from contextlib import suppress
 from hashlib import md5
@@ -10,6 +11,7 @@ from aiohttp import web
 REQUEST_UPLOAD_URL = '/v1/disk/resources/upload'
 UPLOAD_URL = '/upload-target'
 DOWNLOAD_LINK_URL = '/v1/disk/resources/download'
+SLOW_UPLOAD_DELAY = 0.2
 
 COMMON_ASSERT_MSG_FOR_UPLOAD_FILES = (
     'Убедитесь, что для загрузки полученных файлов на Яндекс Диск `'
@@ -18,15 +20,21 @@ COMMON_ASSERT_MSG_FOR_UPLOAD_FILES = (
     'ссылки для загрузки файла;\n'
     f'2. PUT-запрос к эндпоинту `{UPLOAD_URL}` для загрузки файла;\n'
     f'3. GET-запрос к эндпоинту `{DOWNLOAD_LINK_URL}` для получения '
-    'ссылки для скачивания файла.'
+    'ссылки для скачивания файла - при первом переходе по короткой ссылке.'
 )
 
 
-@pytest.fixture
-async def mock_server(aiohttp_server):
-    """Возвращает мок-сервер для проверки работы с API Я.Диска."""
-    user_calls = set()
+def create_mock_app(user_calls, upload_delay=0):
+    """
+    Создаёт приложение мок-сервера API Я.Диска.
+
+    `upload_delay` имитирует время передачи файла по сети; в `app['stats']`
+    учитывается максимальное число одновременных загрузок.
+    """
     file_names = {}
+    stats = {
+        'in_flight': 0, 'max_in_flight': 0, 'uploads': 0, 'download_links': 0
+    }
 
     async def check_headers(path, headers):
         assert 'Authorization' in headers, (
@@ -79,8 +87,19 @@ async def mock_server(aiohttp_server):
     async def mock_upload_handler(request):
         """Обработчик для запросов на загрузку файла."""
         user_calls.add('upload')
-        request_data = await request.read()
-        assert request_data, (
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(
+            stats['max_in_flight'], stats['in_flight'])
+        try:
+            received = 0
+            async for chunk in request.content.iter_chunked(64 * 1024):
+                received += len(chunk)
+            if upload_delay:
+                await asyncio.sleep(upload_delay)
+        finally:
+            stats['in_flight'] -= 1
+        stats['uploads'] += 1
+        assert received, (
             'Убедитесь, что PUT-запрос на загрузку файла на Яндекс Диск '
             'содержит загружаемые данные.'
         )
@@ -92,6 +111,7 @@ async def mock_server(aiohttp_server):
     async def mock_get_download_link_handler(request):
         """Обработчик для запросов на получение ссылки для скачивания файла."""
         user_calls.add('get_download_link')
+        stats['download_links'] += 1
         await check_headers(request.path, request.headers)
         assert 'path' in request.query, (
             'Убедитесь, что при отправке запроса к эндпоинту Яндекс Диска '
@@ -100,7 +120,7 @@ async def mock_server(aiohttp_server):
             'путем к скачиваемому файлу.'
         )
         path_hash = md5(request.query['path'].encode()).hexdigest()
-        link = f'http://{request.host}disk/{path_hash}'
+        link = f'http://{request.host}/disk/{path_hash}'
         response_data = await handle_fields_param(
             request,
             {
@@ -140,8 +160,24 @@ async def mock_server(aiohttp_server):
 
     app.router.add_get('/v1/disk/', disk_info_handler)
     app.router.add_route('*', '/{tail:.*}', catch_all_handler)
+    app['stats'] = stats
+    return app
+
 
-    server = await aiohttp_server(app)
+@pytest.fixture
+async def mock_server(aiohttp_server):
+    """Возвращает мок-сервер для проверки работы с API Я.Диска."""
+    user_calls = set()
+    server = await aiohttp_server(create_mock_app(user_calls))
+    return server, user_calls
+
+
+@pytest.fixture
+async def slow_mock_server(aiohttp_server):
+    """Возвращает мок-сервер, который принимает каждый файл 0.2 секунды."""
+    user_calls = set()
+    server = await aiohttp_server(
+        create_mock_app(user_calls, upload_delay=SLOW_UPLOAD_DELAY))
     return server, user_calls
 
 
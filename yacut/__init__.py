@@ -5,7 +5,9 @@ from settings import Config
 
 app = Flask(__name__)
 app.config.from_object(Config)
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'expire_on_commit': False})
 migrate = Migrate(app, db)
 
-from . import api_views, error_handlers, views
\ No newline at end of file
+from . import (
+    api_views, cli_commands, error_handlers, metrics, profiling, views
+)
\ No newline at end of file
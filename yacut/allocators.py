@@ -0,0 +1,153 @@
+"""Short ID allocators for the YaCut URL-shortening service.
+
+This module provides:
+- `ShortIdAllocator`: the interface of a short ID allocator.
+- `BlockCounterAllocator`: hands out IDs from counter blocks reserved in
+  the database (one round trip per block, not per ID). Every counter value
+  is passed through a keyed bijective scramble and encoded in base62, so
+  consecutive IDs do not look sequential and two counter values can never
+  produce the same ID.
+- `RandomAllocator`: draws random IDs without checking the database and
+  relies on the unique constraint of `URLMap.short` to detect collisions.
+- `create_allocator`: builds the allocator selected in `settings.Config`.
+
+Generated IDs only use the `[A-Za-z0-9]` alphabet and never equal one of
+the `RESERVED` codes.
+"""
+
+import random
+import string
+import threading
+
+from .constants import RESERVED
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+FEISTEL_ROUNDS = 4
+
+
+def encode_base62(number, length):
+    """Encode a non-negative integer as a fixed-width base62 string."""
+    chars = []
+    for _ in range(length):
+        number, remainder = divmod(number, BASE)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def scramble(number, domain, key):
+    """
+    Map `number` from `[0, domain)` onto `[0, domain)` bijectively.
+
+    A keyed balanced Feistel network permutes the smallest even-width bit
+    space covering `domain`; values that land outside the domain are fed
+    back through the network (cycle walking) until they fall inside it.
+    """
+    half_bits = ((domain - 1).bit_length() + 1) // 2
+    mask = (1 << half_bits) - 1
+    while True:
+        left, right = number >> half_bits, number & mask
+        for round_number in range(FEISTEL_ROUNDS):
+            mixed = (right * 0x9E3779B1 + key + round_number) & 0xFFFFFFFF
+            mixed ^= mixed >> 15
+            mixed = (mixed * 0x85EBCA6B) & 0xFFFFFFFF
+            mixed ^= mixed >> 13
+            left, right = right, left ^ (mixed & mask)
+        number = (left << half_bits) | right
+        if number < domain:
+            return number
+
+
+class ShortIdAllocator:
+    """Interface of a short ID allocator."""
+
+    def allocate(self):
+        """Return a new short ID."""
+        raise NotImplementedError
+
+    def allocate_many(self, count):
+        """Return `count` new short IDs."""
+        return [self.allocate() for _ in range(count)]
+
+    def reset(self):
+        """Forget any state held in the process."""
+
+
+class RandomAllocator(ShortIdAllocator):
+    """Random fixed-length IDs; collisions are left to the unique index."""
+
+    def __init__(self, length):
+        """Initialize the allocator."""
+        self.length = length
+
+    def allocate(self):
+        """Return a new random short ID."""
+        while True:
+            short_id = ''.join(
+                random.choice(ALPHABET) for _ in range(self.length))
+            if short_id not in RESERVED:
+                return short_id
+
+
+class BlockCounterAllocator(ShortIdAllocator):
+    """
+    Collision-free IDs from database-reserved counter blocks.
+
+    IDs are `length` characters long until all `62 ** length` values have
+    been used up, after which the allocator moves on to one character
+    more. `key` must never change for an existing database.
+    """
+
+    def __init__(self, reserve_block, length, block_size, key):
+        """Initialize the allocator around a block reservation callable."""
+        self.reserve_block = reserve_block
+        self.length = length
+        self.block_size = block_size
+        self.key = key
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+
+    def _next_counter(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self.reserve_block(self.block_size)
+                self._end = self._next + self.block_size
+            counter = self._next
+            self._next += 1
+            return counter
+
+    def encode(self, counter):
+        """Turn a counter value into its short ID."""
+        length = self.length
+        while counter >= BASE ** length:
+            counter -= BASE ** length
+            length += 1
+        domain = BASE ** length
+        return encode_base62(scramble(counter, domain, self.key), length)
+
+    def allocate(self):
+        """Return the short ID for the next counter value."""
+        while True:
+            short_id = self.encode(self._next_counter())
+            if short_id not in RESERVED:
+                return short_id
+
+    def reset(self):
+        """Drop the current block; the next call reserves a fresh one."""
+        with self._lock:
+            self._next = self._end = 0
+
+
+def create_allocator(config, reserve_block):
+    """Build the short ID allocator selected by `config`."""
+    allocator = config['SHORT_ID_ALLOCATOR']
+    if allocator == 'block':
+        return BlockCounterAllocator(
+            reserve_block=reserve_block,
+            length=config['SHORT_ID_LENGTH'],
+            block_size=config['SHORT_ID_BLOCK_SIZE'],
+            key=config['SHORT_ID_SCRAMBLE_KEY'],
+        )
+    if allocator == 'random':
+        return RandomAllocator(length=config['SHORT_ID_LENGTH'])
+    raise ValueError(f'Неизвестный генератор коротких ссылок: {allocator}')
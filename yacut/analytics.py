@@ -0,0 +1,128 @@
+"""Click analytics for short links.
+
+Redirects must not wait for a database write, so clicks go through a
+buffered pipeline:
+- `ClickRecorder.record` appends `(short ID, minute)` to a bounded
+  in-memory ring buffer; it never touches the database.
+- A background thread wakes up every `CLICK_FLUSH_INTERVAL` seconds, or
+  as soon as `CLICK_FLUSH_SIZE` clicks are waiting, aggregates the buffer
+  and upserts the counts into `ClickStat` in one batch.
+- `click_recorder`: the process-wide recorder, flushed at interpreter exit.
+
+At most `CLICK_BUFFER_SIZE` clicks, or one flush interval, can be lost if
+the process dies; when the buffer overflows, the oldest clicks are dropped
+and counted in `dropped`.
+"""
+
+import atexit
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from . import app
+from .metrics import StatsCollector
+from .models import ClickStat
+
+
+def get_minute(timestamp):
+    """Return the UTC minute a POSIX timestamp falls into."""
+    return datetime.utcfromtimestamp(timestamp - timestamp % 60)
+
+
+class ClickRecorder:
+    """Ring buffer of clicks with a batched background flush."""
+
+    def __init__(self, capacity, flush_interval, flush_size,
+                 clock=time.time):
+        """Initialize the recorder; the flush thread starts on first use."""
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._clock = clock
+        self._buffer = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def record(self, short_id):
+        """Remember one click; safe to call from any thread."""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((short_id, get_minute(self._clock())))
+        self.recorded += 1
+        if self._thread is None and self.flush_interval > 0:
+            self.start()
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write buffered clicks to the database; return how many."""
+        counts = Counter()
+        while True:
+            try:
+                counts[self._buffer.popleft()] += 1
+            except IndexError:
+                break
+        ClickStat.add(counts)
+        flushed = sum(counts.values())
+        self.flushed += flushed
+        return flushed
+
+    def start(self):
+        """Start the flush thread, unless disabled or already running."""
+        with self._lock:
+            if self._thread is not None or self.flush_interval <= 0:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._work, name='yacut-clicks', daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception:
+                app.logger.exception('Не удалось сохранить статистику')
+
+    def stop(self):
+        """Stop the flush thread and write what is left in the buffer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            thread.join()
+        if self._buffer:
+            with app.app_context():
+                self.flush()
+
+    def clear(self):
+        """Drop buffered clicks and reset the counters."""
+        self._buffer.clear()
+        self.recorded = self.dropped = self.flushed = 0
+
+    def stats(self):
+        """Return a snapshot of the recorder counters."""
+        return dict(
+            buffered=len(self._buffer),
+            recorded=self.recorded,
+            dropped=self.dropped,
+            flushed=self.flushed,
+        )
+
+
+click_recorder = ClickRecorder(
+    capacity=app.config['CLICK_BUFFER_SIZE'],
+    flush_interval=app.config['CLICK_FLUSH_INTERVAL'],
+    flush_size=app.config['CLICK_FLUSH_SIZE'],
+)
+atexit.register(click_recorder.stop)
+StatsCollector('yacut_click_recorder', 'Click recorder', click_recorder.stats)
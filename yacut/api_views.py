@@ -4,22 +4,72 @@ This module defines the REST API endpoints for working with shortened links:
 
 - POST `/api/id/`:
     Create a new short link for a given original URL, optionally using a
-    user-provided custom ID. Returns the original URL and the generated
-    short link.
+    user-provided custom ID and an expiry time (`expires_at`, ISO 8601).
+    Returns the original URL and the generated short link.
+
+- POST `/api/id/batch/`:
+    Create short links for an array of `{url, custom_id}` items in one
+    request. Returns a result or an error for every item, in input order.
 
 - GET `/api/id/<short_id>/`:
     Retrieve the original URL associated with the provided short ID.
+    For uploaded files this is a freshly resolved Yandex Disk download URL.
+
+- GET `/api/id/<short_id>/status/`:
+    Report the state of a file queued for a background upload to Yandex
+    Disk: `pending`, `running`, `done` or `failed`.
+
+- GET `/api/id/<short_id>/stats/`:
+    Return the total number of redirects through a short link and its
+    per-minute counts for the last `minutes` (60 by default). Clicks show
+    up after the next flush of the click recorder.
+
+- POST `/api/id/resolve/`:
+    Resolve an array of short IDs in one request. Returns the found URLs,
+    the list of IDs that do not exist, the list of IDs of uploaded files
+    and the list of IDs of files still queued for upload. Download URLs of
+    files are not resolved here: they expire and each one costs a call to
+    the Disk API, so clients get them from GET `/api/id/<short_id>/`.
+
+- POST `/api/uploads/`:
+    Start a resumable upload of a large file announced by name and size.
+
+- GET `/api/uploads/<upload_id>/`:
+    Return the state of a resumable upload: the offset to continue from
+    and, once the file is stored, its short link.
+
+- PUT `/api/uploads/<upload_id>/`:
+    Append raw bytes at the offset given in the `Upload-Offset` header.
+    The request that completes the file stores it on Yandex Disk. If the
+    locally spooled part turns out shorter than recorded, the offset is
+    moved back to it and the request is answered with 409.
 
 The endpoints follow the specification described in the project requirements
 (openapi.yml).
 """
 
+import time
+from datetime import timedelta
+
 from flask import jsonify, request
 
-from . import app
+from . import app, db
+from .analytics import get_minute
+from .constants import (
+    BATCH_MAX_SIZE,
+    CLICK_STATS_MAX_MINUTES,
+    RESOLVE_MAX_SIZE
+)
 from .error_handlers import APIUsageError
-from .models import URLMap
-from .utils import generate_short_link
+from .models import ClickStat, UploadJob, UploadSession, URLMap
+from .storage import finish_upload, get_spooled_size, write_chunk
+from .utils import (
+    generate_short_link,
+    is_disk_path,
+    is_pending_upload,
+    serialize_link
+)
+from .yadisk import resolve_download_url
 
 
 @app.route('/api/id/', methods=['POST'])
@@ -32,19 +82,187 @@ def create_short_link():
         obj = URLMap.validate_user_code(
             original_url=data.get('url'),
             custom_id=data.get('custom_id'),
+            expires_at=data.get('expires_at'),
         )
     except ValueError as e:
         raise APIUsageError(str(e), 400)
-    return jsonify({
-        "url": obj.original,
-        "short_link": generate_short_link(obj.short)
-    }), 201
+    return jsonify(serialize_link(
+        obj.original, generate_short_link(obj.short), obj.expires_at)), 201
+
+
+@app.route('/api/id/batch/', methods=['POST'])
+def create_short_links_batch():
+    """Handle POST requests for creating many short links at once."""
+    data = request.get_json(silent=True)
+    if not data:
+        raise APIUsageError('Отсутствует тело запроса', 400)
+    if not isinstance(data, list):
+        raise APIUsageError('Ожидается массив ссылок', 400)
+    if len(data) > BATCH_MAX_SIZE:
+        raise APIUsageError(
+            f'Можно передать не более {BATCH_MAX_SIZE} ссылок', 400)
+    results = URLMap.create_batch([
+        (item.get('url'), item.get('custom_id'))
+        if isinstance(item, dict) else (None, None)
+        for item in data
+    ])
+    return jsonify([
+        {'message': str(result)} if isinstance(result, ValueError) else
+        {'url': result[0], 'short_link': generate_short_link(result[1])}
+        for result in results
+    ]), 200
 
 
 @app.route('/api/id/<string:short_id>/', methods=['GET'])
 def get_original_url(short_id):
     """Handle GET requests for resolving a short ID to its original URL."""
-    url_map = URLMap.get_by_short(short_id)
-    if not url_map:
+    url = URLMap.get_original(short_id)
+    if url is None:
+        raise APIUsageError('Указанный id не найден', 404)
+    if is_pending_upload(url):
+        raise APIUsageError('Файл ещё загружается', 503)
+    if is_disk_path(url):
+        url = resolve_download_url(url)
+        if url is None:
+            raise APIUsageError('Не удалось получить ссылку на файл', 502)
+    return jsonify({'url': url}), 200
+
+
+@app.route('/api/id/<string:short_id>/status/', methods=['GET'])
+def get_upload_job_status(short_id):
+    """Handle GET requests for the state of a queued file upload."""
+    job = UploadJob.query.filter_by(short=short_id).first()
+    if job is None:
         raise APIUsageError('Указанный id не найден', 404)
-    return jsonify({'url': url_map.original}), 200
+    state = {
+        'short_link': generate_short_link(job.short),
+        'filename': job.filename,
+        'status': job.status,
+    }
+    if job.error:
+        state['error'] = job.error
+    return jsonify(state), 200
+
+
+@app.route('/api/id/<string:short_id>/stats/', methods=['GET'])
+def get_click_stats(short_id):
+    """Handle GET requests for the click statistics of a short link."""
+    if URLMap.get_original(short_id) is None:
+        raise APIUsageError('Указанный id не найден', 404)
+    minutes = request.args.get('minutes', 60, type=int)
+    if not 0 < minutes <= CLICK_STATS_MAX_MINUTES:
+        raise APIUsageError(
+            f'Параметр minutes должен быть от 1 до {CLICK_STATS_MAX_MINUTES}',
+            400)
+    since = get_minute(time.time()) - timedelta(minutes=minutes - 1)
+    total, series = ClickStat.get_series(short_id, since)
+    return jsonify({
+        'short_id': short_id,
+        'total': total,
+        'clicks': [
+            {'minute': minute.isoformat() + 'Z', 'count': count}
+            for minute, count in series
+        ],
+    }), 200
+
+
+@app.route('/api/id/resolve/', methods=['POST'])
+def resolve_short_ids():
+    """Handle POST requests for resolving many short IDs at once."""
+    data = request.get_json(silent=True)
+    if not data:
+        raise APIUsageError('Отсутствует тело запроса', 400)
+    if (
+        not isinstance(data, list) or
+        not all(isinstance(short_id, str) for short_id in data)
+    ):
+        raise APIUsageError('Ожидается массив идентификаторов', 400)
+    if len(data) > RESOLVE_MAX_SIZE:
+        raise APIUsageError(
+            f'Можно передать не более {RESOLVE_MAX_SIZE} идентификаторов',
+            400)
+    urls, missing, files, pending = {}, [], [], []
+    for short_id, url in URLMap.resolve_many(data).items():
+        if url is None:
+            missing.append(short_id)
+        elif is_pending_upload(url):
+            pending.append(short_id)
+        elif is_disk_path(url):
+            files.append(short_id)
+        else:
+            urls[short_id] = url
+    return jsonify({
+        'urls': urls, 'missing': missing, 'files': files, 'pending': pending
+    }), 200
+
+
+def upload_state(upload):
+    """Serialize a resumable upload for the API."""
+    state = {
+        'upload_id': upload.id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.received,
+    }
+    if upload.short:
+        state['short_link'] = generate_short_link(upload.short)
+    return state
+
+
+def get_upload_or_404(upload_id):
+    """Return the upload session or raise a 404 API error."""
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None:
+        raise APIUsageError('Сессия загрузки не найдена', 404)
+    return upload
+
+
+@app.route('/api/uploads/', methods=['POST'])
+def start_upload():
+    """Handle POST requests for starting a resumable file upload."""
+    data = request.get_json(silent=True) or {}
+    if not data:
+        raise APIUsageError('Отсутствует тело запроса', 400)
+    try:
+        upload = UploadSession.start(data.get('filename'), data.get('size'))
+    except ValueError as e:
+        raise APIUsageError(str(e), 400)
+    return jsonify(upload_state(upload)), 201
+
+
+@app.route('/api/uploads/<string:upload_id>/', methods=['GET'])
+def get_upload(upload_id):
+    """Handle GET requests for the state of a resumable upload."""
+    return jsonify(upload_state(get_upload_or_404(upload_id))), 200
+
+
+@app.route('/api/uploads/<string:upload_id>/', methods=['PUT'])
+async def append_upload(upload_id):
+    """Handle PUT requests carrying the next part of a resumable upload."""
+    upload = get_upload_or_404(upload_id)
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        raise APIUsageError('Отсутствует заголовок Upload-Offset', 400)
+    if offset != upload.received:
+        raise APIUsageError(
+            f'Загрузка продолжается с позиции {upload.received}', 409)
+    if not upload.short:
+        # The spooled file may have been lost (e.g. a cleaned temporary
+        # directory or another host): resume from what is really there.
+        spooled = get_spooled_size(upload.id)
+        if spooled < offset:
+            if not upload.advance(offset, spooled):
+                raise APIUsageError(
+                    'Файл одновременно загружается повторно', 409)
+            raise APIUsageError(
+                f'Загрузка продолжается с позиции {upload.received}', 409)
+    if not upload.is_complete:
+        written = write_chunk(
+            upload.id, offset, request.stream, upload.size - offset)
+        if not upload.advance(offset, offset + written):
+            raise APIUsageError('Файл одновременно загружается повторно', 409)
+    if upload.is_complete and not upload.short:
+        error = await finish_upload(upload)
+        if error:
+            raise APIUsageError(error, 502)
+    return jsonify(upload_state(upload)), 200
@@ -0,0 +1,282 @@
+"""Native ASGI entry point for the YaCut service.
+
+Run it with any ASGI server, e.g. `uvicorn yacut.asgi:asgi_app`.
+
+The hot endpoints are served directly on the server's event loop:
+- GET `/<short_id>`: redirect to the original URL or to the download URL
+  of an uploaded file.
+- GET `/api/id/<short_id>/`: the same as JSON.
+- POST `/api/id/`: create a short link.
+
+Lookups go through `resolution_cache` and, on a miss, through an async
+SQLAlchemy engine, so a waiting database query or Disk API call does not
+hold a thread. A networked cache backend (Redis) has a blocking client,
+so it is called in a worker thread; the in-process one is called inline.
+Generated IDs still come from `short_id_allocator`, which only reaches
+the database once per reserved block; it is called in a worker thread
+with its own application context, since an ASGI server pushes none and
+a block reservation is a blocking query.
+
+Unknown IDs, pending or failed files and all other routes (the HTML
+forms, file uploads, batch endpoints) are handed over to the Flask
+application through `asgiref`, which renders them exactly as under WSGI.
+File uploads keep their Disk I/O on the shared `disk_client` loop.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from . import app
+from .analytics import click_recorder
+from .cache import MISSING, resolution_cache
+from .constants import (
+    DUPLICATE_SHORT_ID_MESSAGE,
+    RESERVED,
+    SHORT_ID_MAX_ATTEMPTS
+)
+from .metrics import request_seconds, responses_total, short_id_retries
+from .models import ORIGINAL_BY_SHORT, URLMap, short_id_filter
+from .utils import (
+    get_redirect_location,
+    is_disk_path,
+    is_pending_upload,
+    serialize_link
+)
+from .yadisk import resolve_download_url_async
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+REDIRECT_PATH = re.compile(r'^/([A-Za-z0-9]{1,16})$')
+API_GET_PATH = re.compile(r'^/api/id/([A-Za-z0-9]{1,16})/$')
+API_CREATE_PATH = '/api/id/'
+
+
+def get_async_database_uri(config):
+    """Return `ASYNC_DATABASE_URI`, or the main URI with an async driver."""
+    if config.get('ASYNC_DATABASE_URI'):
+        return config['ASYNC_DATABASE_URI']
+    scheme, separator, rest = (
+        config['SQLALCHEMY_DATABASE_URI'].partition('://'))
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+async def call_cache(function, *args):
+    """Call `function` using `resolution_cache`, in a thread if it blocks."""
+    if resolution_cache.blocking:
+        return await asyncio.to_thread(function, *args)
+    return function(*args)
+
+
+async def read_body(receive):
+    """Collect the whole request body."""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+
+async def send_response(send, status, body=b'', headers=()):
+    """Send a complete response with a body."""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-length', str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, status, payload):
+    """Send a JSON response, serialized the way Flask's `jsonify` does."""
+    await send_response(
+        send, status, json.dumps(payload).encode(),
+        [(b'content-type', b'application/json')])
+
+
+def get_url_root(scope):
+    """Build the equivalent of Flask's `request.url_root`."""
+    headers = dict(scope['headers'])
+    host = headers.get(b'host', b'').decode('latin-1')
+    if not host and scope.get('server'):
+        host = '%s:%s' % scope['server']
+    return f"{scope['scheme']}://{host}{scope.get('root_path', '')}/"
+
+
+class AsyncYaCut:
+    """ASGI application with native async redirects and link creation."""
+
+    def __init__(self, flask_app, engine=None):
+        """Wrap `flask_app`; the async engine is created on first use."""
+        self.flask_app = flask_app
+        self.fallback = WsgiToAsgi(flask_app)
+        self._engine = engine
+
+    @property
+    def engine(self):
+        """Async engine built from the application config."""
+        if self._engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            self._engine = create_async_engine(
+                get_async_database_uri(self.flask_app.config))
+        return self._engine
+
+    async def __call__(self, scope, receive, send):
+        """Dispatch an ASGI connection."""
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            started = time.perf_counter()
+            statuses = []
+
+            async def send_and_record(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                await send(message)
+
+            endpoint = await self.handle(scope, receive, send_and_record)
+            if endpoint:
+                request_seconds.observe(
+                    time.perf_counter() - started, endpoint)
+                responses_total.inc(endpoint, str(statuses[0]))
+                return
+        return await self.fallback(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """Dispose of the engine pool on server shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._engine is not None:
+                    await self._engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle(self, scope, receive, send):
+        """
+        Serve a native endpoint.
+
+        Return the name of the Flask view it stands in for, as used in the
+        metrics, or None to fall back to Flask.
+        """
+        method, path = scope['method'], scope['path']
+        if method == 'POST' and path == API_CREATE_PATH:
+            await self.create_short_link(scope, receive, send)
+            return 'create_short_link'
+        if method != 'GET':
+            return None
+        match = REDIRECT_PATH.match(path)
+        if match and match.group(1) not in RESERVED:
+            url = await self.resolve(match.group(1))
+            if url is None:
+                return None
+            click_recorder.record(match.group(1))
+            await send_response(send, 302, headers=[
+                (b'location', get_redirect_location(url).encode())])
+            return 'redirect_view'
+        match = API_GET_PATH.match(path)
+        if match:
+            url = await self.resolve(match.group(1))
+            if url is None:
+                return None
+            await send_json(send, 200, {'url': url})
+            return 'get_original_url'
+        return None
+
+    async def resolve(self, short_id):
+        """
+        Return the URL to send a visitor of `short_id` to.
+
+        Return None whenever Flask has to render the answer: unknown IDs,
+        files still queued for upload and unavailable download links. IDs
+        missing from `short_id_filter` are handed over as well, and Flask
+        checks whether they were created by another process meanwhile.
+        """
+        original = await call_cache(resolution_cache.get, short_id)
+        if original is None:
+            if not short_id_filter.in_filter(short_id):
+                return None
+            async with self.engine.connect() as connection:
+                row = (await connection.execute(
+                    ORIGINAL_BY_SHORT, {'short': short_id})).first()
+            original = await call_cache(URLMap.cache_resolved, short_id, row)
+        if original is MISSING:
+            return None
+        if is_pending_upload(original):
+            return None
+        if is_disk_path(original):
+            return await resolve_download_url_async(original)
+        return original
+
+    async def create_short_link(self, scope, receive, send):
+        """Create a short link; the async counterpart of the API view."""
+        try:
+            data = json.loads(await read_body(receive))
+        except ValueError:
+            data = None
+        if not data or not isinstance(data, dict):
+            return await send_json(
+                send, 400, {'message': 'Отсутствует тело запроса'})
+        try:
+            original, code = URLMap.clean_user_input(
+                data.get('url'), data.get('custom_id'))
+            expires_at = URLMap.clean_expires_at(data.get('expires_at'))
+        except ValueError as e:
+            return await send_json(send, 400, {'message': str(e)})
+        original_hash = URLMap.get_original_hash(original)
+        if URLMap.is_deduplicated(code, expires_at):
+            async with self.engine.connect() as connection:
+                short = URLMap.pick_duplicate(original, await (
+                    connection.execute(
+                        URLMap.select_duplicates([original_hash]))))
+            if short is not None:
+                return await send_json(send, 201, serialize_link(
+                    original, get_url_root(scope) + short))
+        await self.insert_link(
+            scope, send, original, code, expires_at, original_hash)
+
+    def allocate_short_id(self):
+        """Allocate a generated ID within an application context."""
+        with self.flask_app.app_context():
+            return URLMap.get_unique_short_id()
+
+    async def insert_link(self, scope, send, original, code, expires_at,
+                          original_hash):
+        """Insert a validated link, retrying taken generated codes."""
+        for _ in range(SHORT_ID_MAX_ATTEMPTS):
+            short = code or await asyncio.to_thread(self.allocate_short_id)
+            try:
+                async with self.engine.begin() as connection:
+                    await connection.execute(insert(URLMap).values(
+                        original=original, short=short,
+                        expires_at=expires_at, original_hash=original_hash))
+            except IntegrityError:
+                if code:
+                    return await send_json(
+                        send, 400, {'message': DUPLICATE_SHORT_ID_MESSAGE})
+                short_id_retries.inc()
+                continue
+            short_id_filter.add(short)
+            await call_cache(
+                URLMap.cache_resolved, short, (original, expires_at))
+            return await send_json(send, 201, serialize_link(
+                original, get_url_root(scope) + short, expires_at))
+        await send_json(send, 500, {
+            'message': 'Не удалось подобрать свободную короткую ссылку.'})
+
+
+asgi_app = AsyncYaCut(app)
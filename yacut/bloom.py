@@ -0,0 +1,347 @@
+"""Bloom filter of existing short IDs.
+
+Bots probe random paths, and without a filter every probe costs a
+lookup on a replica and then on the primary. This module provides:
+- `BloomFilter`: a fixed-size Bloom filter sized for a capacity and a
+  false-positive rate. It can say that a key was definitely never added,
+  but never that it was.
+- `ShortIdFilter`: the filter of all `URLMap.short` values.
+  - A background thread builds it by streaming the table. Until the
+    first build is done every ID counts as possibly present.
+  - Links created in this process are added right away.
+  - Links created by other processes are picked up every
+    `BLOOM_FILTER_REFRESH_INTERVAL` seconds by reading the rows whose
+    primary key is above the highest one seen so far. The read starts
+    `BLOOM_REFRESH_OVERLAP` rows lower, so transactions that commit late
+    are not missed. Keys are assigned by the database, so the clocks of
+    the writers do not matter.
+  - An ID the filter lacks is only reported as absent after
+    `SELECT max(id)` on the primary shows that the filter has seen every
+    row. Otherwise the filter first catches up with the new rows, so a
+    link created in another process is found right away. The result of
+    `max(id)` is shared by all lookups for `BLOOM_MAX_ID_TTL` seconds.
+  - The filter is rebuilt from scratch every
+    `BLOOM_FILTER_REBUILD_INTERVAL` seconds, or as soon as it holds more
+    IDs than it was sized for. This drops deleted links and keeps the
+    false-positive rate in check.
+
+An unknown ID thus costs at most one index lookup of the highest
+primary key, and the lookups by short ID are skipped. `URLMap` caches
+the IDs ruled out like any other unknown ID, so repeated probes of the
+same ID do not reach the database at all. A row whose key was assigned
+before the last refresh but committed after it is only seen by the
+next refresh.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from . import app, db
+from .constants import (
+    BLOOM_MAX_ID_TTL,
+    BLOOM_MIN_CAPACITY,
+    BLOOM_REFRESH_OVERLAP,
+    BLOOM_SCAN_BATCH_SIZE
+)
+
+HALF_MASK = (1 << 64) - 1
+
+
+class BloomFilter:
+    """Bit array probed at `hashes` positions per key."""
+
+    def __init__(self, capacity, error_rate):
+        """Size the filter for `capacity` keys at `error_rate`."""
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        """Bit positions of a key, by double hashing of one 128-bit digest."""
+        value = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=16).digest(), 'little')
+        first, second = value & HALF_MASK, (value >> 64) | 1
+        size = self.size
+        return [
+            position % size for position in range(
+                first, first + self.hashes * second, second)
+        ]
+
+    def add(self, key):
+        """
+        Add a key; not safe to call from several threads at once.
+
+        `count` only grows when the key sets a new bit, so adding a key
+        twice does not count it twice.
+        """
+        bits = self.bits
+        new = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        self.count += new
+
+    def __contains__(self, key):
+        """Return False if `key` was certainly never added."""
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def false_positive_rate(self):
+        """Estimate the current false-positive rate from the bits set."""
+        filled = int.from_bytes(self.bits, 'little').bit_count() / self.size
+        return filled ** self.hashes
+
+
+class ShortIdFilter:
+    """Process-wide Bloom filter of the short IDs in a table."""
+
+    def __init__(self, config, short_column, id_column,
+                 clock=time.monotonic):
+        """Initialize an empty filter over `short_column`."""
+        self.config = config
+        self.short_column = short_column
+        self.id_column = id_column
+        self._clock = clock
+        self._filter = None
+        self._pending = None
+        self._last_id = 0
+        self._newest = None
+        self._rebuilt_at = None
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self.negatives = 0
+        self.build_seconds = None
+        self.refreshes = 0
+        self.catch_ups = 0
+        self.rebuilds = 0
+
+    @property
+    def enabled(self):
+        """Whether lookups are filtered; read from the config every time."""
+        return self.config['BLOOM_FILTER_ENABLED']
+
+    def in_filter(self, short_id):
+        """
+        Check the filter alone, without the database.
+
+        Return False if the filter lacks `short_id`, which may still have
+        been created by another process since the last refresh. Starts the
+        background build on first use.
+        """
+        if not self.enabled:
+            return True
+        bloom = self._filter
+        if bloom is None:
+            self.start()
+            return True
+        return short_id in bloom
+
+    def find_absent(self, short_ids):
+        """
+        Return those of `short_ids` that are certainly not in the table.
+
+        IDs the filter lacks are confirmed with `catch_up`, once for all
+        of them.
+        """
+        absent = [
+            short_id for short_id in short_ids
+            if not self.in_filter(short_id)]
+        if absent and self.catch_up():
+            absent = [
+                short_id for short_id in absent
+                if not self.in_filter(short_id)]
+        self.negatives += len(absent)
+        return absent
+
+    def might_contain(self, short_id):
+        """Return False only if `short_id` is certainly not in the table."""
+        return not self.find_absent([short_id])
+
+    def add(self, short_id):
+        """Add a newly created short ID."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(short_id)
+            if self._pending is not None:
+                self._pending.append(short_id)
+
+    def _read_after(self, last_id):
+        """
+        Add the rows with a primary key above `last_id`.
+
+        The rows are read on a connection of their own, so the caller's
+        session is neither used nor committed.
+        """
+        with db.engine.connect() as connection:
+            rows = connection.execute(
+                select(self.id_column, self.short_column)
+                .where(self.id_column > last_id)
+            ).all()
+        for _, short_id in rows:
+            if short_id is not None:
+                self.add(short_id)
+        if rows:
+            self._last_id = max(self._last_id, max(row[0] for row in rows))
+
+    def _get_newest_id(self):
+        """
+        Return the highest primary key in the table.
+
+        The answer is reused for `BLOOM_MAX_ID_TTL` seconds, so a burst
+        of unknown IDs costs a single query.
+        """
+        now = self._clock()
+        newest = self._newest
+        if newest is not None and now - newest[0] < BLOOM_MAX_ID_TTL:
+            return newest[1]
+        with db.engine.connect() as connection:
+            newest_id = connection.scalar(select(func.max(self.id_column)))
+        self._newest = (now, newest_id)
+        return newest_id
+
+    def catch_up(self):
+        """
+        Add the rows created since the filter last read the table.
+
+        `SELECT max(id)` on the primary tells whether there are any;
+        concurrent callers share a single read. Return True if the
+        filter was behind.
+        """
+        newest = self._get_newest_id()
+        if newest is None or newest <= self._last_id:
+            return False
+        with self._read_lock:
+            if newest > self._last_id:
+                self._read_after(self._last_id)
+                self.catch_ups += 1
+        return True
+
+    def build(self):
+        """Build a new filter from the whole table and swap it in."""
+        started = self._clock()
+        with self._lock:
+            self._pending = []
+        try:
+            count = db.session.scalar(
+                select(func.count()).select_from(self.short_column.table))
+            bloom = BloomFilter(
+                capacity=max(2 * count, BLOOM_MIN_CAPACITY),
+                error_rate=self.config['BLOOM_FILTER_ERROR_RATE'])
+            rows = db.session.connection().execute(
+                select(self.id_column, self.short_column)
+                .where(self.short_column.is_not(None))
+                .execution_options(yield_per=BLOOM_SCAN_BATCH_SIZE))
+            last_id = 0
+            for row_id, short_id in rows:
+                bloom.add(short_id)
+                if row_id > last_id:
+                    last_id = row_id
+            db.session.commit()
+            with self._lock:
+                for short_id in self._pending:
+                    bloom.add(short_id)
+                self._filter = bloom
+                self._last_id = max(self._last_id, last_id)
+        finally:
+            with self._lock:
+                self._pending = None
+        self._rebuilt_at = self._clock()
+        self.build_seconds = self._rebuilt_at - started
+        self.rebuilds += 1
+
+    def refresh(self):
+        """Add the IDs created since the previous refresh or build."""
+        with self._read_lock:
+            self._read_after(self._last_id - BLOOM_REFRESH_OVERLAP)
+        self.refreshes += 1
+
+    def maintain(self):
+        """Refresh the filter, or rebuild it when it is due or overfull."""
+        bloom = self._filter
+        if (
+            bloom is None or bloom.count > bloom.capacity
+            or self._clock() - self._rebuilt_at
+            >= self.config['BLOOM_FILTER_REBUILD_INTERVAL']
+        ):
+            self.build()
+        else:
+            self.refresh()
+
+    def start(self):
+        """Start the background maintenance thread if it is not running."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._work, name='yacut-bloom', daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                with app.app_context():
+                    self.maintain()
+            except Exception:
+                app.logger.exception('Не удалось обновить фильтр ссылок')
+            self._stopping.wait(self.config['BLOOM_FILTER_REFRESH_INTERVAL'])
+
+    def stop(self):
+        """Stop the maintenance thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+
+    def reset(self):
+        """Stop maintenance and drop the filter and its counters."""
+        self.stop()
+        self._filter = None
+        self._last_id = 0
+        self._newest = None
+        self._rebuilt_at = None
+        self.negatives = self.refreshes = self.catch_ups = self.rebuilds = 0
+        self.build_seconds = None
+
+    def stats(self):
+        """
+        Return the size, accuracy and counters of the filter.
+
+        `bytes_per_million` is the memory the filter takes per million
+        IDs of its capacity, `false_positive_rate` an estimate for its
+        current fill.
+        """
+        bloom = self._filter
+        if bloom is None:
+            return dict(ready=0, negatives=self.negatives)
+        memory = len(bloom.bits)
+        return dict(
+            ready=1,
+            entries=bloom.count,
+            capacity=bloom.capacity,
+            hashes=bloom.hashes,
+            memory_bytes=memory,
+            bytes_per_million=round(memory / bloom.capacity * 10 ** 6),
+            false_positive_rate=bloom.false_positive_rate(),
+            build_seconds=self.build_seconds,
+            negatives=self.negatives,
+            refreshes=self.refreshes,
+            catch_ups=self.catch_ups,
+            rebuilds=self.rebuilds,
+        )
@@ -0,0 +1,268 @@
+"""Pluggable cache for short-ID resolution.
+
+This module provides:
+- `CacheBackend`: the interface every resolution cache implements.
+- `LRUCache`: a bounded, thread-safe in-process backend with LRU eviction
+  and per-entry TTL.
+- `KeyValueCache`: a backend on top of a networked key-value store
+  (Redis-compatible client), shared by all workers and nodes.
+- `create_backend`: builds the backend selected in `settings.Config`.
+- `resolution_cache`: the process-wide instance used by `URLMap`.
+
+Negative results (unknown short IDs) are stored as `MISSING` with a
+separate, shorter TTL so that scanners probing random paths do not hit
+the database on every request.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from . import app
+from .metrics import StatsCollector
+
+
+MISSING = object()
+
+
+class CacheBackend:
+    """
+    Interface of a resolution cache backend.
+
+    `blocking` tells whether calls may wait on the network; async code
+    calls such backends in a worker thread.
+    """
+
+    blocking = True
+
+    def get(self, key):
+        """Return the cached value, `MISSING` or None if not cached."""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Return a dict of the cached values found for `keys`."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value (or `MISSING`) with the configured TTL.
+
+        A `ttl` in seconds can only shorten the configured one, e.g. for
+        links that expire sooner.
+        """
+        raise NotImplementedError
+
+    def _get_ttl(self, value, ttl):
+        configured = self.negative_ttl if value is MISSING else self.ttl
+        return configured if ttl is None else min(configured, ttl)
+
+    def invalidate(self, key):
+        """Drop a single entry."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """Bounded in-process LRU cache with TTL expiry and hit/miss counters."""
+
+    blocking = False
+
+    def __init__(self, maxsize, ttl, negative_ttl, clock=time.monotonic):
+        """Initialize the cache; `maxsize=0` disables caching."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value, `MISSING` or None if not cached."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value (or `MISSING`) and evict the oldest entries."""
+        if self.maxsize <= 0:
+            return
+        ttl = self._get_ttl(value, ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, self._clock() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single entry, e.g. after the row has been written."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return dict(
+                size=len(self._data),
+                maxsize=self.maxsize,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+            )
+
+
+class KeyValueCache(CacheBackend):
+    """
+    Resolution cache stored in a networked key-value store.
+
+    `client` must provide the Redis subset `get`, `mget`, `set(..., ex=)`,
+    `delete` and `scan_iter`. Negative results are stored as an empty
+    value. Errors from the store are counted and treated as cache misses
+    so that an unavailable cache never breaks redirects.
+    """
+
+    def __init__(self, client, ttl, negative_ttl, prefix='yacut:short:'):
+        """Initialize the backend around a connected client."""
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key):
+        """Return the cached value, `MISSING` or None if not cached."""
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception:
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._decode(value)
+
+    def get_many(self, keys):
+        """Return a dict of the cached values found, in one round trip."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = self.client.mget([self.prefix + key for key in keys])
+        except Exception:
+            self.errors += 1
+            values = [None] * len(keys)
+        found = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                self.misses += 1
+                continue
+            self.hits += 1
+            found[key] = self._decode(value)
+        return found
+
+    @staticmethod
+    def _decode(value):
+        if not value:
+            return MISSING
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        """Store a value (or `MISSING`) with the configured TTL."""
+        ttl = int(self._get_ttl(value, ttl))
+        if ttl <= 0:
+            return
+        try:
+            self.client.set(
+                self.prefix + key, '' if value is MISSING else value, ex=ttl)
+        except Exception:
+            self.errors += 1
+
+    def invalidate(self, key):
+        """Drop a single entry."""
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception:
+            self.errors += 1
+
+    def clear(self):
+        """Drop all entries under the prefix and reset the counters."""
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+        self.hits = self.misses = self.errors = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        return dict(hits=self.hits, misses=self.misses, errors=self.errors)
+
+
+def create_backend(config, ttl=None, negative_ttl=None,
+                   prefix='yacut:short:'):
+    """
+    Build the cache backend selected by `config`.
+
+    TTLs default to the resolution cache settings; other caches pass their
+    own TTLs and key prefix.
+    """
+    backend = config['RESOLUTION_CACHE_BACKEND']
+    if ttl is None:
+        ttl = config['RESOLUTION_CACHE_TTL']
+    if negative_ttl is None:
+        negative_ttl = config['RESOLUTION_CACHE_NEGATIVE_TTL']
+    if backend == 'memory':
+        return LRUCache(
+            maxsize=config['RESOLUTION_CACHE_SIZE'],
+            ttl=ttl,
+            negative_ttl=negative_ttl,
+        )
+    if backend == 'redis':
+        import redis
+        return KeyValueCache(
+            client=redis.Redis.from_url(config['RESOLUTION_CACHE_URL']),
+            ttl=ttl,
+            negative_ttl=negative_ttl,
+            prefix=prefix,
+        )
+    raise ValueError(f'Неизвестный бэкенд кеша: {backend}')
+
+
+resolution_cache = create_backend(app.config)
+StatsCollector(
+    'yacut_resolution_cache', 'Short ID resolution cache',
+    resolution_cache.stats)
@@ -0,0 +1,43 @@
+"""Flask CLI commands for the YaCut service.
+
+- `flask purge-expired`: delete short links whose `expires_at` has
+  passed, in batches; meant to be run periodically, e.g. from cron.
+- `flask hash-urls`: fill in the hash used by URL deduplication for
+  links created before it was introduced.
+- `flask purge-uploads`: delete resumable uploads idle for longer than
+  `UPLOAD_SESSION_STALE_AFTER`, together with their spooled files.
+"""
+
+import click
+
+from . import app
+from .constants import HASH_BATCH_SIZE, PURGE_BATCH_SIZE
+from .models import URLMap
+from .storage import purge_stale_uploads
+
+
+@app.cli.command('purge-expired')
+@click.option('--batch-size', default=PURGE_BATCH_SIZE, show_default=True,
+              type=click.IntRange(min=1), help='Ссылок за одну транзакцию.')
+def purge_expired_command(batch_size):
+    """Delete expired short links."""
+    deleted = URLMap.purge_expired(batch_size)
+    click.echo(f'Удалено ссылок с истёкшим сроком действия: {deleted}')
+
+
+@app.cli.command('hash-urls')
+@click.option('--batch-size', default=HASH_BATCH_SIZE, show_default=True,
+              type=click.IntRange(min=1), help='Ссылок за одну транзакцию.')
+def hash_urls_command(batch_size):
+    """Compute URL hashes of links that do not have one yet."""
+    updated = URLMap.hash_originals(batch_size)
+    click.echo(f'Посчитано хешей ссылок: {updated}')
+
+
+@app.cli.command('purge-uploads')
+@click.option('--batch-size', default=PURGE_BATCH_SIZE, show_default=True,
+              type=click.IntRange(min=1), help='Загрузок за одну транзакцию.')
+def purge_uploads_command(batch_size):
+    """Delete stale resumable uploads and their spooled files."""
+    deleted = purge_stale_uploads(batch_size)
+    click.echo(f'Удалено сессий загрузки: {deleted}')
@@ -1,7 +1,54 @@
 import re
 
 ALLOWED_CHARS = re.compile(r'^[A-Za-z0-9]{1,16}$')
-RESERVED = {"files"}
+RESERVED = {"files", "metrics"}
 
 ORIGINAL_MAX_LENGTH = 2048
+# Hex digits of the SHA-256 of a normalized URL kept for deduplication.
+ORIGINAL_HASH_LENGTH = 32
 CUSTOM_ID_MAX_LENGTH = 16
+
+SHORT_ID_MAX_ATTEMPTS = 5
+DUPLICATE_SHORT_ID_MESSAGE = (
+    'Предложенный вариант короткой ссылки уже существует.')
+INVALID_URL_MESSAGE = 'Ссылка должна начинаться с http:// или https://'
+
+BATCH_MAX_SIZE = 1000
+RESOLVE_MAX_SIZE = 1000
+
+# Schemes of user-submitted URLs; anything else, e.g. the internal
+# `disk:` and `upload:` links of files, is rejected.
+ALLOWED_URL_SCHEMES = ('http', 'https')
+DISK_PATH_PREFIX = 'disk:'
+PENDING_UPLOAD_PREFIX = 'upload:'
+REDIRECT_LOCATION_CACHE_SIZE = 10000
+
+# Three bound parameters per row, below SQLite's limit of 999.
+CLICK_UPSERT_CHUNK_SIZE = 300
+CLICK_STATS_MAX_MINUTES = 7 * 24 * 60
+
+PURGE_BATCH_SIZE = 1000
+HASH_BATCH_SIZE = 1000
+
+BLOOM_MIN_CAPACITY = 100000
+BLOOM_SCAN_BATCH_SIZE = 10000
+# Rows below the highest primary key seen that every refresh of the
+# short ID filter re-reads, to catch links whose transaction committed
+# after one with a higher key.
+BLOOM_REFRESH_OVERLAP = 1000
+# Seconds for which one `SELECT max(id)` of the short ID filter answers
+# every lookup of an ID the filter lacks.
+BLOOM_MAX_ID_TTL = 0.1
+
+ALLOWED_FILE_EXTENSIONS = [
+    'jpg', 'jpeg', 'png', 'gif', 'bmp',
+    'txt', 'py', 'pdf', 'docx', 'xlsx',
+    'csv', 'md', 'rtf',
+    'mp3', 'wav',
+    'mp4', 'avi', 'mov',
+    'zip', 'rar', '7z'
+]
+FILENAME_MAX_LENGTH = 255
+# Path separators and control characters: a file name must not be able
+# to leave its directory on Disk.
+UNSAFE_FILENAME_CHARS = re.compile(r'[/\\\x00-\x1f\x7f]')
@@ -3,7 +3,7 @@
 This module provides two Flask-WTF forms:
 
 - `ShortLinkForm`: Form for creating a short link from a long URL,
-  with optional custom short code input.
+  with optional custom short code and expiry time inputs.
 - `FileUploadForm`: Form for uploading multiple files to Yandex Disk,
   restricted to a set of allowed file types.
 
@@ -13,10 +13,11 @@ provide user-friendly error messages.
 
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileAllowed, MultipleFileField
-from wtforms import StringField, SubmitField, URLField
+from wtforms import DateTimeLocalField, StringField, SubmitField, URLField
 from wtforms.validators import DataRequired, Length, Optional, Regexp
 
 from .constants import (
+    ALLOWED_FILE_EXTENSIONS,
     ORIGINAL_MAX_LENGTH,
     CUSTOM_ID_MAX_LENGTH
 )
@@ -41,6 +42,11 @@ class ShortLinkForm(FlaskForm):
             )
         ],
     )
+    expires_at = DateTimeLocalField(
+        'Срок действия (UTC)',
+        format='%Y-%m-%dT%H:%M',
+        validators=[Optional()],
+    )
     submit = SubmitField('Создать')
 
 
@@ -51,14 +57,7 @@ class FileUploadForm(FlaskForm):
         'Файл не выбран',
         validators=[
             FileAllowed(
-                [
-                    'jpg', 'jpeg', 'png', 'gif', 'bmp',
-                    'txt', 'py', 'pdf', 'docx', 'xlsx',
-                    'csv', 'md', 'rtf',
-                    'mp3', 'wav',
-                    'mp4', 'avi', 'mov',
-                    'zip', 'rar', '7z'
-                ],
+                ALLOWED_FILE_EXTENSIONS,
                 message=(
                     'Выберите файлы с расширением: '
                     '.jpg, .jpeg, .png, .gif, .bmp, '
@@ -0,0 +1,134 @@
+"""Background upload queue for the YaCut file-sharing page.
+
+With `UPLOAD_QUEUE_ENABLED`, `/files` does not wait for Yandex Disk:
+files are spooled to `UPLOAD_TMP_DIR`, get their short links at once and
+are stored on Disk later by a pool of worker threads.
+
+This module provides:
+- `enqueue_files`: spools uploaded files and creates their `UploadJob`s.
+- `run_pending_jobs`: claims and runs queued jobs until none is left.
+- `UploadWorkerPool`: threads running `run_pending_jobs`, woken up on
+  new jobs and polling the database for jobs queued by other processes.
+- `upload_workers`: the process-wide pool.
+- `start_upload_workers`: starts the pool with the application when
+  `UPLOAD_QUEUE_ENABLED` is set, so jobs left by a previous run are
+  picked up without waiting for a new upload.
+
+The queue lives in the application database, so no separate broker is
+needed and any process on the same host can pick up a job left by
+another one. Spooled files are local: a job is run only on the host
+named `UPLOAD_QUEUE_HOST` when it was queued. Failed jobs are retried
+with an exponential backoff starting at `UPLOAD_JOB_RETRY_DELAY`.
+"""
+
+import asyncio
+import sys
+import threading
+from uuid import uuid4
+
+from . import app
+from .models import UploadJob
+from .storage import remove_spooled, store_spooled, write_chunk
+
+
+def enqueue_files(files):
+    """
+    Spool `files` and queue them for upload; return their jobs.
+
+    A job is committed only once its file is spooled, so a worker never
+    picks up a partly written file.
+    """
+    jobs = []
+    for file in files:
+        job_id = uuid4().hex
+        write_chunk(job_id, 0, file.stream, sys.maxsize)
+        jobs.append(UploadJob.create(
+            job_id, file.filename, app.config['UPLOAD_QUEUE_HOST']))
+    upload_workers.notify()
+    return jobs
+
+
+def run_job(job):
+    """Store the spooled file of a claimed job on Disk."""
+    try:
+        result = asyncio.run(store_spooled(job.id, job.filename))
+        error = result.error
+    except OSError:
+        error = 'Не удалось загрузить файл'
+    if error:
+        job.fail(error, app.config['UPLOAD_JOB_MAX_ATTEMPTS'],
+                 app.config['UPLOAD_JOB_RETRY_DELAY'])
+    else:
+        job.finish(result.path)
+    if job.status in (UploadJob.DONE, UploadJob.FAILED):
+        remove_spooled(job.id)
+
+
+def run_pending_jobs():
+    """Run due jobs of this host until none is left; return how many ran."""
+    count = 0
+    while True:
+        job = UploadJob.claim(app.config['UPLOAD_JOB_STALE_AFTER'],
+                              app.config['UPLOAD_QUEUE_HOST'])
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
+
+
+class UploadWorkerPool:
+    """Worker threads draining the upload queue."""
+
+    def __init__(self):
+        """Initialize a stopped pool."""
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start `UPLOAD_QUEUE_WORKERS` threads unless already running."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for number in range(app.config['UPLOAD_QUEUE_WORKERS']):
+                thread = threading.Thread(
+                    target=self._work, name=f'yacut-upload-{number}',
+                    daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Wake the workers up, starting them if needed."""
+        self.start()
+        self._wakeup.set()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                with app.app_context():
+                    run_pending_jobs()
+            except Exception:
+                app.logger.exception('Ошибка в обработчике очереди загрузок')
+            self._wakeup.wait(app.config['UPLOAD_QUEUE_POLL_INTERVAL'])
+            self._wakeup.clear()
+
+    def stop(self):
+        """Stop the workers after their current job."""
+        with self._lock:
+            self._stopping.set()
+            self._wakeup.set()
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+
+def start_upload_workers():
+    """Start the pool if the upload queue is enabled."""
+    if app.config['UPLOAD_QUEUE_ENABLED']:
+        upload_workers.start()
+
+
+upload_workers = UploadWorkerPool()
+start_upload_workers()
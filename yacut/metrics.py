@@ -0,0 +1,407 @@
+"""Prometheus metrics of the YaCut service.
+
+This module provides:
+- `format_metric`: renders one metric family in the Prometheus text
+  exposition format.
+- `Counter` and `Histogram`: metrics that are cheap to update from hot
+  paths. Every thread writes to its own shard without taking a lock; the
+  shards are only summed up when the metrics are scraped, and the shards
+  of finished threads are folded into one.
+- `StatsCollector`: exposes the `stats()` snapshot of a component, such
+  as a cache or the Disk client, as untyped samples.
+- `register`: adds a collector to the `/metrics` output.
+- `PoolMetrics`: measures how long checking out a database connection
+  takes, including the wait for a free one, and how often it times out;
+  it also reads the current state of every connection pool.
+- `pool_metrics`: the process-wide instance, attached to the engines of
+  `db` at import time.
+- `request_seconds`, `db_query_seconds`: request latency per endpoint and
+  database statement latency per operation, recorded by request hooks
+  and SQLAlchemy cursor events.
+- `disk_request_seconds`, `disk_request_errors`: Yandex Disk API calls
+  per step (`upload_link`, `upload`, `download_link`).
+- `short_id_allocations`, `short_id_retries`: generated short IDs and
+  inserts repeated because a generated ID was already taken.
+- `metrics_view` ("/metrics"): the scrape endpoint.
+
+Engines are labelled by their Flask-SQLAlchemy bind: `default` for the
+main database, `replica0`, `replica1`, ... for the read replicas. Pool
+size, overflow and the like are only reported for queue pools; SQLite
+in-memory and null pools have no such state.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from . import app, db
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+OPERATIONS = {'select', 'insert', 'update', 'delete'}
+
+collectors = []
+
+
+def register(collector):
+    """Add an object with a `render()` method to the `/metrics` output."""
+    collectors.append(collector)
+    return collector
+
+
+def format_labels(labels):
+    """Render a label set as `{name="value",...}`."""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def format_metric(name, kind, description, samples):
+    """
+    Return the exposition lines of one metric family.
+
+    `samples` is an iterable of `(suffix, labels, value)`, where the suffix
+    is appended to the name, e.g. `_sum` and `_count` of a summary.
+    """
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+    lines.extend(
+        f'{name}{suffix}{format_labels(labels)} {value}'
+        for suffix, labels, value in samples
+    )
+    return lines
+
+
+class Metric:
+    """A metric family whose values are sharded per writing thread."""
+
+    kind = None
+
+    def __init__(self, name, description, labelnames=()):
+        """Initialize the metric and add it to the `/metrics` output."""
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+        register(self)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _merge(self, total, shard):
+        raise NotImplementedError
+
+    def collect(self):
+        """Return the values of all threads, keyed by label values."""
+        total = {}
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = alive
+            self._merge(total, self._retired)
+            for _, shard in alive:
+                self._merge(total, shard.copy())
+        return total
+
+    def clear(self):
+        """Reset the values of all threads."""
+        with self._lock:
+            for _, shard in self._shards:
+                shard.clear()
+            self._retired.clear()
+
+    def labels(self, values):
+        """Return the label set of a tuple of label values."""
+        return dict(zip(self.labelnames, values))
+
+
+class Counter(Metric):
+    """Monotonic counter."""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        """Add `amount` to the counter of `labels`."""
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, total, shard):
+        for labels, value in shard.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def render(self):
+        """Return the counter in the exposition format."""
+        return format_metric(self.name, self.kind, self.description, [
+            ('', self.labels(labels), value)
+            for labels, value in sorted(self.collect().items())
+        ])
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        """Initialize the histogram with upper bounds of its buckets."""
+        super().__init__(name, description, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        """Record one value for `labels`."""
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of the `with` block, even if it fails."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _merge(self, total, shard):
+        for labels, values in shard.items():
+            merged = total.setdefault(labels, [0] * len(values))
+            for index, value in enumerate(list(values)):
+                merged[index] += value
+
+    def render(self):
+        """Return the histogram in the exposition format."""
+        samples = []
+        for labels, values in sorted(self.collect().items()):
+            label_set = self.labels(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                samples.append(
+                    ('_bucket', dict(label_set, le=bound), cumulative))
+            samples.append(('_sum', label_set, values[-1]))
+            samples.append(('_count', label_set, cumulative))
+        return format_metric(
+            self.name, self.kind, self.description, samples)
+
+
+class StatsCollector:
+    """Untyped samples from the `stats()` snapshot of a component."""
+
+    def __init__(self, prefix, description, source):
+        """Expose every key of `source()` as `<prefix>_<key>`."""
+        self.prefix = prefix
+        self.description = description
+        self.source = source
+        register(self)
+
+    def render(self):
+        """Return one untyped metric per statistic."""
+        lines = []
+        for key, value in self.source().items():
+            lines += format_metric(
+                f'{self.prefix}_{key}', 'untyped',
+                f'{self.description}: {key}.', [('', {}, value)])
+        return lines
+
+
+class PoolMetrics:
+    """Connection pool wait times, timeouts and state per engine."""
+
+    def __init__(self, clock=time.perf_counter):
+        """Initialize empty counters."""
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._engines = {}
+        self._waits = {}
+
+    def instrument(self, engines):
+        """
+        Time connection checkouts of `engines`, a mapping of bind to engine.
+
+        The engine's `raw_connection` is wrapped rather than the pool's
+        `connect`, so the measurement survives `engine.dispose()`, which
+        replaces the pool. Engines already instrumented are skipped.
+        """
+        for bind, engine in engines.items():
+            label = bind or 'default'
+            with self._lock:
+                if self._engines.get(label) is engine:
+                    continue
+                self._engines[label] = engine
+                self._waits[label] = [0.0, 0, 0]
+            engine.raw_connection = self._timed(
+                label, engine.raw_connection)
+
+    def _timed(self, label, raw_connection):
+        def connect():
+            started = self._clock()
+            try:
+                return raw_connection()
+            except PoolTimeoutError:
+                with self._lock:
+                    self._waits[label][2] += 1
+                raise
+            finally:
+                waited = self._clock() - started
+                with self._lock:
+                    self._waits[label][0] += waited
+                    self._waits[label][1] += 1
+        return connect
+
+    def stats(self):
+        """Return the counters and pool state of every engine."""
+        result = {}
+        with self._lock:
+            items = [
+                (label, engine, list(self._waits[label]))
+                for label, engine in self._engines.items()
+            ]
+        for label, engine, (wait, checkouts, timeouts) in items:
+            stats = dict(
+                wait_seconds=wait, checkouts=checkouts, timeouts=timeouts)
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                stats.update(
+                    size=pool.size(),
+                    checked_in=pool.checkedin(),
+                    checked_out=pool.checkedout(),
+                    overflow=max(pool.overflow(), 0),
+                )
+            result[label] = stats
+        return result
+
+    def render(self):
+        """Return the pool metrics in the exposition format."""
+        stats = self.stats()
+        lines = format_metric(
+            'yacut_db_pool_wait_seconds', 'summary',
+            'Time spent checking out a database connection.',
+            [
+                (suffix, {'bind': label}, values[key])
+                for label, values in stats.items()
+                for suffix, key in (
+                    ('_sum', 'wait_seconds'), ('_count', 'checkouts'))
+            ])
+        lines += format_metric(
+            'yacut_db_pool_timeouts_total', 'counter',
+            'Connection checkouts that timed out.',
+            [('', {'bind': label}, values['timeouts'])
+             for label, values in stats.items()])
+        for key, description in (
+            ('size', 'Configured number of pooled connections.'),
+            ('checked_in', 'Idle connections in the pool.'),
+            ('checked_out', 'Connections in use.'),
+            ('overflow', 'Connections opened beyond the pool size.'),
+        ):
+            lines += format_metric(
+                f'yacut_db_pool_{key}', 'gauge', description,
+                [('', {'bind': label}, values[key])
+                 for label, values in stats.items() if key in values])
+        return lines
+
+
+pool_metrics = register(PoolMetrics())
+with app.app_context():
+    pool_metrics.instrument(db.engines)
+
+request_seconds = Histogram(
+    'yacut_request_duration_seconds',
+    'Time to handle a request.', ('endpoint',))
+responses_total = Counter(
+    'yacut_responses_total',
+    'Responses by endpoint and status code.', ('endpoint', 'status'))
+db_query_seconds = Histogram(
+    'yacut_db_query_duration_seconds',
+    'Time to execute a database statement.', ('operation',))
+disk_request_seconds = Histogram(
+    'yacut_disk_request_duration_seconds',
+    'Time of a Yandex Disk API call.', ('step',))
+disk_request_errors = Counter(
+    'yacut_disk_request_errors_total',
+    'Failed or timed out Yandex Disk API calls.', ('step',))
+short_id_allocations = Counter(
+    'yacut_short_id_allocations_total', 'Generated short IDs.')
+short_id_retries = Counter(
+    'yacut_short_id_retries_total',
+    'Inserts retried because a generated short ID was already taken.')
+
+
+def get_operation(statement):
+    """Return the kind of an SQL statement, one of `OPERATIONS` or other."""
+    operation = statement.lstrip()[:6].lower()
+    return operation if operation in OPERATIONS else 'other'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context,
+                      executemany):
+    """Remember when the statement was sent to the database."""
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def observe_query(conn, cursor, statement, parameters, context,
+                  executemany):
+    """Record the duration of the statement."""
+    started = conn.info.pop('query_started', None)
+    if started is not None:
+        db_query_seconds.observe(
+            time.perf_counter() - started, get_operation(statement))
+
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started."""
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    """Record the latency and status of the request."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'none'
+        request_seconds.observe(time.perf_counter() - started, endpoint)
+        responses_total.inc(endpoint, str(response.status_code))
+    return response
+
+
+@app.route('/metrics')
+def metrics_view():
+    """Expose the service metrics to Prometheus."""
+    pool_metrics.instrument(db.engines)
+    lines = [line for collector in collectors for line in collector.render()]
+    return app.response_class(
+        '\n'.join(lines) + '\n', content_type=CONTENT_TYPE)
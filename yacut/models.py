@@ -1,20 +1,61 @@
 """Database model definitions for the YaCut URL shortening service.
 
-This module defines the SQLAlchemy model `URLMap`, which stores
-associations between long original URLs and their shortened identifiers.
+This module defines the SQLAlchemy models:
+- `URLMap`, which stores associations between long original URLs and
+  their shortened identifiers. `original_hash` indexes a fixed-width
+  hash of the normalized URL, used to find duplicates.
+- `ShortIdCounter`, a single-row counter from which the short ID
+  allocator reserves blocks of IDs.
+- `StoredFile`, an index from the content hash of an uploaded file to
+  its path on Yandex Disk, used to skip re-uploading identical files.
+- `UploadSession`, the state of a resumable (chunked) file upload.
+- `ClickStat`, per-minute click counters of short links, written in
+  batches by the click recorder.
+- `UploadJob`, a queued upload of a spooled file to Yandex Disk; the
+  table itself is the queue, claimed by workers with conditional updates.
 """
 
-import random
-import string
-from datetime import datetime
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from uuid import uuid4
 
-from yacut import db
+from sqlalchemy import (
+    and_, bindparam, delete, func, insert, or_, select, update
+)
+from sqlalchemy.exc import IntegrityError
+
+from yacut import app, db
+from .allocators import create_allocator
+from .bloom import ShortIdFilter
+from .cache import MISSING, resolution_cache
 from .constants import (
     ALLOWED_CHARS,
+    ALLOWED_FILE_EXTENSIONS,
+    ALLOWED_URL_SCHEMES,
+    CLICK_UPSERT_CHUNK_SIZE,
     CUSTOM_ID_MAX_LENGTH,
+    DISK_PATH_PREFIX,
+    DUPLICATE_SHORT_ID_MESSAGE,
+    FILENAME_MAX_LENGTH,
+    INVALID_URL_MESSAGE,
+    ORIGINAL_HASH_LENGTH,
     ORIGINAL_MAX_LENGTH,
-    RESERVED
+    PENDING_UPLOAD_PREFIX,
+    RESERVED,
+    SHORT_ID_MAX_ATTEMPTS,
+    UNSAFE_FILENAME_CHARS
 )
+from .metrics import (
+    StatsCollector,
+    short_id_allocations,
+    short_id_retries
+)
+from .replicas import replica_router
+from .utils import is_pending_upload, normalize_url
+
+ReusedLink = namedtuple('ReusedLink', ['original', 'short'])
 
 
 class URLMap(db.Model):
@@ -29,47 +70,824 @@ class URLMap(db.Model):
     original = db.Column(db.String(ORIGINAL_MAX_LENGTH), nullable=False)
     short = db.Column(db.String(CUSTOM_ID_MAX_LENGTH), unique=True)
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True)
+    original_hash = db.Column(db.String(ORIGINAL_HASH_LENGTH), index=True)
 
     @classmethod
-    def get_unique_short_id(cls, length=6):
-        """Generate a unique short identifier not present in the database."""
-        characters = string.ascii_letters + string.digits
-        max_attempts = 10
-        for attempt in range(max_attempts):
-            short_id = (
-                ''.join(random.choice(characters) for _ in range(length))
-            )
-            if not cls.query.filter_by(short=short_id).first():
-                return short_id
-        return cls.get_unique_short_id(length + 1)
+    def get_unique_short_id(cls):
+        """Allocate a new short identifier without querying the table."""
+        short_id_allocations.inc()
+        return short_id_allocator.allocate()
 
     @classmethod
-    def validate_user_code(cls, original_url, custom_id=None):
-        """Validate a user-provided custom short code."""
+    def clean_user_input(cls, original_url, custom_id=None):
+        """
+        Validate user input without touching the database.
+
+        Only absolute `http` and `https` URLs are accepted: Disk paths and
+        pending upload placeholders are stored by the upload code alone.
+        Return the stripped original URL and custom short code (an empty
+        string when the code should be generated).
+        """
         if not original_url:
             raise ValueError('"url" является обязательным полем!')
+        if not isinstance(original_url, str):
+            raise ValueError(INVALID_URL_MESSAGE)
         original = original_url.strip()
-        if not custom_id:
-            code = cls.get_unique_short_id()
-        else:
-            code = custom_id.strip()
-            if code:
-                if not ALLOWED_CHARS.fullmatch(code):
-                    raise ValueError(
-                        'Указано недопустимое имя для короткой ссылки')
-                if (
-                    (code in RESERVED) or
-                    cls.query.filter_by(short=code).first()
-                ):
-                    raise ValueError(
-                        'Предложенный вариант короткой ссылки уже существует.')
-
-        obj = cls(original=original, short=code)
+        try:
+            parts = urlsplit(original)
+        except ValueError:
+            raise ValueError(INVALID_URL_MESSAGE)
+        if parts.scheme.lower() not in ALLOWED_URL_SCHEMES or not (
+                parts.netloc):
+            raise ValueError(INVALID_URL_MESSAGE)
+        if custom_id and not isinstance(custom_id, str):
+            raise ValueError('Указано недопустимое имя для короткой ссылки')
+        code = custom_id.strip() if custom_id else ''
+        if code:
+            if not ALLOWED_CHARS.fullmatch(code):
+                raise ValueError(
+                    'Указано недопустимое имя для короткой ссылки')
+            if code in RESERVED:
+                raise ValueError(DUPLICATE_SHORT_ID_MESSAGE)
+        return original, code
+
+    @staticmethod
+    def clean_expires_at(expires_at):
+        """
+        Validate an optional expiry time and return it as naive UTC.
+
+        Accepts a `datetime` or an ISO 8601 string; values without a time
+        zone are taken as UTC.
+        """
+        if expires_at is None or expires_at == '':
+            return None
+        if isinstance(expires_at, str):
+            try:
+                expires_at = datetime.fromisoformat(expires_at)
+            except ValueError:
+                raise ValueError('Недопустимый срок действия ссылки')
+        if not isinstance(expires_at, datetime):
+            raise ValueError('Недопустимый срок действия ссылки')
+        if expires_at.tzinfo is not None:
+            try:
+                expires_at = expires_at.astimezone(timezone.utc).replace(
+                    tzinfo=None)
+            except OverflowError:
+                raise ValueError('Недопустимый срок действия ссылки')
+        if expires_at <= datetime.utcnow():
+            raise ValueError('Срок действия ссылки должен быть в будущем')
+        return expires_at
+
+    @staticmethod
+    def get_original_hash(original):
+        """Return the `original_hash` of a URL: SHA-256 of its normal form."""
+        return hashlib.sha256(
+            normalize_url(original).encode()
+        ).hexdigest()[:ORIGINAL_HASH_LENGTH]
+
+    @staticmethod
+    def is_deduplicated(code, expires_at):
+        """Tell whether a new link may reuse an existing one."""
+        return (
+            not code and expires_at is None
+            and app.config['URL_DEDUP_ENABLED'])
+
+    @classmethod
+    def select_duplicates(cls, original_hashes):
+        """
+        Select permanent links whose URL has one of `original_hashes`.
+
+        The rows are `(short, original, original_hash)`; the URLs still
+        have to be compared, see `pick_duplicate`.
+        """
+        return select(cls.short, cls.original, cls.original_hash).where(
+            cls.original_hash.in_(original_hashes),
+            cls.expires_at.is_(None),
+        )
+
+    @staticmethod
+    def pick_duplicate(original, rows):
+        """Return the short ID of a row with the same normalized URL."""
+        normalized = normalize_url(original)
+        return next((
+            short for short, stored, _ in rows
+            if normalize_url(stored) == normalized
+        ), None)
+
+    @classmethod
+    def insert_with_short_id(cls, build, code=''):
+        """
+        Commit the objects `build(short)` returns under a new short ID.
+
+        `short` is `code`, or a generated ID if `code` is empty. The rows
+        are inserted right away and the unique index on `short` decides
+        about conflicts: a taken custom code is reported as already
+        existing, a taken generated ID (e.g. chosen by a user as a custom
+        code) is replaced and the insert retried. Return the objects.
+        """
+        for _ in range(SHORT_ID_MAX_ATTEMPTS):
+            short = code or cls.get_unique_short_id()
+            objects = build(short)
+            db.session.add_all(objects)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                if code:
+                    raise ValueError(DUPLICATE_SHORT_ID_MESSAGE)
+                short_id_retries.inc()
+                continue
+            short_id_filter.add(short)
+            return objects
+        raise RuntimeError('Не удалось подобрать свободную короткую ссылку.')
+
+    @classmethod
+    def validate_user_code(cls, original_url, custom_id=None,
+                           expires_at=None):
+        """
+        Validate a user-provided custom short code and store the link.
+
+        The row is stored with `insert_with_short_id`. With
+        `URL_DEDUP_ENABLED`, a permanent link to the same URL is returned
+        instead of a new one when no custom code is given.
+        """
+        original, code = cls.clean_user_input(original_url, custom_id)
+        expires_at = cls.clean_expires_at(expires_at)
+        original_hash = cls.get_original_hash(original)
+        if cls.is_deduplicated(code, expires_at):
+            short = cls.pick_duplicate(original, db.session.execute(
+                cls.select_duplicates([original_hash])))
+            if short is not None:
+                return cls(original=original, short=short)
+        obj, = cls.insert_with_short_id(lambda short: [cls(
+            original=original, short=short, expires_at=expires_at,
+            original_hash=original_hash)], code)
+        cls.cache_resolved(obj.short, (original, expires_at))
+        return obj
+
+    @classmethod
+    def create_file_link(cls, path):
+        """Store a link to a file at `path` on Disk under a generated ID."""
+        obj, = cls.insert_with_short_id(
+            lambda short: [cls(original=path, short=short)])
+        resolution_cache.set(obj.short, path)
+        return obj
+
+    @classmethod
+    def create_batch(cls, pairs):
+        """
+        Store many `(original_url, custom_id)` pairs at once.
+
+        Input is validated with `clean_user_input`, taken custom codes are
+        looked up with a single query, generated codes are allocated in
+        bulk and all rows are inserted with one executemany and one
+        commit. Return a list in input order holding either the created
+        link as an `(original, short)` tuple or a `ValueError`. With
+        `URL_DEDUP_ENABLED`, URLs without a custom code reuse existing
+        permanent links, found with one more query, and repeated URLs
+        within the batch share one new link.
+        """
+        results = []
+        for original_url, custom_id in pairs:
+            try:
+                results.append(cls.clean_user_input(original_url, custom_id))
+            except ValueError as error:
+                results.append(error)
+        repeats = {}
+        if cls.is_deduplicated('', None):
+            repeats = cls._reuse_links(results)
+        rows = cls._assign_codes(results)
+        for index, first in repeats.items():
+            results[index] = ReusedLink(results[index][0], results[first][1])
+        if rows:
+            try:
+                db.session.execute(insert(cls), rows)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return cls._create_one_by_one(pairs, results)
+        for row in rows:
+            short_id_filter.add(row['short'])
+            resolution_cache.set(row['short'], row['original'])
+        return results
+
+    @classmethod
+    def _reuse_links(cls, results):
+        """
+        Point links without a custom code at existing links to their URL.
+
+        Reused links are marked with `ReusedLink`, so that `_assign_codes`
+        neither inserts them nor reports their code as taken. Return a
+        dict mapping the index of every later repeat of a new URL in the
+        batch to the index of its first occurrence; repeats are marked
+        with a `ReusedLink` without a code until that one is assigned.
+        """
+        hashes = {
+            index: cls.get_original_hash(result[0])
+            for index, result in enumerate(results)
+            if isinstance(result, tuple) and not result[1]
+        }
+        if not hashes:
+            return {}
+        existing = {}
+        for short, stored, original_hash in db.session.execute(
+                cls.select_duplicates(set(hashes.values()))):
+            existing.setdefault(normalize_url(stored), short)
+        first, repeats = {}, {}
+        for index in hashes:
+            original = results[index][0]
+            normalized = normalize_url(original)
+            if normalized in existing:
+                results[index] = ReusedLink(original, existing[normalized])
+            elif normalized in first:
+                results[index] = ReusedLink(original, None)
+                repeats[index] = first[normalized]
+            else:
+                first[normalized] = index
+        return repeats
+
+    @classmethod
+    def _assign_codes(cls, results):
+        """Resolve custom code conflicts and fill in generated codes."""
+        valid = [
+            result for result in results
+            if isinstance(result, tuple) and not isinstance(
+                result, ReusedLink)]
+        count = sum(1 for _, code in valid if not code)
+        short_id_allocations.inc(amount=count)
+        generated = iter(short_id_allocator.allocate_many(count))
+        custom = {code for _, code in valid if code}
+        taken = set()
+        if custom:
+            taken.update(db.session.scalars(
+                select(cls.short).where(cls.short.in_(custom))))
+        rows = []
+        for index, result in enumerate(results):
+            if not isinstance(result, tuple) or isinstance(
+                    result, ReusedLink):
+                continue
+            original, code = result
+            if code in taken:
+                results[index] = ValueError(DUPLICATE_SHORT_ID_MESSAGE)
+                continue
+            code = code or next(generated)
+            taken.add(code)
+            results[index] = (original, code)
+            rows.append(dict(
+                original=original, short=code,
+                original_hash=cls.get_original_hash(original)))
+        return rows
+
+    @classmethod
+    def _create_one_by_one(cls, pairs, results):
+        """Fall back to single inserts when a concurrent write won a race."""
+        for index, (original_url, custom_id) in enumerate(pairs):
+            if isinstance(results[index], ValueError):
+                continue
+            try:
+                obj = cls.validate_user_code(original_url, custom_id)
+            except ValueError as error:
+                results[index] = error
+                continue
+            results[index] = (obj.original, obj.short)
+        return results
+
+    @staticmethod
+    def cache_resolved(short_id, row):
+        """
+        Cache a looked-up `(original, expires_at)` row, or None if absent.
+
+        Links that expire are cached no longer than they live; expired
+        ones are treated as unknown. Placeholders of files still being
+        uploaded are cached no longer than unknown IDs, so that other
+        processes notice a finished upload soon. Return the original URL
+        or `MISSING`.
+        """
+        if row is None:
+            resolution_cache.set(short_id, MISSING)
+            return MISSING
+        original, expires_at = row
+        ttl = None
+        if expires_at is not None:
+            ttl = (expires_at - datetime.utcnow()).total_seconds()
+            if ttl <= 0:
+                resolution_cache.set(short_id, MISSING)
+                return MISSING
+        if is_pending_upload(original):
+            ttl = resolution_cache.negative_ttl
+        resolution_cache.set(short_id, original, ttl=ttl)
+        return original
+
+    @classmethod
+    def get_original(cls, short_id):
+        """
+        Return the original URL stored for `short_id`, or None.
+
+        This is the redirect hot path: `resolution_cache` first, then
+        `ORIGINAL_BY_SHORT`, a Core statement compiled once and run on the
+        session's connection without building ORM objects or touching the
+        identity map. The statement goes to a read replica first and to
+        the primary if no replica has the link (yet). Unknown and expired
+        IDs are cached as well, including those `short_id_filter` rules
+        out without a lookup by short ID.
+        """
+        original = resolution_cache.get(short_id)
+        if original is None:
+            if not short_id_filter.might_contain(short_id):
+                cls.cache_resolved(short_id, None)
+                return None
+            params = {'short': short_id}
+            row = replica_router.first(ORIGINAL_BY_SHORT, params)
+            if row is None:
+                row = db.session.connection().execute(
+                    ORIGINAL_BY_SHORT, params).first()
+            original = cls.cache_resolved(short_id, row)
+        return None if original is MISSING else original
+
+    @classmethod
+    def get_by_short(cls, short_id):
+        """
+        Return a transient URLMap for the given short_id, or None.
+
+        The object carries only `original` and `short` and is not attached
+        to the session; see `get_original`.
+        """
+        original = cls.get_original(short_id)
+        if original is None:
+            return None
+        return cls(original=original, short=short_id)
+
+    @classmethod
+    def resolve_many(cls, short_ids):
+        """
+        Resolve many short IDs at once.
+
+        Cached entries are served from `resolution_cache`; the rest is
+        fetched with a single `IN (...)` query (plus one on the primary for
+        IDs the replicas lack) and written back to the cache, including
+        the misses. Return a dict mapping every short ID to its stored
+        original (a Disk path or pending upload placeholder for files) or
+        None.
+        """
+        short_ids = list(dict.fromkeys(short_ids))
+        cached = resolution_cache.get_many(short_ids)
+        resolved = {
+            short_id: None if original is MISSING else original
+            for short_id, original in cached.items()
+        }
+        for short_id in short_id_filter.find_absent([
+                short_id for short_id in short_ids
+                if short_id not in resolved]):
+            cls.cache_resolved(short_id, None)
+            resolved[short_id] = None
+        pending = [
+            short_id for short_id in short_ids if short_id not in resolved]
+        if pending:
+            found = cls._find_rows(pending)
+            for short_id in pending:
+                original = cls.cache_resolved(short_id, found.get(short_id))
+                resolved[short_id] = None if original is MISSING else original
+        return {short_id: resolved[short_id] for short_id in short_ids}
+
+    @classmethod
+    def _find_rows(cls, short_ids):
+        """
+        Map short IDs to `(original, expires_at)` rows.
+
+        Replicas are asked first; IDs they do not know are looked up on
+        the primary with a second `IN (...)` query.
+        """
+        def statement(ids):
+            return (
+                select(cls.short, cls.original, cls.expires_at)
+                .where(cls.short.in_(ids)))
+
+        rows = replica_router.all(statement(short_ids)) or []
+        found = {short: (original, expires_at)
+                 for short, original, expires_at in rows}
+        missing = [short_id for short_id in short_ids
+                   if short_id not in found]
+        if missing:
+            found.update(
+                (short, (original, expires_at))
+                for short, original, expires_at in db.session.execute(
+                    statement(missing)))
+        return found
+
+    @classmethod
+    def hash_originals(cls, batch_size):
+        """
+        Fill in `original_hash` of links created before it existed.
+
+        Links are walked in primary key order, `batch_size` per
+        transaction; Disk paths and pending uploads are skipped. Return
+        the number of links updated.
+        """
+        updated = last_id = 0
+        while True:
+            batch = db.session.execute(
+                select(cls.id, cls.original)
+                .where(
+                    cls.id > last_id,
+                    cls.original_hash.is_(None),
+                    cls.original.not_like(DISK_PATH_PREFIX + '%'),
+                    cls.original.not_like(PENDING_UPLOAD_PREFIX + '%'),
+                )
+                .order_by(cls.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                return updated
+            db.session.execute(
+                update(cls).execution_options(synchronize_session=False),
+                [dict(id=row.id, original_hash=cls.get_original_hash(
+                    row.original)) for row in batch])
+            db.session.commit()
+            last_id = batch[-1].id
+            updated += len(batch)
+
+    @classmethod
+    def purge_expired(cls, batch_size, now=None):
+        """
+        Delete expired links and return how many were deleted.
+
+        Each batch takes the next `batch_size` rows from the `expires_at`
+        index and deletes them by primary key in a short transaction of
+        its own, so no lock is held for the whole purge.
+        """
+        now = now or datetime.utcnow()
+        deleted = 0
+        while True:
+            batch = db.session.execute(
+                select(cls.id, cls.short)
+                .where(cls.expires_at <= now)
+                .order_by(cls.expires_at)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                return deleted
+            db.session.execute(
+                delete(cls).where(cls.id.in_([row.id for row in batch])))
+            db.session.commit()
+            for row in batch:
+                resolution_cache.invalidate(row.short)
+            deleted += len(batch)
+            if len(batch) < batch_size:
+                return deleted
+
+
+ORIGINAL_BY_SHORT = (
+    select(URLMap.__table__.c.original, URLMap.__table__.c.expires_at)
+    .where(URLMap.__table__.c.short == bindparam('short'))
+)
+
+
+class ShortIdCounter(db.Model):
+    """Persistent counter behind `BlockCounterAllocator`."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False)
+
+    @classmethod
+    def reserve_block(cls, size):
+        """Atomically advance the counter and return the block start."""
+        table = cls.__table__
+        while True:
+            try:
+                with db.engine.begin() as connection:
+                    updated = connection.execute(
+                        update(table)
+                        .where(table.c.id == 1)
+                        .values(value=table.c.value + size)
+                    )
+                    if updated.rowcount:
+                        return connection.execute(
+                            select(table.c.value).where(table.c.id == 1)
+                        ).scalar_one() - size
+                    connection.execute(insert(table).values(id=1, value=size))
+                    return 0
+            except IntegrityError:
+                continue
+
+
+class StoredFile(db.Model):
+    """Content hash of an uploaded file and where it is stored on Disk."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    path = db.Column(db.String(ORIGINAL_MAX_LENGTH), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def get_paths(cls, content_hashes):
+        """Return a dict of known Disk paths, fetched with one query."""
+        if not content_hashes:
+            return {}
+        return dict(db.session.execute(
+            select(cls.content_hash, cls.path)
+            .where(cls.content_hash.in_(set(content_hashes)))).all())
+
+    @classmethod
+    def remember(cls, paths):
+        """Store `{content_hash: path}`, skipping hashes stored meanwhile."""
+        if not paths:
+            return
+        rows = [
+            dict(content_hash=content_hash, path=path)
+            for content_hash, path in paths.items()
+        ]
+        try:
+            db.session.execute(insert(cls), rows)
+            db.session.commit()
+            return
+        except IntegrityError:
+            db.session.rollback()
+        for row in rows:
+            try:
+                db.session.execute(insert(cls), row)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+
+
+class UploadSession(db.Model):
+    """
+    A file received in chunks; `received` is the resume offset.
+
+    `timestamp` is the time of the last received chunk.
+    """
+
+    id = db.Column(db.String(32), primary_key=True)
+    filename = db.Column(db.String(FILENAME_MAX_LENGTH), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    short = db.Column(db.String(CUSTOM_ID_MAX_LENGTH))
+    timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+
+    @classmethod
+    def start(cls, filename, size):
+        """
+        Validate the announced file and open a new upload session.
+
+        The name becomes part of the Disk path, so path separators and
+        control characters are rejected.
+        """
+        if not filename or not isinstance(filename, str):
+            raise ValueError('"filename" является обязательным полем!')
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if (
+            '.' not in filename or
+            extension not in ALLOWED_FILE_EXTENSIONS or
+            len(filename) > FILENAME_MAX_LENGTH or
+            UNSAFE_FILENAME_CHARS.search(filename)
+        ):
+            raise ValueError('Недопустимое имя файла')
+        if (
+            not isinstance(size, int) or isinstance(size, bool) or
+            not 0 < size <= app.config['UPLOAD_MAX_SIZE']
+        ):
+            raise ValueError('Недопустимый размер файла')
+        obj = cls(id=uuid4().hex, filename=filename, size=size, received=0)
         db.session.add(obj)
         db.session.commit()
         return obj
 
+    def advance(self, offset, received):
+        """
+        Move the resume offset from `offset` to `received`.
+
+        Return False if another request has moved the offset meanwhile.
+        """
+        updated = db.session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == self.id,
+                   UploadSession.received == offset)
+            .values(received=received, timestamp=datetime.utcnow())
+        )
+        db.session.commit()
+        if not updated.rowcount:
+            return False
+        self.received = received
+        return True
+
     @classmethod
-    def get_by_short(cls, short_id):
-        """Return the URLMap object matching the given short_id."""
-        return cls.query.filter_by(short=short_id).first()
\ No newline at end of file
+    def purge_stale(cls, before, batch_size):
+        """
+        Delete sessions idle since before `before`; return their IDs.
+
+        Rows are deleted in batches of `batch_size`, each in a short
+        transaction of its own, like `URLMap.purge_expired`.
+        """
+        deleted = []
+        while True:
+            batch = db.session.execute(
+                select(cls.id)
+                .where(cls.timestamp < before)
+                .order_by(cls.timestamp)
+                .limit(batch_size)
+            ).scalars().all()
+            if not batch:
+                return deleted
+            db.session.execute(delete(cls).where(cls.id.in_(batch)))
+            db.session.commit()
+            deleted.extend(batch)
+            if len(batch) < batch_size:
+                return deleted
+
+    @property
+    def is_complete(self):
+        """Return True once every byte of the file has been received."""
+        return self.received == self.size
+
+
+class UploadJob(db.Model):
+    """
+    A file spooled to local storage, waiting to be stored on Disk.
+
+    Its short link exists from the start and points to a pending
+    placeholder (`upload:<job id>`) until the job is done. `host` is the
+    host holding the spooled file; a failed job is not retried before
+    `not_before`.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = db.Column(db.String(32), primary_key=True)
+    short = db.Column(db.String(CUSTOM_ID_MAX_LENGTH), nullable=False,
+                      index=True)
+    filename = db.Column(db.String(FILENAME_MAX_LENGTH), nullable=False)
+    status = db.Column(db.String(16), nullable=False, index=True,
+                       default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(256))
+    timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    host = db.Column(db.String(255))
+    not_before = db.Column(db.DateTime)
+
+    @classmethod
+    def create(cls, job_id, filename, host):
+        """
+        Commit a pending job for the file spooled as `job_id` on `host`.
+
+        The job and its placeholder link are inserted together with
+        `URLMap.insert_with_short_id`, so a taken generated ID is retried.
+        """
+        job, _ = URLMap.insert_with_short_id(lambda short: [
+            cls(id=job_id, filename=filename, status=cls.PENDING,
+                attempts=0, short=short, host=host),
+            URLMap(original=PENDING_UPLOAD_PREFIX + job_id, short=short),
+        ])
+        return job
+
+    @classmethod
+    def _claimable(cls, now, stale_after, host):
+        """
+        Jobs of `host` due for a run.
+
+        These are pending jobs past their retry delay and running jobs
+        whose worker has gone silent. Jobs queued before hosts were
+        recorded may be run anywhere.
+        """
+        return and_(
+            or_(cls.host == host, cls.host.is_(None)),
+            or_(
+                and_(cls.status == cls.PENDING,
+                     or_(cls.not_before.is_(None), cls.not_before <= now)),
+                and_(cls.status == cls.RUNNING,
+                     cls.updated_at < now - timedelta(seconds=stale_after)),
+            ),
+        )
+
+    @classmethod
+    def claim(cls, stale_after, host, scan_size=10):
+        """
+        Take the oldest claimable job of `host`, or return None.
+
+        A job is claimed by an `UPDATE ... WHERE` on its previous state,
+        so concurrent workers, in this or other processes, never run the
+        same job twice.
+        """
+        now = datetime.utcnow()
+        candidates = db.session.scalars(
+            select(cls.id)
+            .where(cls._claimable(now, stale_after, host))
+            .order_by(cls.timestamp)
+            .limit(scan_size)
+        ).all()
+        for job_id in candidates:
+            claimed = db.session.execute(
+                update(cls)
+                .where(cls.id == job_id,
+                       cls._claimable(now, stale_after, host))
+                .values(status=cls.RUNNING, attempts=cls.attempts + 1,
+                        updated_at=now)
+            )
+            db.session.commit()
+            if claimed.rowcount:
+                return db.session.get(cls, job_id, populate_existing=True)
+        return None
+
+    def finish(self, path):
+        """Point the short link at the stored file and close the job."""
+        db.session.execute(
+            update(URLMap)
+            .where(URLMap.short == self.short)
+            .values(original=path)
+        )
+        self.status = self.DONE
+        self.error = None
+        self.updated_at = datetime.utcnow()
+        db.session.commit()
+        resolution_cache.set(self.short, path)
+
+    def fail(self, error, max_attempts, retry_delay):
+        """
+        Put the job back in the queue, or give up after `max_attempts`.
+
+        The next attempt waits `retry_delay` seconds, doubled after every
+        failed attempt. A job that has given up loses its short link.
+        """
+        self.error = error
+        self.updated_at = datetime.utcnow()
+        if self.attempts < max_attempts:
+            self.status = self.PENDING
+            self.not_before = self.updated_at + timedelta(
+                seconds=retry_delay * 2 ** (self.attempts - 1))
+            db.session.commit()
+            return
+        self.status = self.FAILED
+        db.session.execute(delete(URLMap).where(URLMap.short == self.short))
+        db.session.commit()
+        resolution_cache.invalidate(self.short)
+
+
+class ClickStat(db.Model):
+    """Number of redirects through a short link within one minute."""
+
+    short = db.Column(db.String(CUSTOM_ID_MAX_LENGTH), primary_key=True)
+    minute = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+    @classmethod
+    def add(cls, counts):
+        """
+        Add `{(short, minute): count}` to the stored counters.
+
+        PostgreSQL and SQLite get one `INSERT ... ON CONFLICT DO UPDATE`
+        for the whole batch; other databases an update-or-insert per row.
+        """
+        if not counts:
+            return
+        rows = [
+            dict(short=short, minute=minute, count=count)
+            for (short, minute), count in counts.items()
+        ]
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            for start in range(0, len(rows), CLICK_UPSERT_CHUNK_SIZE):
+                statement = upsert(cls).values(
+                    rows[start:start + CLICK_UPSERT_CHUNK_SIZE])
+                db.session.execute(statement.on_conflict_do_update(
+                    index_elements=[cls.short, cls.minute],
+                    set_={'count': cls.count + statement.excluded.count},
+                ))
+        else:
+            for row in rows:
+                updated = db.session.execute(
+                    update(cls)
+                    .where(cls.short == row['short'],
+                           cls.minute == row['minute'])
+                    .values(count=cls.count + row['count'])
+                )
+                if not updated.rowcount:
+                    db.session.execute(insert(cls), row)
+        db.session.commit()
+
+    @classmethod
+    def get_series(cls, short_id, since):
+        """Return the total and the per-minute counts from `since` on."""
+        total = db.session.scalar(
+            select(func.coalesce(func.sum(cls.count), 0))
+            .where(cls.short == short_id))
+        series = db.session.execute(
+            select(cls.minute, cls.count)
+            .where(cls.short == short_id, cls.minute >= since)
+            .order_by(cls.minute)
+        ).all()
+        return total, series
+
+
+short_id_allocator = create_allocator(app.config, ShortIdCounter.reserve_block)
+short_id_filter = ShortIdFilter(app.config, URLMap.short, URLMap.id)
+StatsCollector(
+    'yacut_short_id_filter', 'Bloom filter of short IDs',
+    short_id_filter.stats)
@@ -0,0 +1,176 @@
+"""Sampling profiler of individual requests.
+
+This module provides:
+- `collapse_stack`: renders a frame and its callers as one line of the
+  collapsed-stack format read by `flamegraph.pl`, speedscope and others.
+- `StackSampler`: a single background thread that, every
+  `PROFILING_INTERVAL` seconds, records the current stack of each thread
+  that is serving a profiled request. Nothing is traced, so a profiled
+  request only pays for the short pauses of the sampler thread.
+- `ProfilingMiddleware`: WSGI middleware installed on `app.wsgi_app`
+  that decides which requests to profile and writes their stacks to
+  `PROFILING_DIR`, one `.collapsed` file per request.
+- `reload_settings` and `handle_sighup`: re-read the `PROFILING_*`
+  settings in a running process.
+
+With `PROFILING_ENABLED`, a `PROFILING_SAMPLE_RATE` fraction of requests
+is profiled and always dumped. With `PROFILING_SLOW_THRESHOLD`, every
+request is sampled and dumped when it takes at least that many seconds.
+The settings are read from `app.config` on every request. To switch
+profiling in a running process, edit the `PROFILING_*` variables in the
+`.env` file and send the process `SIGHUP`: `reload_settings` re-reads
+them, with the file taking precedence over the environment the process
+was started with. The handler is only installed where `SIGHUP` is not
+handled already, e.g. by the server.
+
+Requests answered natively by the ASGI entry point are not profiled;
+those handed over to Flask are.
+"""
+
+import os
+import random
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from uuid import uuid4
+
+from dotenv import dotenv_values, find_dotenv
+
+from settings import get_profiling_settings
+from . import app
+
+UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9]+')
+
+
+def collapse_stack(frame):
+    """Return `root;...;leaf` for the call stack ending in `frame`."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('{} ({}:{})'.format(
+            code.co_name, os.path.basename(code.co_filename),
+            code.co_firstlineno))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Periodically records the stacks of the tracked threads."""
+
+    def __init__(self, config):
+        """Initialize the sampler; the thread starts on first use."""
+        self.config = config
+        self._tracked = {}
+        self._active = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, ident):
+        """Start sampling a thread; return its stack counter."""
+        stacks = Counter()
+        with self._lock:
+            self._tracked[ident] = stacks
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._work, name='yacut-profiler', daemon=True)
+                self._thread.start()
+        return stacks
+
+    def untrack(self, ident):
+        """Stop sampling a thread; its counter is final afterwards."""
+        with self._lock:
+            self._tracked.pop(ident, None)
+            if not self._tracked:
+                self._active.clear()
+
+    def _work(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.config['PROFILING_INTERVAL'])
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._tracked.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[collapse_stack(frame)] += 1
+            del frames
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles a share of the requests."""
+
+    def __init__(self, wsgi_app, config):
+        """Wrap `wsgi_app`; `config` is read on every request."""
+        self.wsgi_app = wsgi_app
+        self.config = config
+        self.sampler = StackSampler(config)
+
+    def __call__(self, environ, start_response):
+        """Serve the request, sampling its stacks if it is selected."""
+        config = self.config
+        if not config['PROFILING_ENABLED']:
+            return self.wsgi_app(environ, start_response)
+        sampled = random.random() < config['PROFILING_SAMPLE_RATE']
+        threshold = config['PROFILING_SLOW_THRESHOLD']
+        if not sampled and not threshold:
+            return self.wsgi_app(environ, start_response)
+        ident = threading.get_ident()
+        stacks = self.sampler.track(ident)
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            duration = time.perf_counter() - started
+            self.sampler.untrack(ident)
+            if stacks and (sampled or 0 < threshold <= duration):
+                self.dump(environ, duration, stacks)
+
+    def dump(self, environ, duration, stacks):
+        """Write the stacks of one request to `PROFILING_DIR`."""
+        directory = self.config['PROFILING_DIR']
+        os.makedirs(directory, exist_ok=True)
+        path = UNSAFE_PATH_CHARS.sub('_', environ.get('PATH_INFO', ''))
+        name = '{}-{}{}-{}ms-{}.collapsed'.format(
+            int(time.time()), environ.get('REQUEST_METHOD', ''),
+            path.rstrip('_')[:50], round(duration * 1000),
+            uuid4().hex[:8])
+        with open(os.path.join(directory, name), 'w') as file:
+            for stack, count in stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+def reload_settings(config=app.config, environ=os.environ):
+    """Re-read the `PROFILING_*` settings from `.env` and the environment."""
+    path = find_dotenv(usecwd=True)
+    values = {
+        name: value
+        for name, value in (dotenv_values(path) if path else {}).items()
+        if value is not None
+    }
+    config.update(get_profiling_settings({**environ, **values}))
+
+
+def handle_sighup(signum, frame):
+    """Reload the profiling settings on `SIGHUP`."""
+    reload_settings()
+    app.logger.info(
+        'Настройки профилирования перечитаны: PROFILING_ENABLED=%s',
+        app.config['PROFILING_ENABLED'])
+
+
+def install_sighup_handler():
+    """Handle `SIGHUP` unless it is unavailable or handled already."""
+    if (
+        hasattr(signal, 'SIGHUP') and
+        threading.current_thread() is threading.main_thread() and
+        signal.getsignal(signal.SIGHUP) == signal.SIG_DFL
+    ):
+        signal.signal(signal.SIGHUP, handle_sighup)
+
+
+app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app.config)
+install_sighup_handler()
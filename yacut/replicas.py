@@ -0,0 +1,106 @@
+"""Routing of read-only resolution queries to database replicas.
+
+Replicas are configured with `DATABASE_REPLICA_URIS` and become the
+Flask-SQLAlchemy binds `replica0`, `replica1`, ... This module provides:
+- `ReplicaRouter`: runs a read statement on the next healthy replica in
+  round-robin order. A replica that fails is skipped for
+  `REPLICA_RETRY_AFTER` seconds and the next one is tried.
+- `replica_router`: the process-wide router used by `URLMap`.
+
+The router never answers for the primary: it returns None when there is
+no replica or none of them could run the statement, and callers then
+query the primary themselves. Callers also go to the primary when a
+replica does not have a row yet, which keeps a link readable right after
+it was created even if the replicas lag behind.
+"""
+
+import itertools
+import threading
+import time
+
+from sqlalchemy.exc import DBAPIError
+
+from . import app, db
+from .metrics import StatsCollector
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replica engines."""
+
+    def __init__(self, retry_after, engines=None, clock=time.monotonic):
+        """
+        Initialize the router.
+
+        Without `engines`, the replica binds of `db` are used.
+        """
+        self.retry_after = retry_after
+        self._engines = engines
+        self._clock = clock
+        self._turn = itertools.count()
+        self._down_until = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.failures = 0
+
+    @property
+    def engines(self):
+        """Replica engines in configuration order."""
+        if self._engines is None:
+            return [
+                db.engines[key] for key in sorted(
+                    app.config['SQLALCHEMY_BINDS'] or {})
+                if key.startswith('replica')
+            ]
+        return self._engines
+
+    def _healthy(self):
+        engines = self.engines
+        if not engines:
+            return []
+        start = next(self._turn) % len(engines)
+        now = self._clock()
+        with self._lock:
+            return [
+                engine for engine in engines[start:] + engines[:start]
+                if self._down_until.get(engine, 0) <= now
+            ]
+
+    def _mark_down(self, engine):
+        with self._lock:
+            self._down_until[engine] = self._clock() + self.retry_after
+            self.failures += 1
+
+    def all(self, statement, params=None):
+        """Return all rows from a replica, or None to use the primary."""
+        for engine in self._healthy():
+            try:
+                with engine.connect() as connection:
+                    rows = connection.execute(statement, params).all()
+            except DBAPIError:
+                self._mark_down(engine)
+                continue
+            self.reads += 1
+            return rows
+        return None
+
+    def first(self, statement, params=None):
+        """Return the first row from a replica, or None if there is none."""
+        rows = self.all(statement, params)
+        return rows[0] if rows else None
+
+    def stats(self):
+        """Return a snapshot of the router counters."""
+        now = self._clock()
+        with self._lock:
+            down = sum(1 for until in self._down_until.values() if until > now)
+        return dict(
+            replicas=len(self.engines),
+            down=down,
+            reads=self.reads,
+            failures=self.failures,
+        )
+
+
+replica_router = ReplicaRouter(retry_after=app.config['REPLICA_RETRY_AFTER'])
+StatsCollector(
+    'yacut_replica_router', 'Read replica router', replica_router.stats)
@@ -0,0 +1,181 @@
+"""Content-addressed storage of uploaded files on Yandex Disk.
+
+This module provides:
+- `get_file_hash`: SHA-256 of a Werkzeug `FileStorage`, computed by
+  streaming the file in chunks.
+- `store_files`: uploads only the files whose content is not stored on
+  Disk yet. Identical content, from earlier requests or within the same
+  request, is looked up in the `StoredFile` index with a single query and
+  reuses the existing Disk path without any API calls.
+
+- `write_chunk` and `finish_upload`: local spooling of resumable uploads.
+  Chunks are written to `UPLOAD_TMP_DIR` at their offset; once the whole
+  file is in, it goes through `store_files` and gets a short link.
+- `store_spooled` and `remove_spooled`: the same for any spooled file,
+  also used by the background upload queue.
+- `get_spooled_size`: how much of an upload is actually on local disk.
+- `purge_stale_uploads`: deletes idle resumable uploads with their
+  spooled files.
+
+Files are stored as `app:/<hash prefix>_<file name>`, so two different
+files with the same name no longer overwrite each other.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import ClientDisconnected
+
+from . import app, db
+from .constants import UNSAFE_FILENAME_CHARS
+from .models import StoredFile, UploadSession, URLMap
+from .yadisk import UPLOAD_CHUNK_SIZE, UploadResult, upload_files_to_yadisk
+
+DISK_NAME_HASH_LENGTH = 16
+
+
+def get_file_hash(file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Return the hex SHA-256 of a file and rewind its stream."""
+    digest = hashlib.sha256()
+    stream = file.stream
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def get_disk_name(content_hash, filename):
+    """
+    Return the content-addressed file name used on Disk.
+
+    Path separators and control characters in `filename` are replaced,
+    so the file always lands in the application folder.
+    """
+    return '{}_{}'.format(
+        content_hash[:DISK_NAME_HASH_LENGTH],
+        UNSAFE_FILENAME_CHARS.sub('_', filename))
+
+
+async def store_files(files):
+    """
+    Make sure every file is stored on Disk and return its `UploadResult`.
+
+    Results come in input order; only content missing from the index is
+    uploaded, once per distinct hash.
+    """
+    if not files:
+        return []
+    hashes = [get_file_hash(file) for file in files]
+    paths = StoredFile.get_paths(hashes)
+    pending = {}
+    for file, content_hash in zip(files, hashes):
+        if content_hash not in paths:
+            pending.setdefault(content_hash, file)
+    uploaded = await upload_files_to_yadisk(
+        list(pending.values()),
+        names=[
+            get_disk_name(content_hash, file.filename)
+            for content_hash, file in pending.items()
+        ],
+    )
+    errors = {}
+    new_paths = {}
+    for content_hash, result in zip(pending, uploaded):
+        if result.error:
+            errors[content_hash] = result.error
+        else:
+            new_paths[content_hash] = result.path
+    StoredFile.remember(new_paths)
+    paths.update(new_paths)
+    return [
+        UploadResult(file.filename, paths.get(content_hash),
+                     errors.get(content_hash))
+        for file, content_hash in zip(files, hashes)
+    ]
+
+
+def get_spool_path(upload_id):
+    """Return the local path holding the received part of an upload."""
+    return os.path.join(app.config['UPLOAD_TMP_DIR'], upload_id)
+
+
+def write_chunk(upload_id, offset, stream, limit):
+    """
+    Copy at most `limit` bytes from `stream` to the spool file at `offset`.
+
+    Anything after `offset` left over from an earlier, unrecorded attempt
+    is discarded. Return the number of bytes written; if the client
+    disconnects, the bytes that did arrive are kept and counted.
+    """
+    path = get_spool_path(upload_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as spool:
+        spool.seek(offset)
+        spool.truncate()
+        try:
+            while written < limit:
+                chunk = stream.read(min(UPLOAD_CHUNK_SIZE, limit - written))
+                if not chunk:
+                    break
+                spool.write(chunk)
+                written += len(chunk)
+        except ClientDisconnected:
+            pass
+    return written
+
+
+async def store_spooled(spool_id, filename):
+    """Store a spooled file on Disk; return its `UploadResult`."""
+    with open(get_spool_path(spool_id), 'rb') as stream:
+        result, = await store_files(
+            [FileStorage(stream=stream, filename=filename)])
+    return result
+
+
+def get_spooled_size(spool_id):
+    """Return the size of a spooled file, 0 if there is none."""
+    try:
+        return os.path.getsize(get_spool_path(spool_id))
+    except FileNotFoundError:
+        return 0
+
+
+def remove_spooled(spool_id):
+    """Delete a spooled file, if it is still there."""
+    try:
+        os.remove(get_spool_path(spool_id))
+    except FileNotFoundError:
+        pass
+
+
+async def finish_upload(upload):
+    """
+    Store a completely received upload on Disk and give it a short link.
+
+    Return an error message, or None on success. On failure the spooled
+    file is kept, so finishing can be retried without re-sending data.
+    """
+    result = await store_spooled(upload.id, upload.filename)
+    if result.error:
+        return result.error
+    upload.short = URLMap.create_file_link(result.path).short
+    db.session.commit()
+    remove_spooled(upload.id)
+    return None
+
+
+def purge_stale_uploads(batch_size):
+    """
+    Delete resumable uploads idle for `UPLOAD_SESSION_STALE_AFTER`.
+
+    Their spooled files are removed too. Return how many were deleted.
+    """
+    before = datetime.utcnow() - timedelta(
+        seconds=app.config['UPLOAD_SESSION_STALE_AFTER'])
+    deleted = UploadSession.purge_stale(before, batch_size)
+    for upload_id in deleted:
+        remove_spooled(upload_id)
+    return len(deleted)
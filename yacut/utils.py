@@ -3,9 +3,13 @@
 This module provides helpers for:
 - Generating unique short identifiers (`get_unique_short_id`).
 - Validating user-provided short codes (`validate_user_code`).
-- Building absolute short links (`generate_short_link`).
-- Detecting Yandex Disk URLs (`is_yandex_disk_link`).
+- Building absolute short links (`generate_short_link`), their API
+  representation (`serialize_link`) and the
+  memoized `Location` of redirects (`get_redirect_location`).
+- Detecting links stored as Yandex Disk paths (`is_disk_path`) and
+  links to files still queued for upload (`is_pending_upload`).
 - Extracting filenames from download URLs (`get_filename_from_url`).
+- Normalizing URLs for deduplication (`normalize_url`).
 
 It also defines:
 - `ALLOWED_CHARS`: Regex pattern for valid short codes
@@ -14,12 +18,21 @@ It also defines:
 """
 
 import re
+from functools import lru_cache
 from flask import request
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, urlsplit, urlunsplit
+from werkzeug.urls import iri_to_uri
+
+from .constants import (
+    DISK_PATH_PREFIX,
+    PENDING_UPLOAD_PREFIX,
+    REDIRECT_LOCATION_CACHE_SIZE
+)
 
 
 ALLOWED_CHARS = re.compile(r'^[A-Za-z0-9]{1,16}$')
-RESERVED = {"files"}
+RESERVED = {"files", "metrics"}
+DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
 
 
 def generate_short_link(short_id):
@@ -28,9 +41,62 @@ def generate_short_link(short_id):
     return short_link
 
 
+def serialize_link(original, short_link, expires_at=None):
+    """Build the API representation of a created short link."""
+    data = {'url': original, 'short_link': short_link}
+    if expires_at is not None:
+        data['expires_at'] = expires_at.isoformat() + 'Z'
+    return data
+
+
+@lru_cache(maxsize=REDIRECT_LOCATION_CACHE_SIZE)
+def get_redirect_location(url):
+    """
+    Return the ASCII `Location` header value for a redirect to `url`.
+
+    IRI encoding is done once per distinct URL. The memo is keyed by the
+    URL itself, so a changed or deleted link simply stops being looked up
+    and can never be served a stale value.
+    """
+    return iri_to_uri(url)
+
+
+def is_disk_path(original):
+    """Return True if a stored link points to a path on Yandex Disk."""
+    return original.startswith(DISK_PATH_PREFIX)
+
+
+def is_pending_upload(original):
+    """Return True if a link points to a file not yet stored on Disk."""
+    return original.startswith(PENDING_UPLOAD_PREFIX)
+
+
 def get_filename_from_url(url, fallback):
     """Extract the filename from a Yandex Disk (or similar) URL."""
     parsed_url = urlparse(url)
     query_params = parse_qs(parsed_url.query)
     filename = query_params.get("filename", [fallback])[0]
     return filename
+
+
+def normalize_url(url):
+    """
+    Return `url` in a canonical form for deduplication.
+
+    Only changes that never alter the resource are made: the scheme and
+    host are lower-cased, the default port is dropped and an empty path
+    becomes `/`. Query and fragment are kept as they are.
+    """
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    userinfo, at, host = parts.netloc.rpartition('@')
+    host = host.lower()
+    port = DEFAULT_PORTS.get(scheme)
+    if port and host.endswith(port):
+        host = host[:-len(port)]
+    return urlunsplit((
+        scheme, userinfo + at + host, parts.path or '/', parts.query,
+        parts.fragment))
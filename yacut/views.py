@@ -4,19 +4,33 @@ This module exposes three routes:
 - `link_cut_view` ("/"): HTML form to create short links for arbitrary URLs.
 - `file_upload_view` ("/files"): Async handler that uploads multiple files to
   Yandex Disk and returns short links pointing to downloadable resources.
+  Files whose content is already stored on Disk are not uploaded again.
+  With `UPLOAD_QUEUE_ENABLED` files are queued instead and their links
+  start working once a background worker has stored them.
 - `redirect_view` ("/<short_id>"): Resolves a short ID to the original URL
-  and either redirects (generic URLs)
-  or proxies the file download (Yandex Disk).
+  and redirects to it with a bare 302 whose `Location` is memoized per
+  URL. File links store a Yandex Disk path; their download URL is
+  requested on the first visit and then cached.
 """
 
-from flask import flash, redirect, render_template
-from werkzeug.urls import iri_to_uri
+from flask import abort, flash, render_template
+from werkzeug.exceptions import ServiceUnavailable
 
-from . import app, db
+from . import app
+from .analytics import click_recorder
 from .forms import FileUploadForm, ShortLinkForm
+from .jobs import enqueue_files
 from .models import URLMap
-from .utils import generate_short_link
-from .yadisk import upload_files_to_yadisk
+from .utils import (
+    generate_short_link,
+    get_redirect_location,
+    is_disk_path,
+    is_pending_upload
+)
+from .storage import store_files
+from .yadisk import resolve_download_url
+
+UPLOAD_RETRY_AFTER = 5
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -29,6 +43,7 @@ def link_cut_view():
             obj = URLMap.validate_user_code(
                 original_url=form.original_link.data,
                 custom_id=form.custom_id.data,
+                expires_at=form.expires_at.data,
             )
         except ValueError as e:
             flash(str(e), 'error')
@@ -38,23 +53,41 @@ def link_cut_view():
     return render_template('link.html', form=form)
 
 
+async def upload_and_shorten(files):
+    """Store files on Disk right away and create their short links."""
+    results = await store_files(files)
+    pairs = []
+    for result in results:
+        if result.error:
+            pairs.append(
+                {"filename": result.filename, "error": result.error})
+            continue
+        short_id = URLMap.create_file_link(result.path).short
+        pairs.append(
+            {"filename": result.filename,
+             "url": generate_short_link(short_id)}
+        )
+    return pairs
+
+
+def queue_and_shorten(files):
+    """Queue files for a background upload and return pending links."""
+    return [
+        {"filename": job.filename, "url": generate_short_link(job.short),
+         "pending": True}
+        for job in enqueue_files(files)
+    ]
+
+
 @app.route('/files', methods=['GET', 'POST'])
 async def file_upload_view():
     """Upload multiple files to Yandex Disk and return short links."""
     form = FileUploadForm()
     if form.validate_on_submit():
-        results = await upload_files_to_yadisk(form.files.data)
-        pairs = []
-        for filename, url in results:
-            short_id = URLMap.get_unique_short_id()
-            db.session.add(URLMap(
-                original=url,
-                short=short_id
-            ))
-            short_link = generate_short_link(short_id)
-            pairs.append({"filename": filename, "url": short_link})
-
-        db.session.commit()
+        if app.config['UPLOAD_QUEUE_ENABLED']:
+            pairs = queue_and_shorten(form.files.data)
+        else:
+            pairs = await upload_and_shorten(form.files.data)
         return render_template('file.html', form=form, pairs=pairs)
     return render_template('file.html', form=form)
 
@@ -66,7 +99,17 @@ def redirect_view(short_id):
 
     Deliver content to the client.
     """
-    url_obj = URLMap.query.filter_by(short=short_id).first_or_404()
-    original_url = url_obj.original
+    original_url = URLMap.get_original(short_id)
+    if original_url is None:
+        abort(404)
+    if is_pending_upload(original_url):
+        raise ServiceUnavailable(retry_after=UPLOAD_RETRY_AFTER)
+    if is_disk_path(original_url):
+        original_url = resolve_download_url(original_url)
+        if original_url is None:
+            abort(502)
 
-    return redirect(iri_to_uri(original_url), code=302)
+    click_recorder.record(short_id)
+    return app.response_class(
+        status=302,
+        headers={'Location': get_redirect_location(original_url)})
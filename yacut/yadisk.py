@@ -2,26 +2,53 @@
 
 This module provides:
 - TLS/SSL configuration (using `certifi`) for aiohttp connections.
-- `upload_files_to_yadisk`: orchestrates concurrent uploads of multiple files.
-- `upload_file_and_get_url`: uploads a single file
-and returns its direct download URL.
+- `DiskClient`: a per-process, lazily created `aiohttp.ClientSession` with
+  a tuned connection pool. The session lives on a dedicated event loop
+  thread, because Flask runs every async view on a new event loop, so
+  keep-alive connections to the Disk API survive between requests.
+- `disk_client`: the process-wide `DiskClient`, closed at interpreter exit.
+  Its counters, and the latency of every API call per step, are exported
+  on `/metrics`.
+- `upload_files_to_yadisk`: orchestrates concurrent uploads of multiple files
+  with a bounded number of parallel uploads and a per-file timeout.
+- `UploadResult`: per-file outcome (Disk path or error message), so that
+  one failed file does not discard the others.
+- `upload_file`: uploads a single file and returns its Disk path.
+- `resolve_download_url`: lazily fetches and caches the pre-signed
+  download URL of a stored Disk path when its short link is followed;
+  `resolve_download_url_async` does the same from a running event loop.
+- `iter_file_chunks`: async generator streaming a file in fixed-size
+  chunks, so that memory per upload does not depend on the file size.
 
 Notes:
     * The functions expect Flask/Werkzeug `FileStorage` objects (e.g., from
       `request.files.getlist(...)` or a `MultipleFileField`).
     * Yandex Disk REST API is used:
         - `resources/upload` to obtain a pre-signed upload URL.
-        - PUT to that URL to upload bytes.
-        - `resources/download` to obtain a direct download link.
+        - PUT to that URL to upload bytes (streamed from the file).
+        - `resources/download` to obtain a direct download link, on the
+          first visit of the short link rather than at upload time.
 """
 
 import aiohttp
 import asyncio
+import atexit
 import certifi
 import ssl
+import threading
+import time
 import urllib
+from collections import namedtuple
+from contextlib import contextmanager
 
 from . import app
+from .cache import create_backend
+from .constants import DISK_PATH_PREFIX
+from .metrics import (
+    StatsCollector,
+    disk_request_errors,
+    disk_request_seconds
+)
 
 
 AUTH_HEADERS = {
@@ -34,58 +61,285 @@ DISK_INFO_URL = f'{API_HOST}{API_VERSION}/disk/'
 REQUEST_UPLOAD_URL = f'{API_HOST}{API_VERSION}/disk/resources/upload'
 DOWNLOAD_LINK_URL = f'{API_HOST}{API_VERSION}/disk/resources/download'
 
+UPLOAD_CHUNK_SIZE = app.config['YADISK_UPLOAD_CHUNK_SIZE']
+UPLOAD_CONCURRENCY = app.config['YADISK_UPLOAD_CONCURRENCY']
+UPLOAD_TIMEOUT = app.config['YADISK_UPLOAD_TIMEOUT']
+API_TIMEOUT = app.config['YADISK_API_TIMEOUT']
+
+UploadResult = namedtuple('UploadResult', ['filename', 'path', 'error'])
+
+download_link_cache = create_backend(
+    app.config,
+    ttl=app.config['YADISK_DOWNLOAD_LINK_TTL'],
+    negative_ttl=0,
+    prefix='yacut:disk:',
+)
+
 
 ssl_ctx = ssl.create_default_context(cafile=certifi.where())
 
 
-async def upload_files_to_yadisk(files):
-    """Upload multiple files to Yandex Disk concurrently."""
-    if files is not None:
-        tasks = []
-        async with aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(ssl=ssl_ctx)
-        ) as session:
-            for file in files:
-                tasks.append(
-                    asyncio.ensure_future(
-                        upload_file_and_get_url(session, file)
-                    )
+class DiskClient:
+    """Pooled aiohttp session shared by all requests of the process."""
+
+    def __init__(self, pool_size, keepalive_timeout, dns_cache_ttl):
+        """Initialize the client; nothing is started until first use."""
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.stats = dict(
+            requests=0, connections_created=0, connections_reused=0)
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _start_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='yadisk-client',
+                    daemon=True,
                 )
-                results = await asyncio.gather(*tasks)
-            return results
+                self._thread.start()
+            return self._loop
+
+    def _trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats['requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats['connections_reused'] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(
+            on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    ssl=ssl_ctx,
+                    limit=self.pool_size,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                ),
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    async def _call(self, func, args):
+        return await func(self._get_session(), *args)
+
+    async def run(self, func, *args):
+        """Await `func(session, *args)` executed on the client loop."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._call(func, args), self._start_loop())
+        return await asyncio.wrap_future(future)
+
+    def call(self, func, *args, timeout=None):
+        """Run `func(session, *args)` on the client loop from sync code."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._call(func, args), self._start_loop())
+        try:
+            return future.result(timeout or API_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            raise asyncio.TimeoutError
+
+    def close(self):
+        """Close the session and stop the client loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._session.close(), loop).result()
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+
+disk_client = DiskClient(
+    pool_size=app.config['YADISK_POOL_SIZE'],
+    keepalive_timeout=app.config['YADISK_KEEPALIVE_TIMEOUT'],
+    dns_cache_ttl=app.config['YADISK_DNS_CACHE_TTL'],
+)
+atexit.register(disk_client.close)
+StatsCollector(
+    'yacut_disk_client', 'Yandex Disk HTTP client',
+    lambda: dict(disk_client.stats))
+StatsCollector(
+    'yacut_download_link_cache', 'Download link cache',
+    download_link_cache.stats)
+
+
+@contextmanager
+def measure_step(step):
+    """Record the latency of a Disk API call and whether it failed."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        disk_request_errors.inc(step)
+        raise
+    finally:
+        disk_request_seconds.observe(time.perf_counter() - started, step)
+
 
+async def upload_files_to_yadisk(files, concurrency=None, timeout=None,
+                                 names=None):
+    """
+    Upload multiple files to Yandex Disk concurrently.
 
-async def upload_file_and_get_url(session, file):
-    """Upload a single file to Yandex Disk and return its download URL."""
+    At most `concurrency` files are uploaded at the same time and every
+    upload is limited to `timeout` seconds. `names` optionally overrides
+    the file names used on Disk. Return an `UploadResult` for each file,
+    in input order.
+    """
+    if not files:
+        return []
+    return await disk_client.run(
+        upload_files, files, names or [None] * len(files),
+        concurrency or UPLOAD_CONCURRENCY, timeout or UPLOAD_TIMEOUT)
+
+
+async def upload_files(session, files, names, concurrency, timeout):
+    """Upload `files` through `session`; runs on the client loop."""
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(
+        upload_file_with_limits(session, semaphore, timeout, file, name)
+        for file, name in zip(files, names)
+    ))
+
+
+async def upload_file_with_limits(session, semaphore, timeout, file,
+                                  name=None):
+    """Upload one file under the shared semaphore and its own timeout."""
+    async with semaphore:
+        try:
+            filename, path = await asyncio.wait_for(
+                upload_file(session, file, name), timeout)
+        except asyncio.TimeoutError:
+            return UploadResult(
+                file.filename, None, 'Превышено время загрузки файла')
+        except (aiohttp.ClientError, OSError, KeyError, ValueError):
+            return UploadResult(
+                file.filename, None, 'Не удалось загрузить файл')
+    return UploadResult(filename, path, None)
+
+
+def get_file_size(file):
+    """Return the size of a seekable file stream, or None."""
+    stream = file.stream
+    try:
+        position = stream.tell()
+        size = stream.seek(0, 2) - position
+        stream.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return size
+
+
+async def iter_file_chunks(file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Yield the content of a `FileStorage` in chunks of `chunk_size`.
+
+    The stream may be a spooled file on disk, so it is read in a thread
+    to keep the event loop free for the other uploads.
+    """
+    while True:
+        chunk = await asyncio.to_thread(file.stream.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def upload_file(session, file, name=None):
+    """Upload a single file to Yandex Disk and return its Disk path."""
     filename = file.filename
 
     payload = {
-        'path': f'app:/{file.filename}',
+        'path': f'app:/{name or file.filename}',
         'overwrite': 'True'
     }
-    async with session.get(
-        headers=AUTH_HEADERS,
-        params=payload,
-        url=REQUEST_UPLOAD_URL
-    ) as response_1:
-        data = await response_1.json()
-        upload_url = data['href']
-
-    file_content = file.read()
-
-    async with session.put(
-        data=file_content,
-        url=upload_url,
-    ) as response_2:
-        location = response_2.headers['Location']
-        location = urllib.parse.unquote(location)
-        location = location.replace('/disk', '')
-
-    async with session.get(
-        headers=AUTH_HEADERS,
-        url=DOWNLOAD_LINK_URL,
-        params={'path': f'{location}'}
-    ) as response_3:
-        data = await response_3.json()
-        link = data['href']
-    return filename, link
+    with measure_step('upload_link'):
+        async with session.get(
+            headers=AUTH_HEADERS,
+            params=payload,
+            url=REQUEST_UPLOAD_URL
+        ) as response_1:
+            response_1.raise_for_status()
+            data = await response_1.json()
+            upload_url = data['href']
+
+    size = get_file_size(file)
+    headers = {'Content-Length': str(size)} if size is not None else None
+    with measure_step('upload'):
+        async with session.put(
+            data=iter_file_chunks(file),
+            headers=headers,
+            url=upload_url,
+        ) as response_2:
+            response_2.raise_for_status()
+            location = response_2.headers['Location']
+    location = urllib.parse.unquote(location)
+    location = location.replace('/disk', '')
+
+    return filename, DISK_PATH_PREFIX + location
+
+
+async def get_download_url(session, path):
+    """Request a direct (pre-signed) download URL for a Disk path."""
+    with measure_step('download_link'):
+        async with session.get(
+            headers=AUTH_HEADERS,
+            url=DOWNLOAD_LINK_URL,
+            params={'path': path}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return data['href']
+
+
+def resolve_download_url(path):
+    """
+    Return a download URL for a Disk path, fetching it on first use.
+
+    URLs are cached in `download_link_cache` for less time than Yandex
+    Disk keeps them valid. Return None if the Disk API is unavailable.
+    """
+    url = download_link_cache.get(path)
+    if url is not None:
+        return url
+    try:
+        url = disk_client.call(get_download_url, path)
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError):
+        return None
+    download_link_cache.set(path, url)
+    return url
+
+
+async def resolve_download_url_async(path):
+    """Async counterpart of `resolve_download_url` for the ASGI app."""
+    url = download_link_cache.get(path)
+    if url is not None:
+        return url
+    try:
+        url = await asyncio.wait_for(
+            disk_client.run(get_download_url, path), API_TIMEOUT)
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError):
+        return None
+    download_link_cache.set(path, url)
+    return url